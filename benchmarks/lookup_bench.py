@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Offline lookup benchmark
+Generates a synthetic tagged library, serves recorded lyrics pages from the
+local mock site and runs the lyrics engine over it, reporting tracks/sec and
+p50/p95 latency per file and per source. Nothing touches the real sites.
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from lyrics_engine import LyricsEngine  # noqa: E402
+from make_library import FORMATS, make_library  # noqa: E402
+from mock_lyrics_site import MockLyricsSite, add_config_arguments, config_from_args  # noqa: E402
+
+ENGINES = ('fallback', 'puppeteer')
+
+
+def percentile(values, q: float) -> float:
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(q * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_scraper(site: MockLyricsSite, profile=None) -> tuple:
+    """Start scraper.js against the mock site; returns (process, url)"""
+    port = free_port()
+    env = dict(os.environ, PORT=str(port), LYRICS_SOURCE_URLS=json.dumps(site.scraper_source_urls()),
+               LYRICS_BROWSER_PROFILE=str(profile) if profile else 'none')
+    process = subprocess.Popen(['node', 'scraper.js'], cwd=REPO_ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return process, f"http://127.0.0.1:{port}"
+
+
+def run_once(args, run_dir: Path) -> dict:
+    library = run_dir / 'library'
+    make_library(library, args.count, args.formats, args.lyrics_fraction,
+                 args.japanese_fraction, seed=args.seed)
+
+    with MockLyricsSite(config_from_args(args)) as site:
+        engine = LyricsEngine(log=print if args.verbose else (lambda message: None),
+                              report_dir=run_dir, metrics_dir=run_dir / 'metrics',
+                              memo_path=args.memo, harvest_path=None, page_cache_path=args.page_cache)
+        engine.source_urls = site.source_urls()
+        # All mock sources share one host, so per-host limits are off unless asked for
+        engine.rate_limiter.enabled = args.rate_limit
+
+        scraper = None
+        try:
+            if args.engine == 'puppeteer':
+                scraper, engine.scraper_url = start_scraper(site, args.browser_profile)
+                deadline = time.monotonic() + 60
+                while not engine.connect_server():
+                    if time.monotonic() > deadline or scraper.poll() is not None:
+                        raise RuntimeError("scraper.js did not start (is puppeteer installed?)")
+                    time.sleep(1)
+
+            start = time.perf_counter()
+            stats = engine.process_files([str(library)])
+            wall = time.perf_counter() - start
+        finally:
+            engine.shutdown()
+            if scraper:
+                scraper.terminate()
+                scraper.wait()
+        requests = dict(site.counts)
+
+    file_times = []
+    source_times = {}
+    with open(engine.metrics.files_path, encoding='utf-8') as f:
+        for line in f:
+            timings = json.loads(line)['timings']
+            file_times.append(timings['file'])
+            for stage, seconds in timings.items():
+                if stage.startswith('lookup.'):
+                    source_times.setdefault(stage[len('lookup.'):], []).append(seconds)
+
+    return {
+        'files': len(file_times),
+        'wall_s': wall,
+        'tracks_per_s': len(file_times) / wall if wall else 0.0,
+        'file_p50_ms': percentile(file_times, 0.50) * 1000,
+        'file_p95_ms': percentile(file_times, 0.95) * 1000,
+        'sources': {
+            source: {'lookups': len(times),
+                     'p50_ms': percentile(times, 0.50) * 1000,
+                     'p95_ms': percentile(times, 0.95) * 1000}
+            for source, times in sorted(source_times.items())
+        },
+        'stats': dict(stats),
+        'mock_responses': requests,
+    }
+
+
+def print_report(args, results: list):
+    print(f"\n📊 Offline lookup benchmark ({args.engine}, {args.count} files, "
+          f"latency {args.latency * 1000:.0f}±{args.jitter * 1000:.0f}ms, "
+          f"errors {args.error_rate:.0%}, throttled {args.throttle_rate:.0%}, misses {args.miss_rate:.0%})")
+    print("=" * 72)
+    for i, result in enumerate(results, 1):
+        stats = result['stats']
+        print(f"Run {i}: {result['files']} files in {result['wall_s']:.2f}s "
+              f"→ {result['tracks_per_s']:.1f} tracks/s | "
+              f"file p50 {result['file_p50_ms']:.0f}ms p95 {result['file_p95_ms']:.0f}ms | "
+              f"✓{stats['success']} ⊖{stats['skipped']} ✗{stats['failed']}")
+    print("-" * 72)
+    print(f"{'Source':<12}{'Lookups':>10}{'p50':>10}{'p95':>10}")
+    for source, data in results[-1]['sources'].items():
+        print(f"{source:<12}{data['lookups']:>10}{data['p50_ms']:>8.0f}ms{data['p95_ms']:>8.0f}ms")
+    print(f"Mock responses: {results[-1]['mock_responses']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark lyrics lookups offline against a local mock lyrics site',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python benchmarks/lookup_bench.py                             # 100 files, fallback engine
+  python benchmarks/lookup_bench.py --count 500 --latency 0.2 --miss-rate 0.3
+  python benchmarks/lookup_bench.py --engine puppeteer          # Through scraper.js
+  python benchmarks/lookup_bench.py --runs 3 --json > bench.json
+  python benchmarks/lookup_bench.py --runs 2 --memo /tmp/memo.db  # Second run skips known misses
+  python benchmarks/lookup_bench.py --runs 2 --page-cache /tmp/pages.db  # Second run revalidates cached pages
+        """
+    )
+    parser.add_argument('--engine', choices=ENGINES, default='fallback',
+                       help='Direct requests (fallback) or scraper.js (puppeteer)')
+    parser.add_argument('--count', type=int, default=100, help='Library size (default: 100)')
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=list(FORMATS),
+                       help='Formats in the library (default: all)')
+    parser.add_argument('--lyrics-fraction', type=float, default=0.3,
+                       help='Fraction of files that already have lyrics (default: 0.3)')
+    parser.add_argument('--japanese-fraction', type=float, default=0.2,
+                       help='Fraction of files with Japanese titles (default: 0.2)')
+    parser.add_argument('--rate-limit', action='store_true',
+                       help='Apply the per-host rate limits (the mock site counts as one host)')
+    parser.add_argument('--memo',
+                       help='Negative lookup memo to use and keep between runs (default: none)')
+    parser.add_argument('--page-cache',
+                       help='Page cache to use and keep between runs (default: none)')
+    parser.add_argument('--browser-profile', metavar='DIR',
+                       help='Chromium profile for --engine puppeteer, kept between runs '
+                            '(default: a fresh temporary profile, i.e. cold caches)')
+    parser.add_argument('--runs', type=int, default=1, help='Repeat the benchmark (default: 1)')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    parser.add_argument('--verbose', action='store_true', help='Show the engine log')
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    results = []
+    for _ in range(max(1, args.runs)):
+        with tempfile.TemporaryDirectory(prefix='lyrics_bench_') as run_dir:
+            results.append(run_once(args, Path(run_dir)))
+
+    if args.json:
+        print(json.dumps({'engine': args.engine, 'count': args.count, 'runs': results}, indent=2))
+    else:
+        print_report(args, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Synthetic tagged audio library generator
+Writes small but valid MP3, FLAC, M4A and OGG files with title/artist tags
+(and optionally lyrics) into nested album folders, so scans and lookups can
+be benchmarked without a real music collection. No encoder is needed: the
+audio payload is silence-sized filler that mutagen accepts.
+"""
+
+import argparse
+import random
+import struct
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import lyrics_tags  # noqa: E402
+
+FORMATS = ('mp3', 'flac', 'm4a', 'ogg')
+
+ENGLISH_WORDS = ['Midnight', 'Train', 'River', 'Golden', 'Hearts', 'Summer', 'Echo', 'Neon',
+                 'Paper', 'Moon', 'Highway', 'Static', 'Velvet', 'Morning', 'Signal', 'Ghost']
+JAPANESE_WORDS = ['夜明け', '駅', '桜', '空', '約束', '花火', '光', '風', '海', '星', '雨', '夢']
+
+EXISTING_LYRICS = "These lyrics were already embedded\nby the library generator\n" * 4
+
+
+def _mp3_audio(frames: int = 20) -> bytes:
+    """MPEG-1 Layer III frames (128 kbps, 44.1 kHz), 417 bytes each"""
+    header = b'\xff\xfb\x90\x64'
+    return (header + b'\x00' * 413) * frames
+
+
+def _flac_audio() -> bytes:
+    """fLaC marker and a STREAMINFO block (44.1 kHz, stereo, 16 bit)"""
+    info = struct.pack('>HH', 4096, 4096) + b'\x00' * 6
+    info += ((44100 << 44) | (1 << 41) | (15 << 36)).to_bytes(8, 'big') + b'\x00' * 16
+    return b'fLaC' + bytes([0x80]) + len(info).to_bytes(3, 'big') + info + b'\xff\xf8' + b'\x00' * 100
+
+
+def _mp4_atom(name: bytes, data: bytes) -> bytes:
+    return struct.pack('>I4s', 8 + len(data), name) + data
+
+
+def _m4a_audio() -> bytes:
+    """ftyp + moov with one sound track + empty mdat"""
+    atom = _mp4_atom
+    mdhd = atom(b'mdhd', b'\x00' * 4 + struct.pack('>IIII', 0, 0, 44100, 44100) + b'\x00' * 4)
+    hdlr = atom(b'hdlr', b'\x00' * 8 + b'soun' + b'\x00' * 13)
+    minf = atom(b'minf', atom(b'stbl', atom(b'stsd', b'\x00' * 4 + struct.pack('>I', 0))))
+    trak = atom(b'trak', atom(b'mdia', mdhd + hdlr + minf))
+    mvhd = atom(b'mvhd', b'\x00' * 4 + struct.pack('>IIII', 0, 0, 1000, 1000) + b'\x00' * 80)
+    ftyp = atom(b'ftyp', b'M4A \x00\x00\x00\x00M4A mp42isom')
+    return ftyp + atom(b'moov', mvhd + trak) + atom(b'mdat', b'\x00' * 100)
+
+
+def _ogg_audio() -> bytes:
+    """Vorbis identification, comment and setup packets plus one audio page"""
+    from mutagen.ogg import OggPage
+    ident = b'\x01vorbis' + struct.pack('<IBIiii', 0, 2, 44100, 0, 128000, 0) + bytes([0xb8, 1])
+    comment = b'\x03vorbis' + struct.pack('<I', 4) + b'test' + struct.pack('<I', 0) + b'\x01'
+    setup = b'\x05vorbis' + b'\x00' * 30
+    pages = []
+    for sequence, packets in enumerate([[ident], [comment, setup], [b'\x00' * 50]]):
+        page = OggPage()
+        page.packets = packets
+        page.serial = 1
+        page.sequence = sequence
+        page.first = sequence == 0
+        page.last = sequence == 2
+        page.position = 1000 if page.last else 0
+        pages.append(page.write())
+    return b''.join(pages)
+
+
+AUDIO_BUILDERS = {'mp3': _mp3_audio, 'flac': _flac_audio, 'm4a': _m4a_audio, 'ogg': _ogg_audio}
+
+
+def tag_file(path: Path, title: str, artist: str, album: str, lyrics: str = None):
+    """Set title/artist/album (and lyrics) with mutagen"""
+    import mutagen
+    audio = mutagen.File(str(path))
+    suffix = path.suffix.lower()
+    if suffix == '.mp3':
+        from mutagen.id3 import TIT2, TPE1, TALB
+        audio.add_tags()
+        audio.tags.add(TIT2(encoding=3, text=title))
+        audio.tags.add(TPE1(encoding=3, text=artist))
+        audio.tags.add(TALB(encoding=3, text=album))
+    elif suffix == '.m4a':
+        audio['\xa9nam'] = title
+        audio['\xa9ART'] = artist
+        audio['\xa9alb'] = album
+    else:
+        if audio.tags is None:
+            audio.add_tags()
+        audio['title'] = title
+        audio['artist'] = artist
+        audio['album'] = album
+    if lyrics:
+        lyrics_tags.write_lyrics(audio, lyrics)
+    audio.save()
+
+
+def make_library(root, count: int, formats=FORMATS, lyrics_fraction: float = 0.3,
+                 japanese_fraction: float = 0.2, per_album: int = 12, seed: int = 0) -> list:
+    """Create ``count`` tagged files under ``root``; returns their paths"""
+    rng = random.Random(seed)
+    root = Path(root)
+    paths = []
+    audio_cache = {}
+    for i in range(count):
+        japanese = rng.random() < japanese_fraction
+        words = JAPANESE_WORDS if japanese else ENGLISH_WORDS
+        artist_number = i // (per_album * 3)
+        artist = f"{words[artist_number % len(words)]} Artist {artist_number:03d}"
+        album = f"Album {i // per_album:04d}"
+        title = f"{' '.join(rng.sample(words, 2))} {i:05d}"
+        file_format = formats[i % len(formats)]
+
+        folder = root / artist / album
+        folder.mkdir(parents=True, exist_ok=True)
+        path = folder / f"{(i % per_album) + 1:02d} - {title}.{file_format}"
+        if file_format not in audio_cache:
+            audio_cache[file_format] = AUDIO_BUILDERS[file_format]()
+        path.write_bytes(audio_cache[file_format])
+        lyrics = EXISTING_LYRICS if rng.random() < lyrics_fraction else None
+        tag_file(path, title, artist, album, lyrics)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate a synthetic tagged audio library for benchmarks',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python benchmarks/make_library.py /tmp/library --count 1000
+  python benchmarks/make_library.py /tmp/library --count 200 --formats mp3 flac --lyrics-fraction 0
+        """
+    )
+    parser.add_argument('root', help='Folder to create the library in')
+    parser.add_argument('--count', type=int, default=100, help='Number of files (default: 100)')
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=list(FORMATS),
+                       help='Formats to cycle through (default: all)')
+    parser.add_argument('--lyrics-fraction', type=float, default=0.3,
+                       help='Fraction of files that already have lyrics (default: 0.3)')
+    parser.add_argument('--japanese-fraction', type=float, default=0.2,
+                       help='Fraction of files with Japanese titles (default: 0.2)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    args = parser.parse_args()
+
+    paths = make_library(args.root, args.count, args.formats, args.lyrics_fraction,
+                         args.japanese_fraction, seed=args.seed)
+    print(f"✅ Created {len(paths)} files in {args.root}")
+
+
+if __name__ == "__main__":
+    main()
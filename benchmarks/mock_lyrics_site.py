@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the lyrics sites
+Serves the HTML fixtures in benchmarks/fixtures under one path prefix per
+source (/genius, /azlyrics, /utaten, /jlyric-search, /jlyric, /google) with
+configurable latency, error, throttling and miss rates, so lookups can be
+benchmarked offline and reproducibly.
+"""
+
+import argparse
+import html
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+
+# Path prefix -> [(path fragment, fixture)]; the first matching fragment wins
+ROUTES = {
+    'genius': [('-lyrics', 'genius.html')],
+    'azlyrics': [('/lyrics/', 'azlyrics.html')],
+    'utaten': [('/search/', 'utaten_search.html'), ('/lyric/', 'utaten_lyric.html')],
+    'jlyric-search': [('/index.php', 'jlyric_search.html')],
+    'jlyric': [('/lyric.php', 'jlyric_lyric.html')],
+    'google': [('/search', 'google.html')],
+}
+
+# Pages that answer "not found" with an empty result list instead of a 404
+SEARCH_PAGES = {'utaten_search.html', 'jlyric_search.html'}
+EMPTY_SEARCH = '<html><head><meta charset="utf-8"></head><body><p>No results</p></body></html>'
+
+# Search text parameter of each search page; {{query}} in the fixture is
+# replaced with it, so the first result matches the song that was searched
+QUERY_PARAMS = {'utaten_search.html': 'search_text', 'jlyric_search.html': 'kt'}
+
+
+class MockConfig:
+    """How the mock site misbehaves; rates are probabilities per request"""
+
+    def __init__(self, latency=0.05, jitter=0.02, error_rate=0.0, throttle_rate=0.0,
+                 miss_rate=0.0, retry_after=1, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.miss_rate = miss_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def roll(self):
+        """Pick (delay, outcome) for one request"""
+        with self.lock:
+            delay = max(0.0, self.random.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+            value = self.random.random()
+        if value < self.error_rate:
+            return delay, 'error'
+        value -= self.error_rate
+        if value < self.throttle_rate:
+            return delay, 'throttle'
+        value -= self.throttle_rate
+        if value < self.miss_rate:
+            return delay, 'miss'
+        return delay, 'ok'
+
+
+def load_fixtures() -> dict:
+    return {path.name: path.read_text(encoding='utf-8') for path in FIXTURES_DIR.glob('*.html')}
+
+
+def make_handler(config: MockConfig, fixtures: dict, counts: dict):
+    class MockHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            source, _, rest = parts.path.lstrip('/').partition('/')
+            fixture = None
+            for fragment, name in ROUTES.get(source, []):
+                if fragment in '/' + rest:
+                    fixture = name
+                    break
+            if fixture is None:
+                self.respond(404, 'Not found')
+                return
+
+            delay, outcome = config.roll()
+            with config.lock:
+                counts[outcome] = counts.get(outcome, 0) + 1
+            time.sleep(delay)
+
+            if outcome == 'error':
+                self.respond(500, 'Internal Server Error')
+            elif outcome == 'throttle':
+                self.respond(429, 'Too Many Requests', {'Retry-After': str(config.retry_after)})
+            elif outcome == 'miss':
+                if fixture in SEARCH_PAGES:
+                    self.respond(200, EMPTY_SEARCH)
+                else:
+                    self.respond(404, 'Not found')
+            else:
+                base = f"http://{self.headers.get('Host', '127.0.0.1')}/{source}"
+                query = parse_qs(parts.query).get(QUERY_PARAMS.get(fixture), [''])[0]
+                self.respond(200, fixtures[fixture].replace('{{base}}', base)
+                             .replace('{{query}}', html.escape(query)))
+
+        def respond(self, status: int, body: str, headers: dict = None):
+            data = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MockHandler
+
+
+class MockLyricsSite:
+    """The mock site running in a background thread"""
+
+    def __init__(self, config: MockConfig = None, host: str = '127.0.0.1', port: int = 0):
+        self.config = config or MockConfig()
+        self.counts = {}
+        self.server = ThreadingHTTPServer((host, port), make_handler(self.config, load_fixtures(), self.counts))
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def source_urls(self) -> dict:
+        """Base URLs for LyricsEngine.source_urls"""
+        return {
+            'genius': f"{self.base_url}/genius",
+            'azlyrics': f"{self.base_url}/azlyrics",
+            'utaten': f"{self.base_url}/utaten",
+            'jlyric_search': f"{self.base_url}/jlyric-search",
+            'jlyric': f"{self.base_url}/jlyric",
+        }
+
+    def scraper_source_urls(self) -> dict:
+        """Base URLs for scraper.js (LYRICS_SOURCE_URLS)"""
+        return {
+            'genius': f"{self.base_url}/genius",
+            'azlyrics': f"{self.base_url}/azlyrics",
+            'utaten': f"{self.base_url}/utaten",
+            'google': f"{self.base_url}/google",
+        }
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--latency', type=float, default=0.05,
+                       help='Mean response delay in seconds (default: 0.05)')
+    parser.add_argument('--jitter', type=float, default=0.02,
+                       help='Standard deviation of the delay (default: 0.02)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                       help='Fraction of requests answered with HTTP 500')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                       help='Fraction of requests answered with HTTP 429 + Retry-After')
+    parser.add_argument('--miss-rate', type=float, default=0.0,
+                       help='Fraction of requests answered with 404 / empty search results')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+
+
+def config_from_args(args) -> MockConfig:
+    return MockConfig(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                      throttle_rate=args.throttle_rate, miss_rate=args.miss_rate, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Serve recorded lyrics pages locally for offline benchmarks',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python benchmarks/mock_lyrics_site.py --port 8800
+  python benchmarks/mock_lyrics_site.py --port 8800 --latency 0.3 --error-rate 0.05 --miss-rate 0.2
+
+Point scraper.js at it with:
+  LYRICS_SOURCE_URLS='{"genius": "http://127.0.0.1:8800/genius", ...}' node scraper.js
+        """
+    )
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8800)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    site = MockLyricsSite(config_from_args(args), args.host, args.port)
+    print(f"Mock lyrics site running on {site.base_url}")
+    print(f"LYRICS_SOURCE_URLS='{json.dumps(site.scraper_source_urls())}'")
+    try:
+        site.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        site.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
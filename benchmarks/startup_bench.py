@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+GUI startup benchmark
+Measures the import cost of gui_app (via -X importtime) and the time until
+the main window is visible, and checks both against a saved baseline
+"""
+
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Runs in a fresh interpreter: starts the app through main(), exactly as a user
+# would (job server probe and Node.js autostart included), and reports how
+# long it took until the root window was mapped
+WINDOW_SNIPPET = r"""
+import json, time
+t0 = time.perf_counter()
+import gui_app
+
+build_app = gui_app.build_app
+
+def timed_build_app(*args, **kwargs):
+    root, app = build_app(*args, **kwargs)
+
+    def on_map(event):
+        if event.widget is root:
+            print(json.dumps({'visible_ms': (time.perf_counter() - t0) * 1000}))
+            root.after_idle(app.on_closing)
+
+    root.bind('<Map>', on_map, add='+')
+    root.after(30000, app.on_closing)
+    return root, app
+
+gui_app.build_app = timed_build_app
+gui_app.main()
+"""
+
+
+def parse_importtime(stderr: str) -> dict:
+    """Parse -X importtime output into {module: (self_us, cumulative_us)}"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue  # Header line
+        modules[fields[2].strip()] = (self_us, cumulative_us)
+    return modules
+
+
+def measure_import(runs: int, top: int) -> dict:
+    """Import gui_app in fresh interpreters and collect import timings"""
+    totals = []
+    modules = {}
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import gui_app'],
+            cwd=REPO_ROOT, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"import gui_app failed:\n{result.stderr}")
+        modules = parse_importtime(result.stderr)
+        totals.append(modules.get('gui_app', (0, 0))[1] / 1000)
+
+    heaviest = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:top]
+    return {
+        'import_ms': statistics.median(totals),
+        'heaviest_modules': [
+            {'module': name, 'self_ms': self_us / 1000, 'cumulative_ms': cumulative_us / 1000}
+            for name, (self_us, cumulative_us) in heaviest
+        ]
+    }
+
+
+def measure_window(runs: int) -> dict:
+    """Start the GUI in fresh interpreters and time until the window is mapped"""
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-c', WINDOW_SNIPPET],
+            cwd=REPO_ROOT, capture_output=True, text=True, timeout=60
+        )
+        lines = result.stdout.strip().splitlines()
+        if result.returncode != 0 or not lines:
+            # Usually means there is no display (headless machine)
+            error = result.stderr.strip().splitlines()
+            return {'window_visible_ms': None, 'window_error': error[-1] if error else 'no output'}
+        samples.append(json.loads(lines[-1])['visible_ms'])
+    return {'window_visible_ms': statistics.median(samples)}
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float) -> list:
+    """Return a list of regressions beyond the allowed tolerance"""
+    regressions = []
+    for metric in ('import_ms', 'window_visible_ms'):
+        current, previous = results.get(metric), baseline.get(metric)
+        if current is None or not previous:
+            continue
+        if current > previous * (1 + tolerance):
+            regressions.append(f"{metric}: {current:.1f} ms vs baseline {previous:.1f} ms "
+                               f"(+{(current / previous - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark GUI startup (import time and window-visible time)',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python benchmarks/startup_bench.py
+  python benchmarks/startup_bench.py --save-baseline benchmarks/startup_baseline.json
+  python benchmarks/startup_bench.py --baseline benchmarks/startup_baseline.json --tolerance 0.2
+        """
+    )
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per metric (median is reported)')
+    parser.add_argument('--top', type=int, default=10, help='Number of heaviest modules to list')
+    parser.add_argument('--no-window', action='store_true', help='Only measure import time')
+    parser.add_argument('--baseline', help='Fail if slower than this baseline JSON')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown vs baseline as a fraction (default: 0.25)')
+    parser.add_argument('--save-baseline', help='Write results to this file as the new baseline')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    args = parser.parse_args()
+
+    results = measure_import(args.runs, args.top)
+    if not args.no_window:
+        results.update(measure_window(args.runs))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"⏱  import gui_app: {results['import_ms']:.1f} ms")
+        if 'window_visible_ms' in results:
+            if results['window_visible_ms'] is None:
+                print(f"⚠  Window not measured: {results['window_error']}")
+            else:
+                print(f"🪟 Window visible: {results['window_visible_ms']:.1f} ms")
+        print("\nHeaviest imports (self time):")
+        for module in results['heaviest_modules']:
+            print(f"   {module['self_ms']:8.2f} ms  {module['module']}")
+
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(results, indent=2), encoding='utf-8')
+        print(f"\n📄 Baseline saved: {args.save_baseline}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print("\n❌ Startup regression:")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print("\n✅ No startup regression")
+
+
+if __name__ == "__main__":
+    main()
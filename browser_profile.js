@@ -0,0 +1,147 @@
+// Persistent Chromium profile for scraper.js: the HTTP cache and cookies
+// (consent choices included) survive restarts and crash recovery, so warm
+// sessions reuse site assets and skip consent pages. The disk cache is
+// bounded, and the caches are dropped when the whole profile outgrows its cap;
+// cookies and site storage are kept.
+//
+//   LYRICS_BROWSER_PROFILE     profile directory ("none" for a temporary profile)
+//   LYRICS_BROWSER_CACHE_MB    Chromium disk cache size (default 64)
+//   LYRICS_BROWSER_PROFILE_MB  profile size that triggers a cleanup (default 256)
+
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+
+const DEFAULT_PROFILE_DIR = path.join(os.homedir(), '.lyrics_updater', 'chromium-profile');
+const DEFAULT_CACHE_MB = 64;
+const DEFAULT_PROFILE_MB = 256;
+const CLEANUP_MINUTES = 30;
+
+// Cache directories, safe to delete while the browser is closed
+const CACHE_DIRS = [
+    'Default/Cache',
+    'Default/Code Cache',
+    'Default/GPUCache',
+    'Default/DawnCache',
+    'Default/Service Worker/CacheStorage',
+    'Default/Service Worker/ScriptCache',
+    'GrShaderCache',
+    'GraphiteDawnCache',
+    'ShaderCache'
+];
+
+// Held by the browser using the profile; a crashed one leaves them behind and
+// Chromium refuses the profile while they exist. SingletonLock is a symlink to
+// "<hostname>-<pid>" of the owner.
+const LOCK_FILES = ['SingletonLock', 'SingletonSocket', 'SingletonCookie'];
+
+function numberFromEnv(name, fallback) {
+    const value = Number(process.env[name]);
+    return process.env[name] && !Number.isNaN(value) ? value : fallback;
+}
+
+function loadProfileConfig() {
+    const dir = process.env.LYRICS_BROWSER_PROFILE;
+    return {
+        dir: dir === undefined ? DEFAULT_PROFILE_DIR : (dir && dir !== 'none' ? path.resolve(dir) : null),
+        cacheBytes: Math.round(numberFromEnv('LYRICS_BROWSER_CACHE_MB', DEFAULT_CACHE_MB) * 1024 * 1024),
+        maxBytes: Math.round(numberFromEnv('LYRICS_BROWSER_PROFILE_MB', DEFAULT_PROFILE_MB) * 1024 * 1024),
+        cleanupMinutes: CLEANUP_MINUTES
+    };
+}
+
+// puppeteer.launch options for the profile
+function launchOptions(config) {
+    if (!config.dir) return { args: [] };
+    return {
+        userDataDir: config.dir,
+        args: [`--disk-cache-size=${config.cacheBytes}`]
+    };
+}
+
+// Total size of a directory tree in bytes (files that vanish meanwhile are skipped)
+async function dirSize(dir) {
+    let entries;
+    try {
+        entries = await fs.promises.readdir(dir, { withFileTypes: true });
+    } catch (e) {
+        return 0;
+    }
+    let total = 0;
+    for (const entry of entries) {
+        const entryPath = path.join(dir, entry.name);
+        if (entry.isDirectory()) {
+            total += await dirSize(entryPath);
+        } else if (entry.isFile()) {
+            try {
+                total += (await fs.promises.stat(entryPath)).size;
+            } catch (e) {
+                // Removed by the browser in the meantime
+            }
+        }
+    }
+    return total;
+}
+
+function processAlive(pid) {
+    try {
+        process.kill(pid, 0);
+        return true;
+    } catch (e) {
+        return e.code === 'EPERM';  // Exists, owned by someone else
+    }
+}
+
+// Remove the lock files of a browser on this host that did not shut down
+// cleanly. Returns false, leaving them alone, while the owner may still be
+// running: a live process here, or any process on another host sharing the
+// profile (e.g. a home directory on NFS).
+function clearStaleLocks(dir) {
+    let owner;
+    try {
+        owner = fs.readlinkSync(path.join(dir, 'SingletonLock'));
+    } catch (e) {
+        return e.code === 'ENOENT';  // No lock; anything else is not ours to judge
+    }
+    const split = owner.lastIndexOf('-');
+    const host = owner.slice(0, split);
+    const pid = Number(owner.slice(split + 1));
+    if (split < 0 || host !== os.hostname() || !Number.isInteger(pid) || processAlive(pid)) {
+        return false;
+    }
+    for (const name of LOCK_FILES) {
+        try {
+            fs.unlinkSync(path.join(dir, name));
+        } catch (e) {
+            // Not there
+        }
+    }
+    return true;
+}
+
+// Drop the caches (the browser must be closed); returns the bytes freed
+async function trimProfile(dir) {
+    let freed = 0;
+    for (const cacheDir of CACHE_DIRS) {
+        const cachePath = path.join(dir, cacheDir);
+        const size = await dirSize(cachePath);
+        if (!size) continue;
+        await fs.promises.rm(cachePath, { recursive: true, force: true });
+        freed += size;
+    }
+    return freed;
+}
+
+// Prepare the profile for a launch: clear stale locks, trim it if over the cap.
+// { locked: true } means another browser owns the profile and it must not be used.
+async function prepareProfile(config) {
+    if (!config.dir) return null;
+    await fs.promises.mkdir(config.dir, { recursive: true });
+    if (!clearStaleLocks(config.dir)) return { locked: true, size: 0, freed: 0 };
+    const size = await dirSize(config.dir);
+    if (size <= config.maxBytes) return { size, freed: 0 };
+    const freed = await trimProfile(config.dir);
+    return { size: size - freed, freed };
+}
+
+module.exports = { loadProfileConfig, launchOptions, dirSize, trimProfile, prepareProfile };
@@ -0,0 +1,89 @@
+// Search result ranking for scraper.js, the same scoring as candidates.py:
+// every result row is scored by character-bigram similarity of its title and
+// artist to the song, and only the best (or the few close to it) are opened.
+
+const TOP_CANDIDATES = 3;
+const MIN_SCORE = 0.5;
+const CLOSE_SCORE = 0.15;
+const TITLE_WEIGHT = 0.7;
+const VERSION_PENALTY = 0.15;
+const DURATION_TOLERANCE = 5.0;
+const DURATION_PENALTY = 0.2;
+
+const VERSION_RE = /[(\[（【][^)\]）】]*?(live|remix|mix|ver|edit|acoustic|inst|karaoke|off vocal|tv size|short|remaster|demo)[^)\]）】]*[)\]）】]/i;
+const VERSION_RE_ALL = new RegExp(VERSION_RE.source, 'gi');
+
+function normalize(text) {
+    return (text || '').normalize('NFKC').toLowerCase().replace(/[^\p{L}\p{M}\p{N}_]+/gu, ' ').trim();
+}
+
+function bigrams(text) {
+    const chars = Array.from(text.replace(/ /g, ''));
+    const counts = new Map();
+    for (let i = 0; i < chars.length - 1; i++) {
+        const pair = chars[i] + chars[i + 1];
+        counts.set(pair, (counts.get(pair) || 0) + 1);
+    }
+    return counts;
+}
+
+// Dice coefficient of character bigrams (0..1) of two normalized strings
+function similarity(a, b) {
+    if (!a || !b) return 0;
+    if (a === b) return 1;
+    const first = bigrams(a);
+    const second = bigrams(b);
+    let total = 0;
+    first.forEach(count => { total += count; });
+    second.forEach(count => { total += count; });
+    if (!total) return 0;
+    let shared = 0;
+    first.forEach((count, pair) => { shared += Math.min(count, second.get(pair) || 0); });
+    return 2 * shared / total;
+}
+
+// How likely a search result ({ url, title, artist, duration }) is the song (0..1)
+function score(candidate, title, artist = '', duration = null) {
+    const queryVersion = VERSION_RE.test(title);
+    const resultVersion = VERSION_RE.test(candidate.title);
+    const titleScore = similarity(normalize(title.replace(VERSION_RE_ALL, '')),
+        normalize(candidate.title.replace(VERSION_RE_ALL, '')));
+
+    const queryArtist = normalize(artist);
+    const resultArtist = normalize(candidate.artist);
+    let value;
+    if (queryArtist && resultArtist) {
+        value = TITLE_WEIGHT * titleScore + (1 - TITLE_WEIGHT) * similarity(queryArtist, resultArtist);
+    } else if (queryArtist) {
+        // No artist column: the result may read "artist title" or "title artist"
+        const resultTitle = normalize(candidate.title);
+        value = Math.max(titleScore, similarity(`${queryArtist} ${normalize(title)}`, resultTitle),
+            similarity(`${normalize(title)} ${queryArtist}`, resultTitle));
+    } else {
+        value = titleScore;
+    }
+    if (queryVersion !== resultVersion) value -= VERSION_PENALTY;
+    if (duration && candidate.duration && Math.abs(duration - candidate.duration) > DURATION_TOLERANCE) {
+        value -= DURATION_PENALTY;
+    }
+    return Math.max(0, value);
+}
+
+// The candidates worth opening, best first: a clear winner alone, otherwise the close ones
+function pickCandidates(candidates, title, artist = '', duration = null, limit = TOP_CANDIDATES) {
+    const ranked = candidates
+        .map(candidate => Object.assign({}, candidate, { score: score(candidate, title, artist, duration) }))
+        .filter(candidate => candidate.score >= MIN_SCORE)
+        .sort((a, b) => b.score - a.score);
+    if (!ranked.length) return [];
+    const best = ranked[0].score;
+    return ranked.slice(0, limit).filter(candidate => best - candidate.score < CLOSE_SCORE);
+}
+
+// "3:45" in a result row, in seconds
+function parseDuration(text) {
+    const match = /(?<![\d:])(\d{1,2}):([0-5]\d)(?![\d:])/.exec(text || '');
+    return match ? Number(match[1]) * 60 + Number(match[2]) : null;
+}
+
+module.exports = { TOP_CANDIDATES, normalize, similarity, score, pickCandidates, parseDuration };
@@ -0,0 +1,140 @@
+"""
+Search result ranking
+Parses every row of a lyrics site's search results (title, artist, and
+duration when the site shows one) and ranks them by similarity to the song
+being looked up, so the lookup opens the most likely lyrics page instead of
+whatever the site listed first. candidates.js scores the same way for the
+Puppeteer server.
+"""
+
+import re
+import unicodedata
+from typing import List, NamedTuple, Optional
+from urllib.parse import urljoin
+
+TOP_CANDIDATES = 3  # lyrics pages fetched at most per search
+MIN_SCORE = 0.5  # results below this are a different song
+CLOSE_SCORE = 0.15  # also fetch results within this of the best one
+TITLE_WEIGHT = 0.7  # the rest is the artist (when both sides have one)
+VERSION_PENALTY = 0.15  # live/acoustic/... on one side only
+DURATION_TOLERANCE = 5.0
+DURATION_PENALTY = 0.2
+
+_NON_WORD_RE = re.compile(r'[^\w]+')
+VERSION_RE = re.compile(r'[\(\[（【][^\)\]）】]*?(live|remix|mix|ver|edit|acoustic|inst|karaoke|off vocal|'
+                        r'tv size|short|remaster|demo)[^\)\]）】]*[\)\]）】]', re.IGNORECASE)
+DURATION_RE = re.compile(r'(?<![\d:])(\d{1,2}):([0-5]\d)(?![\d:])')
+
+
+class Candidate(NamedTuple):
+    url: str
+    title: str
+    artist: str = ''
+    duration: Optional[float] = None  # seconds, when the result row shows it
+    score: float = 0.0
+
+
+def normalize(text: str) -> str:
+    """Case-, width- and punctuation-insensitive form (as lookup_memo.normalize_query)"""
+    text = unicodedata.normalize('NFKC', text or '').casefold()
+    return _NON_WORD_RE.sub(' ', text).strip()
+
+
+def _bigrams(text: str) -> dict:
+    text = text.replace(' ', '')
+    counts = {}
+    for i in range(len(text) - 1):
+        pair = text[i:i + 2]
+        counts[pair] = counts.get(pair, 0) + 1
+    return counts
+
+
+def similarity(a: str, b: str) -> float:
+    """Dice coefficient of character bigrams (0..1) of two normalized strings.
+
+    Linear in the string length and works the same for kana/kanji, where
+    word-based measures do not.
+    """
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    first, second = _bigrams(a), _bigrams(b)
+    total = sum(first.values()) + sum(second.values())
+    if not total:
+        return 0.0  # single characters that differ
+    shared = sum(min(count, second.get(pair, 0)) for pair, count in first.items())
+    return 2.0 * shared / total
+
+
+def score(candidate: Candidate, title: str, artist: str = '', duration: Optional[float] = None) -> float:
+    """How likely a search result is the song (0..1)"""
+    query_version = bool(VERSION_RE.search(title))
+    result_version = bool(VERSION_RE.search(candidate.title))
+    title_score = similarity(normalize(VERSION_RE.sub('', title)), normalize(VERSION_RE.sub('', candidate.title)))
+
+    query_artist, result_artist = normalize(artist), normalize(candidate.artist)
+    if query_artist and result_artist:
+        value = TITLE_WEIGHT * title_score + (1 - TITLE_WEIGHT) * similarity(query_artist, result_artist)
+    elif query_artist:
+        # No artist column: the result may read "artist title" or "title artist"
+        result_title = normalize(candidate.title)
+        value = max(title_score, similarity(f"{query_artist} {normalize(title)}", result_title),
+                    similarity(f"{normalize(title)} {query_artist}", result_title))
+    else:
+        value = title_score
+    if query_version != result_version:
+        value -= VERSION_PENALTY
+    if duration and candidate.duration and abs(duration - candidate.duration) > DURATION_TOLERANCE:
+        value -= DURATION_PENALTY
+    return max(0.0, value)
+
+
+def rank(candidates: List[Candidate], title: str, artist: str = '',
+         duration: Optional[float] = None) -> List[Candidate]:
+    """Candidates scoring at least MIN_SCORE, best first (site order breaks ties)"""
+    scored = [candidate._replace(score=score(candidate, title, artist, duration)) for candidate in candidates]
+    scored = [candidate for candidate in scored if candidate.score >= MIN_SCORE]
+    return sorted(scored, key=lambda candidate: -candidate.score)
+
+
+def pick(ranked: List[Candidate], limit: int = TOP_CANDIDATES) -> List[Candidate]:
+    """The ranked candidates worth fetching: a clear winner alone, otherwise the close ones"""
+    if not ranked:
+        return []
+    best = ranked[0].score
+    return [candidate for candidate in ranked[:limit] if best - candidate.score < CLOSE_SCORE]
+
+
+def parse_duration(text: str) -> Optional[float]:
+    match = DURATION_RE.search(text)
+    return int(match.group(1)) * 60 + int(match.group(2)) if match else None
+
+
+def parse_results(soup, page_url: str, is_lyrics_link, artist_href, max_depth: int = 2) -> List[Candidate]:
+    """Every lyrics link in a search page with the artist and duration of its row.
+
+    is_lyrics_link(url) picks the result links; artist_href (a regex) finds
+    the artist link of the row, which is the nearest ancestor (up to
+    max_depth levels) that has one.
+    """
+    candidates = []
+    seen = set()
+    for link in soup.find_all('a', href=True):
+        url = urljoin(page_url, link['href'])
+        if url in seen or not is_lyrics_link(url):
+            continue
+        seen.add(url)
+
+        row, artist = link.parent, ''
+        for _ in range(max_depth):
+            if row is None:
+                break
+            artist_link = row.find('a', href=artist_href)
+            if artist_link is not None:
+                artist = artist_link.get_text(' ', strip=True)
+                break
+            row = row.parent
+        row_text = (row if row is not None and artist else link.parent).get_text(' ', strip=True)
+        candidates.append(Candidate(url, link.get_text(' ', strip=True), artist, parse_duration(row_text)))
+    return candidates
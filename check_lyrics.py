@@ -7,6 +7,8 @@ import sys
 import mutagen
 from pathlib import Path
 
+import lyrics_tags
+
 def check_lyrics_in_file(filepath):
     """Check what lyrics data exists in an audio file"""
     print(f"Checking: {filepath}")
@@ -21,30 +23,15 @@ def check_lyrics_in_file(filepath):
         print(f"📄 Format: {type(audio).__name__}")
         print(f"📊 File size: {Path(filepath).stat().st_size / 1024 / 1024:.1f} MB")
         
-        lyrics_found = False
-        
-        # Check all possible lyrics fields
-        if hasattr(audio, 'tags') and audio.tags:
-            print("\n🏷️  ID3 Tags found:")
-            for key, value in audio.tags.items():
-                if hasattr(value, 'FrameID'):
-                    if value.FrameID == 'USLT':
-                        print(f"   ✅ USLT (Lyrics): {len(str(value.text))} characters")
-                        print(f"      Preview: {str(value.text)[:100]}...")
-                        lyrics_found = True
+        found = lyrics_tags.read_lyrics(audio)
+        lyrics_found = bool(found)
         
-        # Check direct key access
-        lyrics_keys = ['lyrics', 'LYRICS', '\xa9lyr', 'WM/Lyrics', 'Lyrics']
-        print(f"\n📋 Direct field check:")
-        for key in lyrics_keys:
-            if key in audio:
-                value = audio[key]
-                if isinstance(value, list):
-                    value = value[0] if value else ""
-                print(f"   ✅ {key}: {len(str(value))} characters")
-                if len(str(value)) > 50:
-                    print(f"      Preview: {str(value)[:100]}...")
-                lyrics_found = True
+        # Check the lyrics fields for this format
+        print(f"\n📋 Lyrics fields ({lyrics_tags.format_for(audio).name} tags):")
+        for key, value in found:
+            print(f"   ✅ {key}: {len(value)} characters")
+            if len(value) > 50:
+                print(f"      Preview: {value[:100]}...")
         
         # List all available keys
         print(f"\n📚 All available fields:")
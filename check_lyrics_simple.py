@@ -5,7 +5,8 @@ Simple script to check lyrics in audio files
 
 import sys
 import mutagen
-from pathlib import Path
+
+import lyrics_tags
 
 def check_lyrics_in_file(filepath):
     """Check what lyrics data exists in an audio file"""
@@ -20,28 +21,12 @@ def check_lyrics_in_file(filepath):
         
         print(f"Format: {type(audio).__name__}")
         
-        lyrics_found = False
+        found = lyrics_tags.read_lyrics(audio)
+        lyrics_found = bool(found)
         
-        # Check for lyrics field (FLAC/OGG)
-        if 'lyrics' in audio:
-            lyrics = audio['lyrics'][0] if isinstance(audio['lyrics'], list) else audio['lyrics']
-            print(f"FOUND LYRICS: {len(lyrics)} characters")
+        for key, lyrics in found:
+            print(f"FOUND LYRICS ({key}): {len(lyrics)} characters")
             print(f"Preview: {lyrics[:200]}...")
-            lyrics_found = True
-        
-        # Check for LYRICS field
-        if 'LYRICS' in audio:
-            lyrics = audio['LYRICS'][0] if isinstance(audio['LYRICS'], list) else audio['LYRICS']
-            print(f"FOUND LYRICS (uppercase): {len(lyrics)} characters")
-            lyrics_found = True
-        
-        # Check ID3 USLT tags
-        if hasattr(audio, 'tags') and audio.tags:
-            for frame in audio.tags.values():
-                if hasattr(frame, 'FrameID') and frame.FrameID == 'USLT':
-                    print(f"FOUND ID3 LYRICS: {len(frame.text)} characters")
-                    print(f"Preview: {frame.text[:200]}...")
-                    lyrics_found = True
         
         # List all fields
         print("\nAll fields in file:")
@@ -64,7 +49,7 @@ if __name__ == "__main__":
     if len(sys.argv) > 1:
         check_lyrics_in_file(sys.argv[1])
     else:
-        # Look for FLAC files in current directory
-        for flac_file in Path(".").glob("*.flac"):
-            check_lyrics_in_file(str(flac_file))
+        # Look for audio files of every supported format under the current directory
+        for audio_file, _ in lyrics_tags.iter_audio_files("."):
+            check_lyrics_in_file(audio_file)
             print()  # Empty line between files
\ No newline at end of file
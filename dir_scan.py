@@ -0,0 +1,85 @@
+"""
+Parallel directory scanning
+Lists directories concurrently on a small thread pool, so on network shares
+(SMB/NFS), where every listing is a round trip, a scan takes about
+directories / workers round trips instead of one per directory. Several
+roots are walked round-robin rather than one after another, file types come
+from the DirEntry (no extra stat per file), and files are yielded as soon as
+their folder has been listed.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, Optional
+
+DEFAULT_WORKERS = 8
+
+
+def _list_dir(path: str, accept: Callable[[str], bool]) -> tuple:
+    """One listing: (accepted file entries, subfolders in reverse name order, error)"""
+    files, subdirs = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif accept(entry.name) and entry.is_file():
+                        files.append(entry)
+                except OSError:
+                    continue
+    except OSError as e:
+        return files, [], e
+    subdirs.sort(reverse=True)
+    return files, subdirs, None
+
+
+def scan(roots: Iterable, accept: Callable[[str], bool], workers: int = DEFAULT_WORKERS,
+         should_stop: Optional[Callable[[], bool]] = None,
+         on_error: Optional[Callable[[str, OSError], None]] = None) -> Iterator[os.DirEntry]:
+    """Yield the DirEntry of every file under the roots whose name accept() takes.
+
+    At most `workers` listings are in flight. Each root keeps its own stack
+    of folders and the roots take turns, so one huge root does not hold up
+    the others; with one worker and one root this is the plain depth-first
+    walk in name order. Unreadable folders go to on_error(path, error).
+    """
+    workers = max(1, workers)
+    pending = {}  # root -> folders still to list (a stack)
+    turns = deque()  # roots with folders to list, in round-robin order
+    for root in roots:
+        root = str(root)
+        if root not in pending:
+            pending[root] = [root]
+            turns.append(root)
+
+    in_flight = {}  # future -> (root, folder)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scan')
+    try:
+        while turns or in_flight:
+            if should_stop and should_stop():
+                return
+            while turns and len(in_flight) < workers:
+                root = turns.popleft()
+                folders = pending[root]
+                folder = folders.pop()
+                in_flight[executor.submit(_list_dir, folder, accept)] = (root, folder)
+                if folders:
+                    turns.append(root)
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                root, folder = in_flight.pop(future)
+                files, subdirs, error = future.result()
+                if error is not None and on_error:
+                    on_error(folder, error)
+                if subdirs:
+                    if not pending[root]:
+                        turns.append(root)
+                    pending[root].extend(subdirs)
+                yield from files
+    finally:
+        for future in in_flight:
+            future.cancel()
+        executor.shutdown(wait=False)
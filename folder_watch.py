@@ -0,0 +1,248 @@
+"""
+Watch-folder daemon
+Watches library folders and feeds new or modified audio files to the lyrics
+engine as they arrive, instead of rescanning the whole tree. Uses inotify on
+Linux (through ctypes, no extra packages) and falls back to periodic polling
+elsewhere. Files are only processed once their size and modification time
+have stopped changing, so albums still being copied are not picked up early.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+DEFAULT_SETTLE_SECONDS = 5.0
+DEFAULT_POLL_INTERVAL = 30.0
+
+# inotify event bits (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+_EVENT = struct.Struct('iIII')  # wd, mask, cookie, name length
+
+
+def _signature(path: Path) -> Optional[tuple]:
+    """(size, mtime) of a file, or None if it is gone"""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _walk_files(root: Path) -> Iterator[Path]:
+    pending = [str(root)]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.is_file():
+                            yield Path(entry.path)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+
+class InotifyWatcher:
+    """Recursive inotify watches on the given roots (Linux only)"""
+
+    def __init__(self, roots, log=print):
+        self.log = log
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}  # watch descriptor -> directory
+        self.roots = [Path(root) for root in roots]
+        self.last_event = time.time()
+        for root in self.roots:
+            self._watch_tree(root)
+
+    def _watch_dir(self, directory: Path) -> bool:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(str(directory)), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            self.log(f"⚠ Cannot watch {directory}: {os.strerror(error)}")
+            return False
+        self.dirs[wd] = directory
+        return True
+
+    def _watch_tree(self, root: Path):
+        pending = [root]
+        while pending:
+            directory = pending.pop()
+            if not self._watch_dir(directory):
+                continue
+            try:
+                with os.scandir(directory) as entries:
+                    pending.extend(Path(entry.path) for entry in entries
+                                   if entry.is_dir(follow_symlinks=False))
+            except OSError:
+                continue
+
+    def poll(self, timeout: float) -> Iterator[Path]:
+        """Yield files that were created or changed, waiting up to timeout"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return
+        try:
+            data = os.read(self.fd, 256 * 1024)
+        except BlockingIOError:
+            return
+        since = self.last_event
+        self.last_event = time.time()
+
+        pos = 0
+        while pos + _EVENT.size <= len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, pos)
+            name = data[pos + _EVENT.size:pos + _EVENT.size + length].rstrip(b'\0')
+            pos += _EVENT.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped: look for anything changed since the last batch
+                self.log("⚠ Watch queue overflowed, checking for missed changes...")
+                for root in self.roots:
+                    for path in _walk_files(root):
+                        signature = _signature(path)
+                        if signature and signature[1] / 1e9 >= since - 1:
+                            yield path
+                continue
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)  # Directory deleted or unmounted
+                continue
+            directory = self.dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / os.fsdecode(name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # A new album folder: watch it and pick up what is already inside
+                    self._watch_tree(path)
+                    yield from _walk_files(path)
+            else:
+                yield path
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher:
+    """Fallback: rescan the roots every interval and report what changed"""
+
+    def __init__(self, roots, interval: float = DEFAULT_POLL_INTERVAL, log=print):
+        self.roots = [Path(root) for root in roots]
+        self.interval = interval
+        self.next_scan = time.monotonic() + interval
+        self.snapshot = self._scan()
+
+    def _scan(self) -> dict:
+        return {path: _signature(path) for root in self.roots for path in _walk_files(root)}
+
+    def poll(self, timeout: float) -> Iterator[Path]:
+        wait = self.next_scan - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return
+        time.sleep(max(0.0, wait))
+        self.next_scan = time.monotonic() + self.interval
+        snapshot = self._scan()
+        for path, signature in snapshot.items():
+            if self.snapshot.get(path) != signature:
+                yield path
+        self.snapshot = snapshot
+
+    def close(self):
+        pass
+
+
+def make_watcher(roots, polling: bool = False, poll_interval: float = DEFAULT_POLL_INTERVAL, log=print):
+    """inotify where available, polling otherwise (or when asked)"""
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            watcher = InotifyWatcher(roots, log)
+            log(f"👀 Watching {len(watcher.dirs)} folders with inotify")
+            return watcher
+        except (OSError, AttributeError) as e:
+            log(f"⚠ inotify unavailable ({e}), polling instead")
+    log(f"👀 Polling for changes every {poll_interval:.0f}s")
+    return PollingWatcher(roots, poll_interval, log)
+
+
+class SettleTracker:
+    """Files waiting for their size and mtime to stop changing"""
+
+    def __init__(self, settle: float = DEFAULT_SETTLE_SECONDS):
+        self.settle = settle
+        self.pending = {}  # path -> (signature, time it was last seen changing)
+
+    def touch(self, path: Path):
+        self.pending[path] = (_signature(path), time.monotonic())
+
+    def ready(self) -> list:
+        """Files unchanged for the settle time; changed ones start waiting again"""
+        now = time.monotonic()
+        settled = []
+        for path, (signature, since) in list(self.pending.items()):
+            if now - since < self.settle:
+                continue
+            current = _signature(path)
+            if current is None:
+                del self.pending[path]  # Deleted or renamed away (temp file of a copy)
+            elif current == signature:
+                del self.pending[path]
+                settled.append(path)
+            else:
+                self.pending[path] = (current, now)
+        return settled
+
+
+def watch_folders(engine, roots, settle: float = DEFAULT_SETTLE_SECONDS,
+                  polling: bool = False, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                  stop: Optional[threading.Event] = None):
+    """Run until stopped, processing new or modified audio files under roots"""
+    stop = stop or threading.Event()
+    log = engine.log
+    watcher = make_watcher(roots, polling, poll_interval, log)
+    tracker = SettleTracker(settle)
+    written = {}  # path -> signature after our own write, so it is not picked up again
+    try:
+        while not stop.is_set():
+            for path in watcher.poll(timeout=min(1.0, settle)):
+                if not engine.is_audio_file_quick(path):
+                    continue
+                if path in written and written[path] == _signature(path):
+                    continue
+                tracker.touch(path)
+
+            ready = tracker.ready()
+            if ready:
+                log(f"\n📥 {len(ready)} new or changed file(s)")
+                engine.process_files([str(path) for path in ready])
+                for path in ready:
+                    written[path] = _signature(path)
+                if len(written) > 100000:
+                    written.clear()
+                log(f"👀 Waiting for changes... ({len(tracker.pending)} file(s) still settling)")
+    finally:
+        watcher.close()
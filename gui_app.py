@@ -1,29 +1,23 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
-from tkinterdnd2 import DND_FILES, TkinterDnD
+import queue
 import threading
-import subprocess
-import os
-import sys
-import time
-import json
-import requests
 from pathlib import Path
-from typing import Optional, List
-import mutagen
-from mutagen.id3 import ID3, USLT, TIT2, TPE1, TALB, TCOM
-from mutagen.mp3 import MP3
-from mutagen.mp4 import MP4
-from mutagen.flac import FLAC
-from mutagen.oggvorbis import OggVorbis
-from mutagen.wave import WAVE
-from mutagen.asf import ASF
-from mutagen.aac import AAC
-from mutagen.oggopus import OggOpus
+
+from lyrics_engine import LyricsEngine, DEFAULT_FILE_TYPES
+
+# Older log lines are dropped beyond this so the log widget stays small
+MAX_LOG_LINES = 5000
+
+# Entries shown in the "Show Failed Files" window (the report file has all)
+MAX_FAILED_SHOWN = 2000
+
+# How often the Tk thread applies UI updates queued by engine threads (ms)
+UI_QUEUE_INTERVAL = 50
 
 
 class LyricsApp:
-    def __init__(self, root):
+    def __init__(self, root, autostart_server: bool = True, job_server=None, find_job_server: bool = False):
         self.root = root
         self.root.title("Lyrics Updater - Add Lyrics to Your Music")
         self.root.geometry("950x750")
@@ -36,31 +30,44 @@ class LyricsApp:
 
         # Variables
         self.selected_files = []
-        self.processing = False
-        self.node_process = None
-        self.scraper_url = "http://localhost:3000"
-        self.server_ready = False
-        self.stats = {'success': 0, 'failed': 0, 'skipped': 0}
-        self.failed_files = []  # Track files that failed to get lyrics
 
-        # File type selection variables
+        # File type selection variables (webm, mkv, avi, etc. are 'other')
         self.file_types = {
-            'mp3': tk.BooleanVar(value=True),
-            'm4a': tk.BooleanVar(value=True),
-            'flac': tk.BooleanVar(value=True),
-            'ogg': tk.BooleanVar(value=True),
-            'wav': tk.BooleanVar(value=True),
-            'wma': tk.BooleanVar(value=True),
-            'aac': tk.BooleanVar(value=True),
-            'opus': tk.BooleanVar(value=True),
-            'other': tk.BooleanVar(value=False)  # webm, mkv, avi, etc.
+            file_type: tk.BooleanVar(value=enabled) for file_type, enabled in DEFAULT_FILE_TYPES.items()
         }
 
         # Setup UI first (before starting server)
         self.setup_ui()
 
-        # Start Node.js server after UI is ready
-        self.start_node_server()
+        # Tk may only be touched from its own thread; the engine reports from
+        # processing, scanning and fetch threads, so those calls are queued
+        self.ui_queue = queue.Queue()
+        self.root.after(UI_QUEUE_INTERVAL, self.drain_ui_queue)
+
+        # Scanning, lookup and writing happen in the engine; the GUI only
+        # displays what it reports. With a job server running, the engine is
+        # the server's (shared browser and caches) and this window a client.
+        self.engine_callbacks = dict(
+            log=self.log,
+            on_status=self.in_ui(self.status_var.set),
+            on_progress=self.in_ui(self.update_progress),
+            on_stats=self.in_ui(lambda stats: self.update_stats_display()),
+            on_server_status=self.in_ui(
+                lambda text, color: self.server_status_label.config(text=text, foreground=color))
+        )
+        if job_server is not None:
+            from job_client import RemoteEngine
+            self.engine = RemoteEngine(job_server, **self.engine_callbacks)
+        else:
+            self.engine = LyricsEngine(**self.engine_callbacks)
+
+        # Look for a job server / start Node.js server once the window has
+        # been drawn, so neither ever delays the first paint
+        self.autostart_server = autostart_server
+        if find_job_server and job_server is None:
+            self.root.after_idle(self.find_job_server)
+        elif autostart_server:
+            self.root.after_idle(self.engine.start_server)
 
         # Bind close event
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -71,6 +78,28 @@ class LyricsApp:
         self.root.bind('<Control-l>', lambda e: self.clear_log())
         self.root.bind('<F5>', lambda e: self.start_processing() if self.start_button['state'] == 'normal' else None)
         
+    def in_ui(self, callback):
+        """Wrap a callback so it always runs on the Tk thread"""
+        def call(*args):
+            if threading.current_thread() is threading.main_thread():
+                callback(*args)
+            else:
+                self.ui_queue.put((callback, args))
+        return call
+
+    def apply_ui_updates(self):
+        """Apply the UI updates queued by other threads, in order"""
+        while True:
+            try:
+                callback, args = self.ui_queue.get_nowait()
+            except queue.Empty:
+                return
+            callback(*args)
+
+    def drain_ui_queue(self):
+        self.apply_ui_updates()
+        self.root.after(UI_QUEUE_INTERVAL, self.drain_ui_queue)
+
     def setup_ui(self):
         # Style
         style = ttk.Style()
@@ -109,7 +138,8 @@ class LyricsApp:
                                   bg='#f0f0f0', font=('Arial', 12))
         self.drop_label.pack(expand=True, pady=20)
         
-        # Enable drag and drop
+        # Enable drag and drop (tkinterdnd2 is already loaded by main())
+        from tkinterdnd2 import DND_FILES
         self.drop_frame.drop_target_register(DND_FILES)
         self.drop_frame.dnd_bind('<<Drop>>', self.on_drop)
         
@@ -140,6 +170,12 @@ class LyricsApp:
         ttk.Checkbutton(options_frame, text="Overwrite existing lyrics",
                        variable=self.overwrite_var).grid(row=0, column=0, sticky=tk.W)
 
+        # Instrumental checkbox
+        self.skip_instrumentals_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(options_frame, text="Skip instrumentals (intro, karaoke, off vocal...)",
+                       variable=self.skip_instrumentals_var).grid(row=4, column=0, columnspan=2, sticky=tk.W,
+                                                                  pady=(10, 0))
+
         # Server status
         self.server_status_label = ttk.Label(options_frame, text="Server: Starting...",
                                            foreground="orange")
@@ -232,66 +268,6 @@ class LyricsApp:
         status_bar = ttk.Label(main_frame, textvariable=self.status_var, relief=tk.SUNKEN)
         status_bar.grid(row=5, column=0, sticky=(tk.W, tk.E), pady=(5, 0))
         
-    def start_node_server(self):
-        """Start the Node.js Puppeteer server"""
-        def server_startup():
-            try:
-                self.log("Starting Puppeteer server...")
-                self.server_status_label.config(text="Server: Starting...", foreground="orange")
-
-                # Check if node_modules exists, if not install dependencies
-                if not os.path.exists('node_modules'):
-                    self.log("Installing Node.js dependencies...")
-                    self.server_status_label.config(text="Server: Installing deps...", foreground="orange")
-                    result = subprocess.run(['npm', 'install'], capture_output=True, text=True, shell=True)
-                    if result.returncode != 0:
-                        raise Exception(f"npm install failed: {result.stderr}")
-
-                # Start the Node.js server
-                self.node_process = subprocess.Popen(
-                    ['node', 'scraper.js'],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    shell=True
-                )
-
-                # Wait for server to start
-                max_attempts = 15  # Increased attempts
-                for attempt in range(max_attempts):
-                    time.sleep(2)  # Longer sleep between attempts
-                    try:
-                        # Test if server is responding
-                        response = requests.get(f"{self.scraper_url}", timeout=5)
-                        if response.status_code == 404:  # Server is up, just no route
-                            # Now try to initialize
-                            init_response = requests.post(f"{self.scraper_url}/init", timeout=10)
-                            if init_response.status_code == 200:
-                                self.log("✓ Puppeteer server started successfully")
-                                self.server_ready = True
-                                self.server_status_label.config(text="Server: Ready ✓", foreground="green")
-                                self.status_var.set("Server running - Ready to process files")
-                                return
-                    except requests.exceptions.ConnectionError:
-                        self.log(f"  Waiting for server... (attempt {attempt + 1}/{max_attempts})")
-                        continue
-                    except Exception as e:
-                        self.log(f"  Server check error: {e}")
-                        continue
-
-                # Server didn't start properly
-                self.log("⚠ Server startup timeout - using fallback mode")
-                self.server_status_label.config(text="Server: Fallback mode", foreground="orange")
-                self.status_var.set("Using fallback scraping - Ready to process files")
-
-            except Exception as e:
-                self.log(f"✗ Error starting server: {e}")
-                self.log("Will use fallback scraping method")
-                self.server_status_label.config(text="Server: Failed", foreground="red")
-                self.status_var.set("Using fallback scraping - Ready to process files")
-
-        # Start server in background thread
-        threading.Thread(target=server_startup, daemon=True).start()
-
     def select_all_file_types(self):
         """Select all file types"""
         for var in self.file_types.values():
@@ -335,7 +311,7 @@ class LyricsApp:
         for item in items:
             # Remove curly braces if present (Windows drag and drop quirk)
             item = item.strip('{}').strip('"')
-            if os.path.exists(item):
+            if Path(item).exists():
                 processed_items.append(item)
         
         if processed_items:
@@ -479,756 +455,50 @@ class LyricsApp:
                 file_count = len(paths) - dir_count
                 self.files_label.config(text=f"{dir_count} folders, {file_count} files selected", foreground="black")
     
+    @property
+    def processing(self) -> bool:
+        return self.engine.processing
+
+    @processing.setter
+    def processing(self, value: bool):
+        self.engine.processing = value
+
     def log(self, message):
-        """Add message to progress text"""
+        """Add message to progress text (from any thread)"""
+        self.in_ui(self.append_log)(message)
+
+    def append_log(self, message):
+        """Add message to progress text, keeping at most MAX_LOG_LINES lines"""
         self.progress_text.insert(tk.END, f"{message}\n")
+        line_count = int(self.progress_text.index('end-1c').split('.')[0])
+        if line_count > MAX_LOG_LINES:
+            self.progress_text.delete('1.0', f"{line_count - MAX_LOG_LINES + 1}.0")
         self.progress_text.see(tk.END)
-        self.root.update()
+
+    def update_progress(self, processed: int, discovered: int, scan_complete: bool):
+        """Show processed/discovered counts; the total is only known once scanning ends"""
+        if discovered:
+            # While scanning, the bar tracks progress through what was found so far
+            self.progress_var.set(min(100.0, processed / discovered * 100))
 
     def clear_log(self):
         """Clear the progress log"""
         self.progress_text.delete(1.0, tk.END)
     
-    def is_audio_file(self, filepath: Path) -> bool:
-        """Check if file is an audio file that mutagen can handle"""
-        try:
-            audio = mutagen.File(str(filepath))
-            return audio is not None
-        except:
-            return False
-    
-    def get_audio_files(self, max_files: int = None, show_progress: bool = True) -> List[Path]:
-        """Get all audio files based on selection with optimized scanning"""
-        audio_files = []
-
-        for item in self.selected_files:
-            path = Path(item)
-            if path.is_file():
-                if self.is_audio_file_quick(path):
-                    audio_files.append(path)
-            elif path.is_dir():
-                if show_progress:
-                    self.log(f"Scanning folder: {path.name}...")
-                    self.status_var.set("Scanning for audio files...")
-
-                # Get selected extensions based on user preferences
-                selected_extensions = self.get_selected_extensions()
-
-                if not selected_extensions:
-                    if show_progress:
-                        self.log("No file types selected! Please select at least one file type.")
-                    return audio_files
-
-                for ext in selected_extensions:
-                    try:
-                        # Use glob instead of rglob for better control
-                        for file in path.rglob(f'*{ext}'):
-                            if file.is_file() and self.is_audio_file_quick(file):
-                                audio_files.append(file)
-
-                                # Check file limit
-                                if max_files and len(audio_files) >= max_files:
-                                    if show_progress:
-                                        self.log(f"Reached file limit of {max_files} files")
-                                    return audio_files
-
-                                # Show progress every 100 files
-                                if show_progress and len(audio_files) % 100 == 0:
-                                    self.status_var.set(f"Found {len(audio_files)} audio files...")
-                                    self.root.update_idletasks()
-                    except Exception as e:
-                        if show_progress:
-                            self.log(f"Error scanning {ext} files: {e}")
-                        continue
-
-        return audio_files
-
-    def get_selected_extensions(self):
-        """Get list of file extensions based on user selection"""
-        extensions = []
-
-        if self.file_types['mp3'].get():
-            extensions.extend(['.mp3'])
-        if self.file_types['m4a'].get():
-            extensions.extend(['.m4a', '.mp4'])
-        if self.file_types['flac'].get():
-            extensions.extend(['.flac'])
-        if self.file_types['ogg'].get():
-            extensions.extend(['.ogg', '.oga'])
-        if self.file_types['wav'].get():
-            extensions.extend(['.wav', '.wave'])
-        if self.file_types['wma'].get():
-            extensions.extend(['.wma'])
-        if self.file_types['aac'].get():
-            extensions.extend(['.aac'])
-        if self.file_types['opus'].get():
-            extensions.extend(['.opus'])
-        if self.file_types['other'].get():
-            extensions.extend(['.webm', '.mkv', '.avi', '.wv', '.ape'])
-
-        return extensions
-
-    def is_audio_file_quick(self, filepath: Path) -> bool:
-        """Quick check if file is audio based on extension and user selection"""
-        ext = filepath.suffix.lower()
-
-        # Map extensions to our file type categories
-        extension_map = {
-            '.mp3': 'mp3',
-            '.m4a': 'm4a', '.mp4': 'm4a',  # MP4 audio files usually M4A
-            '.flac': 'flac',
-            '.ogg': 'ogg', '.oga': 'ogg',
-            '.wav': 'wav', '.wave': 'wav',
-            '.wma': 'wma',
-            '.aac': 'aac',
-            '.opus': 'opus',
-            '.webm': 'other', '.mkv': 'other', '.avi': 'other',
-            '.wv': 'other', '.ape': 'other'
-        }
-
-        # Check if extension is supported
-        if ext not in extension_map:
-            return False
-
-        # Check if user has selected this file type
-        file_type = extension_map[ext]
-        return self.file_types[file_type].get()
-    
-    def read_metadata(self, filepath: Path) -> dict:
-        """Read metadata from audio file"""
-        info = {'title': '', 'artist': ''}
-        
-        try:
-            audio = mutagen.File(str(filepath))
-            if not audio:
-                return self.parse_filename(filepath.stem)
-            
-            # Handle different audio formats
-            if hasattr(audio, 'tags') and audio.tags:
-                # ID3 tags (MP3, WAV with ID3)
-                if hasattr(audio.tags, 'get'):
-                    info['title'] = str(audio.tags.get('TIT2', [''])[0]) if audio.tags.get('TIT2') else ''
-                    info['artist'] = str(audio.tags.get('TPE1', [''])[0]) if audio.tags.get('TPE1') else ''
-            
-            # MP4/M4A/AAC format
-            if isinstance(audio, (MP4, AAC)) or (hasattr(audio, 'mime') and 'mp4' in str(audio.mime)):
-                info['title'] = audio.get('\xa9nam', [''])[0] if audio.get('\xa9nam') else ''
-                info['artist'] = audio.get('\xa9ART', [''])[0] if audio.get('\xa9ART') else ''
-            
-            # Vorbis comments (FLAC, OGG, Opus)
-            elif isinstance(audio, (FLAC, OggVorbis, OggOpus)) or hasattr(audio, 'get'):
-                info['title'] = audio.get('title', [''])[0] if audio.get('title') else ''
-                info['artist'] = audio.get('artist', [''])[0] if audio.get('artist') else ''
-            
-            # ASF format (WMA)
-            elif isinstance(audio, ASF):
-                info['title'] = str(audio.get('Title', [''])[0]) if audio.get('Title') else ''
-                info['artist'] = str(audio.get('Author', [''])[0]) if audio.get('Author') else ''
-            
-            # Generic fallback for any format
-            if not info['title'] and not info['artist']:
-                # Try common tag names
-                common_title_tags = ['TIT2', 'TITLE', 'Title', '\xa9nam', 'title']
-                common_artist_tags = ['TPE1', 'ARTIST', 'Artist', '\xa9ART', 'artist', 'Author']
-                
-                for tag in common_title_tags:
-                    if hasattr(audio, 'get') and audio.get(tag):
-                        val = audio.get(tag)
-                        info['title'] = str(val[0] if isinstance(val, list) else val)
-                        break
-                
-                for tag in common_artist_tags:
-                    if hasattr(audio, 'get') and audio.get(tag):
-                        val = audio.get(tag)
-                        info['artist'] = str(val[0] if isinstance(val, list) else val)
-                        break
-            
-            # Final fallback to filename parsing
-            if not info['title']:
-                parsed = self.parse_filename(filepath.stem)
-                info['title'] = parsed['title'] or info['title']
-                info['artist'] = parsed['artist'] or info['artist']
-                
-        except Exception as e:
-            self.log(f"Error reading metadata from {filepath.name}: {e}")
-            return self.parse_filename(filepath.stem)
-        
-        return info
-    
-    def parse_filename(self, filename: str) -> dict:
-        """Parse artist and title from filename"""
-        # Try common patterns
-        patterns = [
-            r'^(?P<artist>[^-]+)\s*-\s*(?P<title>.+)$',
-            r'^(?P<title>[^-]+)\s*-\s*(?P<artist>.+)$',
-        ]
-        
-        import re
-        for pattern in patterns:
-            match = re.match(pattern, filename)
-            if match:
-                return {
-                    'title': match.group('title').strip() if 'title' in match.groupdict() else '',
-                    'artist': match.group('artist').strip() if 'artist' in match.groupdict() else ''
-                }
-        
-        return {'title': filename, 'artist': ''}
-    
-    def clean_lyrics(self, lyrics: str) -> str:
-        """Clean scraped lyrics from unwanted text patterns"""
-        if not lyrics:
-            return lyrics
-
-        import re
-
-        cleaned = lyrics
-
-        # Remove common unwanted patterns
-        unwanted_patterns = [
-            # Contributors and translation info
-            r'\d+\s*Contributors?',
-            r'Translations?\w*',
-            r'\d+\s*Embed',
-
-            # Song title repetition at start (e.g., "Love in My Pocket Lyrics")
-            r'^.*?Lyrics\s*',
-
-            # Language indicators
-            r'Español|Français|Deutsch|Italiano|Português|العربية|中文|日本語|한국어|Русский',
-
-            # Website metadata
-            r'genius\.com|azlyrics\.com|lyrics\.com',
-            r'\bgenius\b|\bazlyrics\b',
-
-            # Copyright and legal text
-            r'©.*?\d{4}',
-            r'All rights reserved',
-            r'Powered by.*$',
-
-            # Social media and sharing
-            r'Share on Facebook|Tweet|Share|Like|Follow',
-            r'www\.|http[s]?://',
-
-            # Advertisement text
-            r'Advertisement',
-            r'Sponsored',
-
-            # Navigation elements
-            r'Home|About|Contact|Privacy|Terms',
-
-            # Common metadata patterns
-            r'Album:|Artist:|Released:',
-            r'\bfrom the album\b',
-
-            # Multiple spaces, tabs, newlines
-            r'\s{3,}',
-            r'\t+',
-            r'\n{3,}'
-        ]
-
-        # Apply all patterns
-        for pattern in unwanted_patterns:
-            cleaned = re.sub(pattern, ' ', cleaned, flags=re.IGNORECASE | re.MULTILINE)
-
-        # Clean up structure
-        lines = [line.strip() for line in cleaned.split('\n')]
-        filtered_lines = []
-
-        for line in lines:
-            # Remove lines that are likely metadata
-            if len(line) == 0:
-                continue
-            if re.match(r'^\d+$', line):  # Just numbers
-                continue
-            if re.match(r'^[^\w]*$', line):  # Just punctuation
-                continue
-            if len(line) < 3 and not re.match(r'^[A-Za-z]+$', line):  # Very short non-word lines
-                continue
-            filtered_lines.append(line)
-
-        cleaned = '\n'.join(filtered_lines)
-        cleaned = re.sub(r'\n{2,}', '\n\n', cleaned)  # Max 2 consecutive newlines
-
-        return cleaned.strip()
-
-    def has_japanese_chars(self, text: str) -> bool:
-        """Check if text contains Japanese characters"""
-        import re
-        return bool(re.search(r'[\u3040-\u309F\u30A0-\u30FF\u4E00-\u9FAF]', text))
-
-    def fetch_lyrics_fallback(self, title: str, artist: str) -> Optional[str]:
-        """Fallback lyrics fetching using direct requests (no Puppeteer)"""
-        from urllib.parse import quote
-        import re
-
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-
-        # Check if this is a Japanese song
-        is_japanese = self.has_japanese_chars(title) or self.has_japanese_chars(artist)
-
-        if is_japanese:
-            # Try Japanese lyrics sites first
-            self.log(f"  Detected Japanese song, trying Japanese sites...")
-            lyrics = self.try_japanese_sites(title, artist, headers)
-            if lyrics:
-                self.log(f"  ✓ Found lyrics from Japanese site!")
-                return lyrics
-            else:
-                self.log(f"  Japanese sites failed, trying English sites...")
-
-        # Try Genius (works without JavaScript)
-        try:
-            # Better Unicode handling for Genius URLs
-            clean_artist = re.sub(r'[^\w\s-]', '', artist).strip().replace(' ', '-').lower()
-            clean_title = re.sub(r'[^\w\s-]', '', title).strip().replace(' ', '-').lower()
-
-            # Remove multiple dashes
-            clean_artist = re.sub(r'-+', '-', clean_artist).strip('-')
-            clean_title = re.sub(r'-+', '-', clean_title).strip('-')
-
-            if clean_artist and clean_title:
-                url = f"https://genius.com/{clean_artist}-{clean_title}-lyrics"
-
-                response = requests.get(url, headers=headers, timeout=10)
-
-                if response.status_code == 200:
-                    from bs4 import BeautifulSoup
-                    soup = BeautifulSoup(response.text, 'html.parser')
-
-                    # Look for lyrics containers
-                    lyrics_divs = soup.find_all('div', {'data-lyrics-container': 'true'})
-                    if lyrics_divs:
-                        lyrics_text = []
-                        for div in lyrics_divs:
-                            for br in div.find_all('br'):
-                                br.replace_with('\n')
-                            lyrics_text.append(div.get_text())
-                        raw_lyrics = '\n'.join(lyrics_text).strip()
-                        if len(raw_lyrics) > 50:
-                            return self.clean_lyrics(raw_lyrics)
-        except Exception as e:
-            pass  # Don't log every failure
-
-        # Try AZLyrics fallback
-        try:
-            clean_artist = re.sub(r'[^a-z0-9]', '', artist.lower())
-            clean_title = re.sub(r'[^a-z0-9]', '', title.lower())
-
-            if clean_artist and clean_title:
-                url = f"https://www.azlyrics.com/lyrics/{clean_artist}/{clean_title}.html"
-
-                response = requests.get(url, headers=headers, timeout=10)
-                if response.status_code == 200:
-                    from bs4 import BeautifulSoup
-                    soup = BeautifulSoup(response.text, 'html.parser')
-
-                    # Find lyrics div (usually the largest div without class/id)
-                    for div in soup.find_all('div'):
-                        if not div.get('class') and not div.get('id'):
-                            text = div.get_text().strip()
-                            if len(text) > 200 and '\n' in text:
-                                return self.clean_lyrics(text)
-        except Exception as e:
-            pass
-
-        return None
-
-    def try_japanese_sites(self, title: str, artist: str, headers: dict) -> Optional[str]:
-        """Try Japanese lyrics sites"""
-        from urllib.parse import quote
-
-        self.log(f"    Trying Utaten.com...")
-        # Try Utaten.com
-        try:
-            # Utaten search approach
-            search_query = f"{artist} {title}".strip()
-            encoded_query = quote(search_query)
-            search_url = f"https://utaten.com/search/?search_text={encoded_query}"
-
-            response = requests.get(search_url, headers=headers, timeout=15)
-            if response.status_code == 200:
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(response.text, 'html.parser')
-
-                # Look for search results and try first match
-                links = soup.find_all('a', href=True)
-                for link in links:
-                    href = link.get('href', '')
-                    if '/lyric/' in href and 'utaten.com' in href:
-                        lyrics = self.fetch_utaten_lyrics(href, headers)
-                        if lyrics:
-                            return lyrics
-                        break  # Only try first result
-        except Exception as e:
-            self.log(f"    Utaten failed: {e}")
-
-        self.log(f"    Trying J-Lyric.net...")
-        # Try J-Lyric.net
-        try:
-            # J-Lyric approach - direct search
-            search_query = f"{title} {artist}".strip()
-            encoded_query = quote(search_query.encode('utf-8'))
-            search_url = f"http://search.j-lyric.net/index.php?kt={encoded_query}"
-
-            response = requests.get(search_url, headers=headers, timeout=15)
-            if response.status_code == 200:
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(response.content, 'html.parser', from_encoding='utf-8')
-
-                # Look for lyric links
-                links = soup.find_all('a', href=True)
-                for link in links:
-                    href = link.get('href', '')
-                    if '/lyric.php?' in href:
-                        full_url = f"http://j-lyric.net{href}" if href.startswith('/') else href
-                        lyrics = self.fetch_jlyric_lyrics(full_url, headers)
-                        if lyrics:
-                            return lyrics
-                        break  # Only try first result
-        except Exception as e:
-            self.log(f"    J-Lyric failed: {e}")
-
-        self.log(f"    All Japanese sites failed")
-        return None
-
-    def fetch_utaten_lyrics(self, url: str, headers: dict) -> Optional[str]:
-        """Fetch lyrics from Utaten page"""
-        try:
-            response = requests.get(url, headers=headers, timeout=10)
-            if response.status_code == 200:
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(response.text, 'html.parser')
-
-                # Utaten lyrics container
-                lyrics_div = soup.find('div', class_='lyric')
-                if not lyrics_div:
-                    lyrics_div = soup.find('div', {'id': 'lyric'})
-
-                if lyrics_div:
-                    # Replace br tags with newlines
-                    for br in lyrics_div.find_all('br'):
-                        br.replace_with('\n')
-
-                    lyrics = lyrics_div.get_text().strip()
-                    if len(lyrics) > 50:
-                        return self.clean_lyrics(lyrics)
-        except Exception as e:
-            pass
-        return None
-
-    def fetch_jlyric_lyrics(self, url: str, headers: dict) -> Optional[str]:
-        """Fetch lyrics from J-Lyric page"""
-        try:
-            response = requests.get(url, headers=headers, timeout=10)
-            if response.status_code == 200:
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(response.content, 'html.parser', from_encoding='utf-8')
-
-                # J-Lyric lyrics container
-                lyrics_div = soup.find('p', {'id': 'Lyric'})
-                if not lyrics_div:
-                    lyrics_div = soup.find('div', {'id': 'Lyric'})
-
-                if lyrics_div:
-                    # Replace br tags with newlines
-                    for br in lyrics_div.find_all('br'):
-                        br.replace_with('\n')
-
-                    lyrics = lyrics_div.get_text().strip()
-                    if len(lyrics) > 50:
-                        return self.clean_lyrics(lyrics)
-        except Exception as e:
-            pass
-        return None
-    
-    def fetch_lyrics(self, title: str, artist: str) -> Optional[str]:
-        """Fetch lyrics using Puppeteer server with fallback"""
-        # Try Puppeteer first if server is ready
-        if self.server_ready:
-            try:
-                response = requests.post(
-                    f"{self.scraper_url}/scrape",
-                    json={'title': title, 'artist': artist},
-                    timeout=30
-                )
-                if response.status_code == 200:
-                    data = response.json()
-                    lyrics = data.get('lyrics')
-                    if lyrics and len(lyrics.strip()) > 50:  # Ensure we got meaningful lyrics
-                        return lyrics
-                elif response.status_code >= 500:
-                    # Server error, mark as not ready
-                    self.server_ready = False
-                    self.server_status_label.config(text="Server: Error", foreground="red")
-            except requests.exceptions.ConnectionError:
-                # Server died, mark as not ready
-                self.server_ready = False
-                self.server_status_label.config(text="Server: Disconnected", foreground="red")
-                self.log("Server connection lost, using fallback...")
-            except Exception as e:
-                self.log(f"Puppeteer error: {e}")
-
-        # Fallback to direct scraping (don't log error if server wasn't ready)
-        if not self.server_ready:
-            pass  # Server wasn't available, use fallback silently
-        else:
-            self.log("Puppeteer failed, using fallback...")
-
-        return self.fetch_lyrics_fallback(title, artist)
-    
-    def write_lyrics(self, filepath: Path, lyrics: str) -> bool:
-        """Write lyrics to audio file"""
-        try:
-            audio = mutagen.File(str(filepath))
-            if not audio:
-                return False
-            
-            # Handle different audio formats
-            if isinstance(audio, MP3) or (hasattr(audio, 'tags') and hasattr(audio.tags, 'add')):
-                # MP3 and other ID3-tagged formats
-                if audio.tags is None:
-                    audio.add_tags()
-                audio.tags.add(USLT(encoding=3, lang='eng', desc='', text=lyrics))
-            
-            elif isinstance(audio, (MP4, AAC)) or (hasattr(audio, 'mime') and 'mp4' in str(audio.mime)):
-                # MP4/M4A/AAC format
-                audio['\xa9lyr'] = lyrics
-            
-            elif isinstance(audio, (FLAC, OggVorbis, OggOpus)):
-                # Vorbis comments (FLAC, OGG, Opus) - MP3Tag compatible fields
-                audio['LYRICS'] = lyrics
-                audio['UNSYNCED LYRICS'] = lyrics  # MP3Tag uses this exact field name
-            
-            elif isinstance(audio, ASF):
-                # WMA format
-                audio['WM/Lyrics'] = lyrics
-            
-            elif isinstance(audio, WAVE):
-                # WAV files - try to add ID3 tags
-                if not hasattr(audio, 'tags') or audio.tags is None:
-                    audio.add_tags()
-                audio.tags.add(USLT(encoding=3, lang='eng', desc='', text=lyrics))
-            
-            else:
-                # Generic fallback - try common approaches
-                if hasattr(audio, '__setitem__'):
-                    # Try vorbis-style first
-                    try:
-                        audio['lyrics'] = lyrics
-                    except:
-                        try:
-                            audio['LYRICS'] = lyrics
-                        except:
-                            try:
-                                audio['\xa9lyr'] = lyrics
-                            except:
-                                self.log(f"Unsupported format for lyrics: {filepath.suffix}")
-                                return False
-                else:
-                    self.log(f"Cannot write lyrics to format: {filepath.suffix}")
-                    return False
-            
-            audio.save()
-            return True
-            
-        except Exception as e:
-            self.log(f"Error writing lyrics to {filepath.name}: {e}")
-            return False
-    
-    def check_has_lyrics(self, filepath: Path) -> bool:
-        """Check if file already has lyrics"""
-        try:
-            audio = mutagen.File(str(filepath))
-            if not audio:
-                return False
-            
-            # Check for ID3 USLT frames (MP3, WAV)
-            if hasattr(audio, 'tags') and audio.tags:
-                if any(hasattr(frame, 'FrameID') and frame.FrameID == 'USLT' for frame in audio.tags.values()):
-                    return True
-            
-            # Check MP4/M4A/AAC format
-            if isinstance(audio, (MP4, AAC)) or (hasattr(audio, 'mime') and 'mp4' in str(audio.mime)):
-                return '\xa9lyr' in audio
-            
-            # Check Vorbis comments (FLAC, OGG, Opus)
-            elif isinstance(audio, (FLAC, OggVorbis, OggOpus)):
-                return 'LYRICS' in audio or 'lyrics' in audio or 'UNSYNCED LYRICS' in audio
-            
-            # Check WMA format
-            elif isinstance(audio, ASF):
-                return 'WM/Lyrics' in audio or 'Lyrics' in audio
-            
-            # Generic check for any format
-            else:
-                # Check common lyrics field names
-                lyrics_fields = ['lyrics', 'LYRICS', '\xa9lyr', 'WM/Lyrics', 'Lyrics']
-                for field in lyrics_fields:
-                    if hasattr(audio, '__contains__') and field in audio:
-                        lyrics_content = audio.get(field)
-                        if lyrics_content and (isinstance(lyrics_content, list) and lyrics_content[0] or lyrics_content):
-                            return True
-                
-        except Exception as e:
-            self.log(f"Error checking lyrics in {filepath.name}: {e}")
-        
-        return False
-    
     def update_stats_display(self):
         """Update the statistics display"""
+        stats = self.engine.stats
         self.stats_label.config(
-            text=f"Success: {self.stats['success']} | Failed: {self.stats['failed']} | Skipped: {self.stats['skipped']}"
+            text=f"Success: {stats['success']} | Failed: {stats['failed']} | Skipped: {stats['skipped']}"
         )
 
-    def reset_stats(self):
-        """Reset statistics counters"""
-        self.stats = {'success': 0, 'failed': 0, 'skipped': 0}
-        self.failed_files = []
-        self.show_failed_button.config(state=tk.DISABLED)
-        self.update_stats_display()
-
-    def check_server_health(self):
-        """Check if Puppeteer server is still alive"""
-        if not self.server_ready:
-            return False
-
-        try:
-            response = requests.post(f"{self.scraper_url}/init", timeout=3)
-            return response.status_code == 200
-        except:
-            self.server_ready = False
-            self.server_status_label.config(text="Server: Disconnected", foreground="red")
-            return False
-
     def process_files(self):
-        """Process all selected files"""
-        self.log("Scanning for audio files...")
-        self.status_var.set("Scanning for audio files...")
-
-        # Check server health before starting
-        if self.server_ready:
-            if self.check_server_health():
-                self.log("✓ Puppeteer server is ready")
-            else:
-                self.log("⚠ Puppeteer server not responding, using fallback mode")
-
-        # Get audio files with progress
-        audio_files = self.get_audio_files(show_progress=True)
-        total = len(audio_files)
-
-        if total == 0:
-            self.log("No audio files found with selected extensions")
-            self.status_var.set("No audio files found")
-            return
-
-        # Reset stats for new processing session
-        self.reset_stats()
+        """Process all selected files (runs on the processing thread)"""
+        stats = self.engine.process_files(self.selected_files)
 
-        self.log(f"Found {total} audio files to process")
-        self.log("=" * 50)
-
-        # Warn if very large number of files
-        if total > 1000:
-            self.log(f"⚠ Large library detected ({total} files). This may take a while...")
-
-        success = 0
-        skipped = 0
-        failed = 0
-        
-        for i, filepath in enumerate(audio_files):
-            if not self.processing:
-                break
-            
-            # Update progress
-            progress = ((i + 1) / total) * 100
-            self.progress_var.set(progress)
-            self.status_var.set(f"Processing {i + 1}/{total}: {filepath.name}")
-            
-            self.log(f"\n[{i + 1}/{total}] Processing: {filepath.name}")
-            
-            # Check if has lyrics
-            if not self.overwrite_var.get() and self.check_has_lyrics(filepath):
-                self.log("  ✓ Already has lyrics, skipping")
-                skipped += 1
-                self.stats['skipped'] += 1
-                self.update_stats_display()
-                continue
-
-            # Read metadata
-            info = self.read_metadata(filepath)
-            if not info['title']:
-                self.log("  ✗ Could not determine song title")
-                failed += 1
-                self.stats['failed'] += 1
-                self.failed_files.append({
-                    'file': filepath.name,
-                    'path': str(filepath),
-                    'reason': 'Could not determine song title'
-                })
-                self.update_stats_display()
-                continue
-
-            self.log(f"  Song: {info['title']}")
-            self.log(f"  Artist: {info['artist'] or 'Unknown'}")
-
-            # Fetch lyrics
-            self.log("  Searching for lyrics...")
-            lyrics = self.fetch_lyrics(info['title'], info['artist'])
-
-            if lyrics:
-                # Write lyrics
-                if self.write_lyrics(filepath, lyrics):
-                    self.log("  ✓ Successfully added lyrics!")
-                    success += 1
-                    self.stats['success'] += 1
-                    self.update_stats_display()
-                else:
-                    self.log("  ✗ Failed to write lyrics")
-                    failed += 1
-                    self.stats['failed'] += 1
-                    self.failed_files.append({
-                        'file': filepath.name,
-                        'path': str(filepath),
-                        'reason': 'Failed to write lyrics to file',
-                        'title': info['title'],
-                        'artist': info['artist'] or 'Unknown'
-                    })
-                    self.update_stats_display()
-            else:
-                self.log("  ✗ No lyrics found")
-                failed += 1
-                self.stats['failed'] += 1
-                self.failed_files.append({
-                    'file': filepath.name,
-                    'path': str(filepath),
-                    'reason': 'No lyrics found online',
-                    'title': info['title'],
-                    'artist': info['artist'] or 'Unknown'
-                })
-                self.update_stats_display()
-            
-            # Small delay
-            time.sleep(0.5)
-        
-        # Final summary
-        self.log("\n" + "=" * 60)
-        self.log("🎵 PROCESSING COMPLETED! 🎵")
-        self.log("=" * 60)
-        self.log(f"📊 FINAL STATISTICS:")
-        self.log(f"   ✓ Successfully processed: {success}/{total} ({success/total*100:.1f}%)")
-        self.log(f"   ⊖ Skipped (already have lyrics): {skipped}/{total} ({skipped/total*100:.1f}%)")
-        self.log(f"   ✗ Failed to process: {failed}/{total} ({failed/total*100:.1f}%)")
-        self.log("=" * 60)
-
-        if success > 0:
-            self.log(f"🎉 Great! {success} files now have lyrics!")
-        if failed > 0:
-            self.log(f"💡 Tip: Failed files might have unusual titles or artists")
-            self.log(f"📋 Click 'Show Failed Files' to see details")
-            self.show_failed_button.config(state=tk.NORMAL)
-            self.save_failed_files_report()
-
-        self.status_var.set(f"Completed - Success: {success}, Skipped: {skipped}, Failed: {failed}")
+        if stats['failed'] > 0:
+            self.log("📋 Click 'Show Failed Files' to see details")
+            self.in_ui(self.show_failed_button.config)({'state': tk.NORMAL})
     
     def start_processing(self):
         """Start processing in a separate thread"""
@@ -1236,6 +506,12 @@ class LyricsApp:
             messagebox.showwarning("No Files", "Please select files or a folder first")
             return
         
+        # Options are read here: Tk variables belong to this thread
+        self.show_failed_button.config(state=tk.DISABLED)
+        self.engine.overwrite = self.overwrite_var.get()
+        self.engine.skip_instrumentals = self.skip_instrumentals_var.get()
+        self.engine.file_types = {file_type: var.get() for file_type, var in self.file_types.items()}
+
         self.processing = True
         self.start_button.config(state=tk.DISABLED)
         self.stop_button.config(state=tk.NORMAL)
@@ -1251,6 +527,7 @@ class LyricsApp:
             if thread.is_alive():
                 self.root.after(100, check_thread)
             else:
+                self.apply_ui_updates()  # The last log lines and progress first
                 self.processing = False
                 self.start_button.config(state=tk.NORMAL)
                 self.stop_button.config(state=tk.DISABLED)
@@ -1265,50 +542,10 @@ class LyricsApp:
         self.log("\nProcessing stopped by user")
         self.status_var.set("Stopped")
     
-    def save_failed_files_report(self):
-        """Save a report of failed files to a text file"""
-        if not self.failed_files:
-            return
-
-        try:
-            from datetime import datetime
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            report_file = f"failed_lyrics_report_{timestamp}.txt"
-
-            with open(report_file, 'w', encoding='utf-8') as f:
-                f.write("=" * 60 + "\n")
-                f.write("FAILED LYRICS REPORT\n")
-                f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write("=" * 60 + "\n\n")
-
-                f.write(f"Total failed files: {len(self.failed_files)}\n\n")
-
-                # Group by reason
-                by_reason = {}
-                for item in self.failed_files:
-                    reason = item['reason']
-                    if reason not in by_reason:
-                        by_reason[reason] = []
-                    by_reason[reason].append(item)
-
-                for reason, files in by_reason.items():
-                    f.write(f"\n{reason.upper()} ({len(files)} files):\n")
-                    f.write("-" * 40 + "\n")
-                    for file_info in files:
-                        f.write(f"  File: {file_info['file']}\n")
-                        if 'title' in file_info:
-                            f.write(f"    Title: {file_info['title']}\n")
-                            f.write(f"    Artist: {file_info['artist']}\n")
-                        f.write(f"    Path: {file_info['path']}\n\n")
-
-            self.log(f"📄 Failed files report saved: {report_file}")
-
-        except Exception as e:
-            self.log(f"Error saving report: {e}")
-
     def show_failed_files(self):
         """Show a window with failed files details"""
-        if not self.failed_files:
+        failures = self.engine.failures
+        if not len(failures):
             messagebox.showinfo("No Failed Files", "No files failed to get lyrics!")
             return
 
@@ -1326,7 +563,7 @@ class LyricsApp:
         main_frame.rowconfigure(1, weight=1)
 
         # Title
-        title_label = ttk.Label(main_frame, text=f"Failed to Get Lyrics: {len(self.failed_files)} Files",
+        title_label = ttk.Label(main_frame, text=f"Failed to Get Lyrics: {len(failures)} Files",
                                font=('Arial', 14, 'bold'))
         title_label.grid(row=0, column=0, pady=(0, 10))
 
@@ -1339,26 +576,27 @@ class LyricsApp:
         text_widget = scrolledtext.ScrolledText(text_frame, wrap=tk.WORD, width=80, height=25)
         text_widget.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
 
-        # Group by reason
-        by_reason = {}
-        for item in self.failed_files:
-            reason = item['reason']
-            if reason not in by_reason:
-                by_reason[reason] = []
-            by_reason[reason].append(item)
-
-        # Display the information
-        for reason, files in by_reason.items():
-            text_widget.insert(tk.END, f"\n{reason.upper()} ({len(files)} files):\n", 'header')
+        # Display the information grouped by reason, streamed from the failure
+        # log on disk; very long lists are cut off (the saved report has all)
+        shown = 0
+        for reason, count in failures.counts.items():
+            text_widget.insert(tk.END, f"\n{reason.upper()} ({count} files):\n", 'header')
             text_widget.insert(tk.END, "-" * 60 + "\n")
 
-            for file_info in files:
+            for file_info in failures.iter_entries(reason):
+                if shown >= MAX_FAILED_SHOWN:
+                    break
+                shown += 1
                 text_widget.insert(tk.END, f"  📁 {file_info['file']}\n", 'filename')
                 if 'title' in file_info:
                     text_widget.insert(tk.END, f"      Title: {file_info['title']}\n")
                     text_widget.insert(tk.END, f"      Artist: {file_info['artist']}\n")
                 text_widget.insert(tk.END, f"      Path: {file_info['path']}\n\n")
 
+        if shown >= MAX_FAILED_SHOWN:
+            text_widget.insert(tk.END, f"\n... only the first {MAX_FAILED_SHOWN} files are shown, "
+                                       f"see {failures.path} for the full list\n", 'header')
+
         # Configure text tags
         text_widget.tag_config('header', font=('Arial', 11, 'bold'), foreground='#0066cc')
         text_widget.tag_config('filename', font=('Arial', 10, 'bold'))
@@ -1379,6 +617,32 @@ class LyricsApp:
         ttk.Button(button_frame, text="Copy to Clipboard", command=copy_to_clipboard).grid(row=0, column=0, padx=5)
         ttk.Button(button_frame, text="Close", command=failed_window.destroy).grid(row=0, column=1, padx=5)
 
+    def find_job_server(self):
+        """Probe for a running job server in the background; use it if it answers,
+        otherwise start this window's own Node.js server"""
+        found = []
+
+        def probe():
+            from job_client import find_server
+            found.append(find_server())
+
+        thread = threading.Thread(target=probe, daemon=True)
+        thread.start()
+
+        def check_probe():
+            if thread.is_alive():
+                self.root.after(50, check_probe)
+            elif found[0] is not None and not self.processing:
+                from job_client import RemoteEngine
+                local_engine = self.engine
+                self.engine = RemoteEngine(found[0], **self.engine_callbacks)
+                local_engine.shutdown()
+                self.engine.connect_server()
+            elif self.autostart_server:
+                self.engine.start_server()
+
+        check_probe()
+
     def on_closing(self):
         """Clean up when closing"""
         if self.processing:
@@ -1386,20 +650,24 @@ class LyricsApp:
                 return
 
         # Stop Node.js server
-        if self.node_process:
-            try:
-                requests.post(f"{self.scraper_url}/close", timeout=2)
-            except:
-                pass
-            self.node_process.terminate()
+        self.engine.shutdown()
 
         self.root.destroy()
 
 
-def main():
+def build_app(autostart_server: bool = True, job_server=None, find_job_server: bool = False):
+    """Create the root window and the application"""
     # Use TkinterDnD for drag and drop support
+    from tkinterdnd2 import TkinterDnD
     root = TkinterDnD.Tk()
-    app = LyricsApp(root)
+    app = LyricsApp(root, autostart_server=autostart_server, job_server=job_server,
+                    find_job_server=find_job_server)
+    return root, app
+
+
+def main():
+    # Use a running job server (job_server.py) instead of starting a browser
+    root, app = build_app(find_job_server=True)
     root.mainloop()
 
 
@@ -0,0 +1,100 @@
+"""
+Streaming page reads
+Reads an HTML response in chunks through an incremental parser and stops as
+soon as the element holding the lyrics has been closed, so the scripts, ads
+and footer after it are neither downloaded nor parsed. The extractors then
+parse only the part that was read.
+"""
+
+from html.parser import HTMLParser
+from typing import NamedTuple, Optional, Tuple
+
+CHUNK_SIZE = 16 * 1024
+
+
+class Container(NamedTuple):
+    """Where a site keeps its lyrics.
+
+    attrs maps attribute names to the required value (a class matches any
+    of its tokens) or to None for "must not have this attribute". With
+    scope 'parent' reading goes on until the container's parent closes, for
+    sites that split the lyrics over several sibling containers.
+    """
+    tag: str
+    attrs: dict
+    after_comment: Optional[str] = None  # only match after a comment containing this
+    scope: str = 'element'  # or 'parent'
+
+
+class ContainerWatch(HTMLParser):
+    """Incremental parser that notices when a lyrics container has closed"""
+
+    def __init__(self, containers):
+        # Tags and attributes only need ASCII, so pages are fed as Latin-1;
+        # that never fails and keeps UTF-8/Shift_JIS/EUC-JP markup intact
+        super().__init__(convert_charrefs=False)
+        self.containers = containers
+        self.seen_comments = set()
+        self.open_tag = None
+        self.depth = 0
+        self.complete = False
+
+    def _matches(self, container: Container, tag: str, attrs: dict) -> bool:
+        if tag != container.tag:
+            return False
+        if container.after_comment and container.after_comment not in self.seen_comments:
+            return False
+        for name, value in container.attrs.items():
+            actual = attrs.get(name)
+            if value is None:
+                if actual:
+                    return False
+            elif actual is None or (value not in actual.split() if name == 'class' else actual != value):
+                return False
+        return True
+
+    def handle_starttag(self, tag, attrs):
+        if self.complete:
+            return
+        if self.open_tag is not None:
+            # Only tags like the container's can close it (or its parent)
+            if tag == self.open_tag:
+                self.depth += 1
+            return
+        for container in self.containers:
+            if self._matches(container, tag, dict(attrs)):
+                self.open_tag = tag
+                self.depth = 2 if container.scope == 'parent' else 1
+                return
+
+    def handle_endtag(self, tag):
+        if self.complete or tag != self.open_tag:
+            return
+        self.depth -= 1
+        if self.depth == 0:
+            self.complete = True
+
+    def handle_comment(self, data):
+        for container in self.containers:
+            if container.after_comment and container.after_comment in data:
+                self.seen_comments.add(container.after_comment)
+
+
+def read_until_closed(response, containers, chunk_size: int = CHUNK_SIZE) -> Tuple[bytes, bool]:
+    """Body of a streamed requests response up to the end of the lyrics container.
+
+    Returns the bytes read and whether the container was found complete
+    (otherwise the whole body was read). The connection is closed early
+    when the rest is not needed.
+    """
+    watch = ContainerWatch(containers)
+    chunks = []
+    try:
+        for chunk in response.iter_content(chunk_size):
+            chunks.append(chunk)
+            watch.feed(chunk.decode('latin-1'))
+            if watch.complete:
+                break
+    finally:
+        response.close()
+    return b''.join(chunks), watch.complete
@@ -0,0 +1,119 @@
+"""
+Instrumental track detection
+Intros, interludes, karaoke and off-vocal versions have no lyrics to find, so
+they are recognised before the lookup (title keywords, genre tag and,
+optionally, how much of the audio's energy sits in the vocal band) and skipped
+without touching the network.
+"""
+
+import re
+import shutil
+import subprocess
+import wave
+from pathlib import Path
+from typing import Optional
+
+TITLE_KEYWORDS_RE = re.compile(
+    r'\b(?:instrumental|off[\s-]?vocal|inst\.?|karaoke|intro(?:duction)?|interlude|backing[\s-]track)(?!\w)'
+    r'|インスト|オフボーカル|カラオケ',
+    re.IGNORECASE
+)
+
+INSTRUMENTAL_GENRES = {'instrumental', 'karaoke', 'bgm', 'off vocal'}
+
+# Vocal-band check on a decoded excerpt (needs NumPy; WAV natively, other
+# formats through ffmpeg when it is installed)
+VOCAL_BAND_HZ = (300, 3400)
+EXCERPT_START = 30.0  # skip the intro, where vocals often have not started
+EXCERPT_SECONDS = 30.0
+SAMPLE_RATE = 16000
+DEFAULT_VOCAL_THRESHOLD = 0.2  # below this share of energy in the vocal band → instrumental
+
+
+def title_reason(title: str) -> Optional[str]:
+    match = TITLE_KEYWORDS_RE.search(title or '')
+    return f"title mentions '{match.group(0)}'" if match else None
+
+
+def genre_reason(genre: str) -> Optional[str]:
+    if (genre or '').strip().casefold() in INSTRUMENTAL_GENRES:
+        return f"genre is '{genre.strip()}'"
+    return None
+
+
+def _decode_wav(filepath: Path, np):
+    with wave.open(str(filepath), 'rb') as wav:
+        if wav.getsampwidth() != 2:
+            return None, 0
+        rate, channels = wav.getframerate(), wav.getnchannels()
+        start = min(int(EXCERPT_START * rate), max(0, wav.getnframes() - int(EXCERPT_SECONDS * rate)))
+        wav.setpos(start)
+        frames = wav.readframes(int(EXCERPT_SECONDS * rate))
+    samples = np.frombuffer(frames, dtype='<i2').astype(np.float32)
+    if channels > 1:
+        samples = samples[:len(samples) // channels * channels].reshape(-1, channels).mean(axis=1)
+    return samples, rate
+
+
+def _decode_ffmpeg(filepath: Path, np):
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg:
+        return None, 0
+    result = subprocess.run(
+        [ffmpeg, '-v', 'quiet', '-ss', str(EXCERPT_START), '-t', str(EXCERPT_SECONDS),
+         '-i', str(filepath), '-ac', '1', '-ar', str(SAMPLE_RATE), '-f', 's16le', '-'],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=30
+    )
+    if result.returncode != 0 or not result.stdout:
+        # Shorter than EXCERPT_START: take the start of the track instead
+        result = subprocess.run(
+            [ffmpeg, '-v', 'quiet', '-t', str(EXCERPT_SECONDS), '-i', str(filepath),
+             '-ac', '1', '-ar', str(SAMPLE_RATE), '-f', 's16le', '-'],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=30
+        )
+    samples = np.frombuffer(result.stdout, dtype='<i2').astype(np.float32)
+    return samples, SAMPLE_RATE
+
+
+def vocal_band_ratio(filepath: Path) -> Optional[float]:
+    """Share of spectral energy in the vocal band, or None if it cannot be measured"""
+    try:
+        import numpy as np
+    except ImportError:
+        return None
+
+    filepath = Path(filepath)
+    try:
+        if filepath.suffix.lower() in ('.wav', '.wave'):
+            samples, rate = _decode_wav(filepath, np)
+        else:
+            samples, rate = _decode_ffmpeg(filepath, np)
+    except (OSError, EOFError, wave.Error, subprocess.SubprocessError):
+        return None
+    if samples is None or len(samples) < rate:  # under a second of audio
+        return None
+
+    power = np.abs(np.fft.rfft(samples)) ** 2
+    freqs = np.fft.rfftfreq(len(samples), 1.0 / rate)
+    total = power[freqs > 20].sum()
+    if total <= 0:
+        return None
+    low, high = VOCAL_BAND_HZ
+    return float(power[(freqs >= low) & (freqs <= high)].sum() / total)
+
+
+def instrumental_reason(title: str, genre: str = '', filepath: Optional[Path] = None,
+                        vocal_threshold: float = DEFAULT_VOCAL_THRESHOLD) -> Optional[str]:
+    """Why a track is probably instrumental, or None.
+
+    The audio check only runs when a filepath is given, and only after the
+    cheap tag checks found nothing.
+    """
+    reason = title_reason(title) or genre_reason(genre)
+    if reason or filepath is None:
+        return reason
+
+    ratio = vocal_band_ratio(filepath)
+    if ratio is not None and ratio < vocal_threshold:
+        return f"little vocal-band energy ({ratio:.0%})"
+    return None
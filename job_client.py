@@ -0,0 +1,259 @@
+"""
+Job server client
+Talks to a running job server (job_server.py) over HTTP or its Unix socket.
+RemoteEngine stands in for LyricsEngine in the GUI and the command line:
+process_files() submits a job and relays its log, progress and stats until
+it finishes, so they drive the shared engine exactly like a local one.
+"""
+
+import http.client
+import json
+import os
+import socket
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+from urllib.parse import quote, urlsplit
+
+# Where a running job server leaves its address for clients to find
+DEFAULT_STATE_PATH = Path.home() / '.lyrics_updater' / 'job_server.json'
+
+# Secret from the state file that every POST must carry
+TOKEN_HEADER = 'X-Job-Token'
+
+POLL_INTERVAL = 0.5
+FINISHED_STATES = ('done', 'stopped', 'failed')
+
+# Engine settings a job may carry (everything else is the server's)
+JOB_OPTIONS = ('overwrite', 'file_types', 'skip_instrumentals', 'detect_vocals', 'lyrics_fields',
+               'output', 'sidecar_format', 'schedule', 'scan_workers', 'harvest_first')
+
+
+def _ignore(*args, **kwargs):
+    pass
+
+
+class JobServerError(Exception):
+    """The job server could not be reached or refused a request"""
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP over a Unix domain socket"""
+
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class JobClient:
+    """JSON calls to a job server at 'http://127.0.0.1:<port>' or 'unix:<path>'"""
+
+    def __init__(self, address: str, token: str = '', timeout: float = 10.0):
+        self.address = address
+        self.token = token
+        self.timeout = timeout
+
+    def _connection(self, timeout: float):
+        if self.address.startswith('unix:'):
+            return UnixHTTPConnection(self.address[len('unix:'):], timeout)
+        parts = urlsplit(self.address)
+        return http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+
+    def request(self, method: str, path: str, body=None, timeout: Optional[float] = None) -> dict:
+        connection = self._connection(timeout or self.timeout)
+        try:
+            payload = json.dumps(body).encode('utf-8') if body is not None else None
+            headers = {TOKEN_HEADER: self.token}
+            if payload is not None:
+                headers['Content-Type'] = 'application/json'
+            connection.request(method, path, payload, headers)
+            response = connection.getresponse()
+            data = json.loads(response.read().decode('utf-8') or '{}')
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            raise JobServerError(f"Job server at {self.address} not reachable: {e}") from e
+        finally:
+            connection.close()
+        if response.status >= 400:
+            raise JobServerError(data.get('error') or f"HTTP {response.status}")
+        return data
+
+    def status(self, timeout: Optional[float] = None) -> dict:
+        return self.request('GET', '/status', timeout=timeout)
+
+    def submit(self, paths, options: Optional[dict] = None) -> dict:
+        return self.request('POST', '/jobs', {'paths': list(paths), 'options': options or {}})
+
+    def jobs(self) -> list:
+        return self.request('GET', '/jobs')['jobs']
+
+    def job(self, job_id: int, since: int = 0) -> dict:
+        return self.request('GET', f"/jobs/{job_id}?since={since}")
+
+    def failures(self, job_id: int, reason: Optional[str] = None) -> list:
+        query = f"?reason={quote(reason)}" if reason else ''
+        return self.request('GET', f"/jobs/{job_id}/failures{query}")['failures']
+
+    def stop(self, job_id: int) -> dict:
+        return self.request('POST', f"/jobs/{job_id}/stop", {})
+
+
+def find_server(address: Optional[str] = None, state_path=DEFAULT_STATE_PATH) -> Optional[JobClient]:
+    """A client for the given or the running job server, or None if none answers.
+
+    Without an address, LYRICS_JOB_SERVER and then the state file the server
+    writes on startup are used. The token comes from LYRICS_JOB_TOKEN, or from
+    the state file when it describes the same server.
+    """
+    try:
+        state = json.loads(Path(state_path).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        state = {}
+    address = address or os.environ.get('LYRICS_JOB_SERVER') or state.get('address')
+    if not address:
+        return None
+    token = os.environ.get('LYRICS_JOB_TOKEN')
+    if token is None:
+        token = state.get('token', '') if state.get('address') == address else ''
+    client = JobClient(address, token)
+    try:
+        client.status(timeout=2)
+    except JobServerError:
+        return None
+    return client
+
+
+class RemoteFailures:
+    """Failed files of a remote job; the parts of FailureLog the GUI reads"""
+
+    def __init__(self, client: Optional[JobClient] = None, job_id: Optional[int] = None,
+                 counts: Optional[dict] = None, path: Optional[str] = None):
+        self.client = client
+        self.job_id = job_id
+        self.counts = counts or {}
+        self.path = path
+
+    def __len__(self):
+        return sum(self.counts.values())
+
+    def iter_entries(self, reason: Optional[str] = None) -> Iterator[dict]:
+        if self.client is None or not self.counts:
+            return iter(())
+        return iter(self.client.failures(self.job_id, reason))
+
+
+class RemoteEngine:
+    """Runs jobs on a job server; has the LyricsEngine surface the GUI and CLI use"""
+
+    def __init__(self, client: JobClient, log=print, on_status=_ignore, on_progress=_ignore,
+                 on_stats=_ignore, on_server_status=_ignore):
+        self.client = client
+        self.log = log
+        self.on_status = on_status
+        self.on_progress = on_progress
+        self.on_stats = on_stats
+        self.on_server_status = on_server_status
+
+        self.overwrite = False
+        self.file_types = None  # None = the server's default
+        self.skip_instrumentals = True
+        self.options = {}  # any other JOB_OPTIONS
+        self.stats = {'success': 0, 'failed': 0, 'skipped': 0, 'deferred': 0}
+        self.failures = RemoteFailures()
+        self.job_id = None
+        self._processing = False
+        self._running = False  # our job is queued or running on the server
+
+    @property
+    def processing(self) -> bool:
+        return self._processing
+
+    @processing.setter
+    def processing(self, value: bool):
+        self._processing = value
+        if not value and self._running:
+            try:
+                self.client.stop(self.job_id)
+            except JobServerError as e:
+                self.log(f"⚠ Could not stop job {self.job_id}: {e}")
+
+    def start_server(self):
+        """Nothing to start: report the job server's state instead"""
+        self.connect_server()
+
+    def connect_server(self) -> bool:
+        try:
+            status = self.client.status(timeout=2)
+        except JobServerError as e:
+            self.log(f"✗ {e}")
+            self.on_server_status("Job server: Offline", "red")
+            return False
+        browser = "browser ready" if status.get('browser_ready') else "no browser"
+        self.log(f"✓ Using job server at {self.client.address} ({browser})")
+        self.on_server_status(f"Job server: Ready ✓ ({browser})", "green")
+        self.on_status("Connected to job server - Ready to process files")
+        return True
+
+    def shutdown(self):
+        """Stop our job if it is still running; the server keeps running"""
+        self.processing = False
+
+    def job_options(self) -> dict:
+        options = dict(self.options, overwrite=self.overwrite, skip_instrumentals=self.skip_instrumentals)
+        if self.file_types is not None:
+            options['file_types'] = self.file_types
+        return options
+
+    def process_files(self, paths) -> dict:
+        """Submit the paths as a job and follow it until it finishes"""
+        self._processing = True
+        # The server has its own working directory
+        paths = [str(Path(path).resolve()) for path in paths]
+        try:
+            job = self.client.submit(paths, self.job_options())
+        except JobServerError as e:
+            self.log(f"✗ Could not submit job: {e}")
+            self.on_status("Job server not reachable")
+            self._processing = False
+            return self.stats
+        self.job_id = job['id']
+        self._running = True
+        if job['position']:
+            self.log(f"⏳ Job {self.job_id} queued behind {job['position']} other job(s)")
+
+        since, progress, status = 0, None, None
+        try:
+            while True:
+                try:
+                    job = self.client.job(self.job_id, since)
+                except JobServerError as e:
+                    self.log(f"✗ Lost the job server: {e}")
+                    break
+                for line in job['log']:
+                    self.log(line)
+                since = job['log_next']
+                if job['progress'] != progress:
+                    progress = job['progress']
+                    self.on_progress(progress['processed'], progress['discovered'], progress['scan_complete'])
+                if job['stats'] != self.stats:
+                    self.stats = job['stats']
+                    self.on_stats(self.stats)
+                if job['status'] != status:
+                    status = job['status']
+                    self.on_status(status)
+                if job['state'] in FINISHED_STATES:
+                    self._running = False
+                    if job['error']:
+                        self.log(f"✗ Job failed: {job['error']}")
+                    break
+                time.sleep(POLL_INTERVAL)
+        finally:
+            # Interrupted (Ctrl+C) while the job still runs: stop it on the server too
+            self.processing = False
+            self._running = False
+        self.failures = RemoteFailures(self.client, self.job_id, job.get('failures'), job.get('failure_log'))
+        return self.stats
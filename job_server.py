@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+Local job server
+One long-running process holds a single engine with everything that is slow
+to warm up: the Puppeteer server and its browser, the lookup memo, the
+harvest map and the page cache. The GUI, the command line (--server) and
+scripts submit jobs to it instead of each starting their own browser; jobs
+run one at a time, in submission order.
+
+API (JSON, on 127.0.0.1 or a Unix socket; POSTs need the token from the state
+file in an X-Job-Token header and a JSON Content-Type):
+  POST /jobs                {"paths": [...], "options": {...}} -> {"id", "position"}
+  GET  /jobs                all jobs
+  GET  /jobs/<id>?since=N   state, progress, stats and the log lines after N
+  GET  /jobs/<id>/failures  failed files of a job (?reason=... for one reason)
+  POST /jobs/<id>/stop      stop a queued or running job
+  GET  /status              server state
+  GET  /metrics             Prometheus metrics of the engine
+"""
+
+import argparse
+import copy
+import hmac
+import itertools
+import json
+import os
+import queue
+import re
+import secrets
+import signal
+import socket
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from socketserver import ThreadingMixIn
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+from job_client import DEFAULT_STATE_PATH, FINISHED_STATES, JOB_OPTIONS, TOKEN_HEADER
+from lookup_memo import DEFAULT_MEMO_PATH
+from lyrics_engine import LyricsEngine
+from lyrics_harvest import DEFAULT_HARVEST_PATH
+from page_cache import DEFAULT_MAX_MB, DEFAULT_PAGE_CACHE_PATH
+
+# Log lines kept per job for clients that poll late
+MAX_JOB_LOG_LINES = 5000
+
+# Finished jobs kept for /jobs; older ones are forgotten
+MAX_FINISHED_JOBS = 50
+
+_JOB_PATH_RE = re.compile(r'^/jobs/(\d+)(/failures|/stop)?$')
+
+
+class Job:
+    """One submitted run: its paths, options and everything clients poll"""
+
+    def __init__(self, job_id: int, paths: list, options: dict):
+        self.id = job_id
+        self.paths = paths
+        self.options = options
+        self.state = 'queued'  # running, done, stopped, failed
+        self.status = 'Queued'
+        self.error = None
+        self.submitted = time.time()
+        self.started = self.finished = None
+        self.progress = {'processed': 0, 'discovered': 0, 'scan_complete': False}
+        self.stats = {'success': 0, 'failed': 0, 'skipped': 0, 'deferred': 0}
+        self.failures = {}
+        self.failure_log = None
+        self.stop_requested = False
+        self._log = deque(maxlen=MAX_JOB_LOG_LINES)
+        self._log_count = 0
+        self._lock = threading.Lock()
+
+    def log(self, message: str):
+        with self._lock:
+            self._log_count += 1
+            self._log.append((self._log_count, message))
+
+    def to_dict(self, since: Optional[int] = None) -> dict:
+        """The job as JSON; with since, also the log lines numbered above it"""
+        data = {
+            'id': self.id, 'paths': self.paths, 'options': self.options, 'state': self.state,
+            'status': self.status, 'error': self.error, 'submitted': self.submitted,
+            'started': self.started, 'finished': self.finished, 'progress': dict(self.progress),
+            'stats': dict(self.stats), 'failures': dict(self.failures), 'failure_log': self.failure_log,
+        }
+        if since is not None:
+            with self._lock:
+                data['log'] = [message for number, message in self._log if number > since]
+                data['log_next'] = self._log_count
+        return data
+
+
+class JobServer:
+    """Runs submitted jobs on one shared engine, one after another"""
+
+    def __init__(self, engine: LyricsEngine):
+        self.engine = engine
+        # Options a job does not set fall back to the engine's settings at startup
+        self.defaults = {name: copy.deepcopy(getattr(engine, name)) for name in JOB_OPTIONS}
+        self.jobs = OrderedDict()
+        self.current = None
+        self._ids = itertools.count(1)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+
+        engine.log = self._log
+        engine.on_status = self._on_status
+        engine.on_progress = self._on_progress
+        engine.on_stats = self._on_stats
+        self._worker = threading.Thread(target=self._run_jobs, daemon=True)
+        self._worker.start()
+
+    def _log(self, message: str):
+        print(message)
+        if self.current is not None:
+            self.current.log(message)
+
+    def _on_status(self, text: str):
+        if self.current is not None:
+            self.current.status = text
+            if self.current.stop_requested:
+                # A stop that came in before the run set processing
+                self.engine.processing = False
+
+    def _on_progress(self, processed: int, discovered: int, scan_complete: bool):
+        if self.current is not None:
+            self.current.progress = {'processed': processed, 'discovered': discovered,
+                                     'scan_complete': scan_complete}
+
+    def _on_stats(self, stats: dict):
+        if self.current is not None:
+            self.current.stats = dict(stats)
+
+    def submit(self, paths: list, options: dict) -> tuple:
+        """Queue a job; returns it and the number of jobs ahead of it"""
+        unknown = sorted(set(options) - set(JOB_OPTIONS))
+        if unknown:
+            raise ValueError(f"unknown options: {', '.join(unknown)}")
+        if not paths or not all(isinstance(path, str) for path in paths):
+            raise ValueError("paths must be a non-empty list of file or folder paths")
+        with self._lock:
+            job = Job(next(self._ids), paths, options)
+            position = sum(1 for other in self.jobs.values() if other.state in ('queued', 'running'))
+            self.jobs[job.id] = job
+            self._forget_old_jobs()
+        self._queue.put(job)
+        return job, position
+
+    def _forget_old_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.state in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def stop(self, job: Job):
+        job.stop_requested = True
+        if job.state == 'queued':
+            job.state, job.status, job.finished = 'stopped', 'Stopped before it started', time.time()
+        elif job is self.current:
+            self.engine.processing = False
+
+    def status(self) -> dict:
+        with self._lock:
+            queued = sum(1 for job in self.jobs.values() if job.state == 'queued')
+        return {
+            'pid': os.getpid(),
+            'browser_ready': self.engine.server_ready,
+            'current_job': self.current.id if self.current is not None else None,
+            'queued_jobs': queued,
+        }
+
+    def _apply_options(self, options: dict):
+        for name in JOB_OPTIONS:
+            setattr(self.engine, name, copy.deepcopy(options.get(name, self.defaults[name])))
+
+    def _run_jobs(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            if job.stop_requested:
+                continue
+            self._apply_options(job.options)
+            self.current = job
+            job.state, job.started = 'running', time.time()
+            try:
+                job.stats = dict(self.engine.process_files(job.paths))
+                state = 'stopped' if job.stop_requested else 'done'
+            except Exception as e:
+                state, job.error = 'failed', str(e)
+                self._log(f"✗ Job {job.id} failed: {e}")
+            self.engine.processing = False
+            job.failures = dict(self.engine.failures.counts)
+            if job.failures:
+                job.failure_log = str(self.engine.failures.path)
+            job.finished = time.time()
+            self.current = None
+            job.state = state  # Last, so clients that see it finished get everything
+
+    def close(self):
+        if self.current is not None:
+            self.stop(self.current)
+        self._queue.put(None)
+        self._worker.join(timeout=10)
+        self.engine.shutdown()
+
+
+def make_handler(server: JobServer, token: str):
+    class JobHandler(BaseHTTPRequestHandler):
+        # Host headers accepted over TCP, set by serve() once the port is known;
+        # anything else is a browser page trying DNS rebinding
+        allowed_hosts = None
+
+        def _send(self, status: int, data, content_type='application/json'):
+            if not isinstance(data, str):
+                data = json.dumps(data, ensure_ascii=False)
+            body = data.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', f"{content_type}; charset=utf-8")
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _error(self, status: int, message: str):
+            self._send(status, {'error': message})
+
+        def _job(self, job_id: str) -> Optional[Job]:
+            job = server.jobs.get(int(job_id))
+            if job is None:
+                self._error(404, f"no job {job_id}")
+            return job
+
+        def _host_allowed(self) -> bool:
+            if self.allowed_hosts is None or self.headers.get('Host', '').lower() in self.allowed_hosts:
+                return True
+            self._error(403, 'unexpected Host header')
+            return False
+
+        def do_GET(self):
+            if not self._host_allowed():
+                return
+            url = urlsplit(self.path)
+            query = parse_qs(url.query)
+            if url.path == '/status':
+                self._send(200, server.status())
+            elif url.path == '/metrics':
+                self._send(200, server.engine.service_metrics.render(), 'text/plain; version=0.0.4')
+            elif url.path == '/jobs':
+                self._send(200, {'jobs': [job.to_dict() for job in list(server.jobs.values())]})
+            else:
+                match = _JOB_PATH_RE.match(url.path)
+                if not match or match.group(2) == '/stop':
+                    self._error(404, 'not found')
+                    return
+                job = self._job(match.group(1))
+                if job is None:
+                    return
+                if match.group(2) == '/failures':
+                    self._send(200, {'failures': list(self._failures(job, query.get('reason', [None])[0]))})
+                else:
+                    try:
+                        since = int(query.get('since', ['0'])[0])
+                    except ValueError:
+                        self._error(400, 'since must be a number')
+                        return
+                    self._send(200, job.to_dict(since))
+
+        def do_POST(self):
+            if not self._host_allowed():
+                return
+            # Cross-site form posts cannot set either header
+            if self.headers.get_content_type() != 'application/json':
+                self._error(415, 'Content-Type must be application/json')
+                return
+            if not hmac.compare_digest(self.headers.get(TOKEN_HEADER, ''), token):
+                self._error(403, f"missing or wrong {TOKEN_HEADER}")
+                return
+            url = urlsplit(self.path)
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                self._error(400, 'request body must be JSON')
+                return
+            if url.path == '/jobs':
+                try:
+                    job, position = server.submit(body.get('paths'), body.get('options') or {})
+                except ValueError as e:
+                    self._error(400, str(e))
+                    return
+                self._send(201, {'id': job.id, 'position': position})
+                return
+            match = _JOB_PATH_RE.match(url.path)
+            if not match or match.group(2) != '/stop':
+                self._error(404, 'not found')
+                return
+            job = self._job(match.group(1))
+            if job is not None:
+                server.stop(job)
+                self._send(200, job.to_dict())
+
+        def _failures(self, job: Job, reason: Optional[str]):
+            if not job.failure_log:
+                return
+            with open(job.failure_log, encoding='utf-8') as f:
+                for line in f:
+                    entry = json.loads(line)
+                    if reason is None or entry['reason'] == reason:
+                        yield entry
+
+        def log_message(self, format, *args):
+            pass  # Clients poll every half second
+
+    return JobHandler
+
+
+if hasattr(socket, 'AF_UNIX'):
+    from socketserver import UnixStreamServer
+
+    class UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+        daemon_threads = True
+
+        def get_request(self):
+            request, _ = super().get_request()
+            return request, ('unix', 0)  # BaseHTTPRequestHandler expects (host, port)
+
+
+def serve(server: JobServer, token: str, host: str = '127.0.0.1', port: int = 0,
+          socket_path: Optional[str] = None):
+    """Start the HTTP server in a daemon thread; returns (http server, address)"""
+    handler = make_handler(server, token)
+    if socket_path:
+        if not hasattr(socket, 'AF_UNIX'):
+            raise OSError("Unix sockets are not available on this system, use --port")
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        httpd = UnixHTTPServer(socket_path, handler)
+        os.chmod(socket_path, 0o600)  # Only this user may submit jobs
+        address = f"unix:{socket_path}"
+    else:
+        httpd = ThreadingHTTPServer((host, port), handler)
+        port = httpd.server_address[1]
+        handler.allowed_hosts = {f"{name}:{port}" for name in ('127.0.0.1', 'localhost', host.lower())}
+        address = f"http://{host}:{port}"
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, address
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run the lyrics engine as a local job server shared by the GUI, CLI and scripts',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python job_server.py                              # Any free port, starts its own Puppeteer server
+  python job_server.py --socket ~/.lyrics_updater/jobs.sock   # Unix socket instead of TCP
+  python job_server.py --scraper-url http://localhost:3000    # Use a running scraper.js
+  python lyrics_scraper.py /Music --server          # Submit a job from the command line
+  curl -X POST localhost:<port>/jobs -H 'Content-Type: application/json' \
+       -H "X-Job-Token: $(jq -r .token ~/.lyrics_updater/job_server.json)" \
+       -d '{"paths": ["/Music/new"]}'             # ... or from a script
+"""
+    )
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=0, help='TCP port (default: any free port)')
+    parser.add_argument('--socket', metavar='PATH', help='Listen on a Unix socket instead of TCP')
+    parser.add_argument('--state-file', default=str(DEFAULT_STATE_PATH),
+                       help=f'Where clients find the server address and token (default: {DEFAULT_STATE_PATH})')
+    parser.add_argument('--scraper-url',
+                       help='Use a Puppeteer server that is already running instead of starting one')
+    parser.add_argument('--no-browser', action='store_true',
+                       help='Do not use the Puppeteer server (direct requests only)')
+    parser.add_argument('--report-dir', default='.', help='Folder for failed-file reports (default: .)')
+    parser.add_argument('--metrics-dir', help='Save per-job stage timings as JSON in this folder')
+    parser.add_argument('--memo', default=str(DEFAULT_MEMO_PATH),
+                       help=f'Negative lookup memo database (default: {DEFAULT_MEMO_PATH})')
+    parser.add_argument('--harvest-db', default=str(DEFAULT_HARVEST_PATH),
+                       help=f'Lyrics harvest database (default: {DEFAULT_HARVEST_PATH})')
+    parser.add_argument('--page-cache', default=str(DEFAULT_PAGE_CACHE_PATH),
+                       help=f'Compressed cache of fetched pages (default: {DEFAULT_PAGE_CACHE_PATH})')
+    parser.add_argument('--page-cache-mb', type=float, default=DEFAULT_MAX_MB,
+                       help='Size cap of the page cache (default: %(default)s)')
+    args = parser.parse_args()
+
+    engine = LyricsEngine(scraper_url=args.scraper_url or "http://localhost:3000",
+                          report_dir=args.report_dir, metrics_dir=args.metrics_dir,
+                          memo_path=args.memo, harvest_path=args.harvest_db,
+                          page_cache_path=args.page_cache, page_cache_mb=args.page_cache_mb)
+    server = JobServer(engine)
+    if args.scraper_url:
+        print("✓ Using Puppeteer server" if engine.connect_server() else "⚠ Puppeteer server not running")
+    elif not args.no_browser:
+        engine.start_server()
+
+    try:
+        socket_path = os.path.expanduser(args.socket) if args.socket else None
+        token = secrets.token_urlsafe(32)
+        httpd, address = serve(server, token, args.host, args.port, socket_path)
+    except OSError as e:
+        print(f"❌ Could not listen: {e}")
+        server.close()
+        return 1
+    state_path = Path(args.state_file)
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    # Only this user may read the token
+    fd = os.open(state_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump({'address': address, 'token': token, 'pid': os.getpid()}, f)
+    os.chmod(state_path, 0o600)
+    print(f"🎵 Job server running at {address}")
+    # Stopped as a service: clean up like Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\nShutting down job server...")
+    finally:
+        httpd.shutdown()
+        server.close()
+        try:
+            if json.loads(state_path.read_text(encoding='utf-8')).get('pid') == os.getpid():
+                state_path.unlink()
+        except (OSError, ValueError):
+            pass
+        if args.socket and os.path.exists(os.path.expanduser(args.socket)):
+            os.unlink(os.path.expanduser(args.socket))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
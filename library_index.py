@@ -0,0 +1,93 @@
+"""
+Library index
+Remembers what was learned about each audio file (format, lyrics presence,
+lyrics length) together with its mtime and size, so unchanged files can be
+skipped on the next run
+"""
+
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+DEFAULT_INDEX_PATH = Path.home() / '.lyrics_updater' / 'library_index.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    format TEXT,
+    has_lyrics INTEGER NOT NULL DEFAULT 0,
+    lyrics_length INTEGER NOT NULL DEFAULT 0,
+    fields TEXT,
+    checked_at REAL NOT NULL
+)
+"""
+
+
+class LibraryIndex:
+    """SQLite-backed record of per-file verification results"""
+
+    def __init__(self, db_path=DEFAULT_INDEX_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(SCHEMA)
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(files)')}
+        if 'fields' not in columns:  # Indexes written before fields were kept
+            self.conn.execute('ALTER TABLE files ADD COLUMN fields TEXT')
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.conn:
+            self.conn.commit()
+            self.conn.close()
+            self.conn = None
+
+    def lookup(self, path, stat_result: os.stat_result) -> Optional[dict]:
+        """Return the stored record, with the keys of lyrics_tags.check_file,
+        if the file is unchanged since it was indexed"""
+        row = self.conn.execute(
+            'SELECT format, has_lyrics, lyrics_length, fields FROM files '
+            'WHERE path = ? AND mtime_ns = ? AND size = ?',
+            (str(path), stat_result.st_mtime_ns, stat_result.st_size)
+        ).fetchone()
+        if row is None or row[3] is None:  # Rows from older indexes are checked again
+            return None
+        return {
+            'path': str(path),
+            'format': row[0],
+            'has_lyrics': bool(row[1]),
+            'lyrics_length': row[2],
+            'fields': json.loads(row[3]),
+            'error': None,
+        }
+
+    def update(self, records: Iterable[dict]):
+        """Store results; each record needs path, mtime_ns, size and the check result"""
+        now = time.time()
+        self.conn.executemany(
+            'INSERT OR REPLACE INTO files '
+            '(path, mtime_ns, size, format, has_lyrics, lyrics_length, fields, checked_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            [(r['path'], r['mtime_ns'], r['size'], r.get('format'),
+              int(bool(r.get('has_lyrics'))), r.get('lyrics_length', 0), json.dumps(r.get('fields') or []), now)
+             for r in records]
+        )
+        self.conn.commit()
+
+    def forget(self, path):
+        """Drop a file from the index (e.g. after its tags were rewritten)"""
+        self.conn.execute('DELETE FROM files WHERE path = ?', (str(path),))
+        self.conn.commit()
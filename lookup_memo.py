@@ -0,0 +1,107 @@
+"""
+Negative lookup memo
+Remembers which (normalized query, source) pairs came back empty or 404, so
+songs that are never found (live cuts, instrumentals, ...) stop burning the
+whole source chain on every run. Entries expire after a TTL with random
+jitter, so a library's misses are not all retried in the same run.
+"""
+
+import random
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+DEFAULT_MEMO_PATH = Path.home() / '.lyrics_updater' / 'lookup_memo.db'
+
+DEFAULT_TTL_DAYS = 14
+TTL_JITTER = 0.25  # each entry lives TTL * (1 ± 25%)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS misses (
+    query TEXT NOT NULL,
+    source TEXT NOT NULL,
+    reason TEXT,
+    recorded_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (query, source)
+)
+"""
+
+_NON_WORD_RE = re.compile(r'[^\w]+')
+
+
+def normalize_text(text: str) -> str:
+    """Case-, width- and punctuation-insensitive form of a tag ('' stays '')"""
+    text = unicodedata.normalize('NFKC', text or '').casefold()
+    return _NON_WORD_RE.sub(' ', text).strip()
+
+
+def normalize_query(title: str, artist: str) -> str:
+    """Case-, width- and punctuation-insensitive key for a song"""
+    return f"{normalize_text(artist)}|{normalize_text(title)}"
+
+
+class LookupMemo:
+    """SQLite-backed set of known misses per source"""
+
+    def __init__(self, db_path=DEFAULT_MEMO_PATH, ttl_days: float = DEFAULT_TTL_DAYS, seed=None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl_days * 86400
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self.conn:
+                self.conn.commit()
+                self.conn.close()
+                self.conn = None
+
+    def is_known_miss(self, query: str, source: str) -> bool:
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT 1 FROM misses WHERE query = ? AND source = ? AND expires_at > ?',
+                (query, source, time.time())
+            ).fetchone()
+        return row is not None
+
+    def record_miss(self, query: str, source: str, reason: str = 'not found'):
+        now = time.time()
+        ttl = self.ttl * (1 + self.random.uniform(-TTL_JITTER, TTL_JITTER))
+        with self._lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO misses (query, source, reason, recorded_at, expires_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (query, source, reason, now, now + ttl)
+            )
+            self.conn.commit()
+
+    def forget(self, query: str, source: str = None):
+        """Drop misses for a query (all sources unless one is given)"""
+        with self._lock:
+            if source is None:
+                self.conn.execute('DELETE FROM misses WHERE query = ?', (query,))
+            else:
+                self.conn.execute('DELETE FROM misses WHERE query = ? AND source = ?', (query, source))
+            self.conn.commit()
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self.conn.execute('DELETE FROM misses WHERE expires_at <= ?', (time.time(),))
+            self.conn.commit()
+        return cursor.rowcount
@@ -0,0 +1,1675 @@
+"""
+Lyrics processing engine
+Scanning, metadata reading, lyrics lookup and tag writing, independent of the
+Tk GUI so it can also run headless. The GUI passes callbacks for logging,
+status, progress and statistics.
+"""
+
+import heapq
+import importlib
+import itertools
+import json
+import os
+import queue
+import re
+import socket
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Iterator, Optional
+from urllib.parse import quote
+
+import candidates
+import dir_scan
+import html_stream
+import lyrics_sources
+import lyrics_tags
+import tag_probe
+from instrumental import DEFAULT_VOCAL_THRESHOLD, instrumental_reason
+from lyrics_harvest import DEFAULT_HARVEST_PATH, LyricsHarvest
+from lookup_memo import DEFAULT_MEMO_PATH, DEFAULT_TTL_DAYS, LookupMemo, normalize_query, normalize_text
+from page_cache import DEFAULT_MAX_MB, DEFAULT_PAGE_CACHE_PATH, CachedPage, PageCache
+from rate_limit import HostBlocked, HostRateLimiter
+from run_budget import RunBudget, RunCheckpoint
+from run_metrics import RunMetrics, ServiceMetrics
+from run_plan import DEFAULT_LYRICS_BYTES, LookupHistory, RunPlan
+from sidecar import find_sidecar, read_sidecar, write_sidecar
+
+# scraper.js and node_modules live next to this file
+APP_DIR = Path(__file__).resolve().parent
+
+# requests, mutagen and bs4 are imported on first use rather than here, so
+# importing the engine (and starting the GUI) stays fast.
+_lazy_modules = {}
+_mutagen = None
+
+
+def free_port() -> int:
+    """A TCP port on 127.0.0.1 that is free right now"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def lazy_import(name: str):
+    """Import a module the first time it is needed and cache it"""
+    module = _lazy_modules.get(name)
+    if module is None:
+        module = importlib.import_module(name)
+        _lazy_modules[name] = module
+    return module
+
+
+def load_mutagen() -> SimpleNamespace:
+    """Load mutagen and the format classes used to read metadata"""
+    global _mutagen
+    if _mutagen is None:
+        import mutagen
+        from mutagen.mp4 import MP4
+        from mutagen.flac import FLAC
+        from mutagen.oggvorbis import OggVorbis
+        from mutagen.asf import ASF
+        from mutagen.aac import AAC
+        from mutagen.oggopus import OggOpus
+        _mutagen = SimpleNamespace(
+            File=mutagen.File, MP4=MP4, FLAC=FLAC, OggVorbis=OggVorbis,
+            ASF=ASF, AAC=AAC, OggOpus=OggOpus
+        )
+    return _mutagen
+
+
+def make_soup(markup, **kwargs):
+    """Parse HTML with BeautifulSoup, importing bs4 on first use"""
+    return lazy_import('bs4').BeautifulSoup(markup, 'html.parser', **kwargs)
+
+
+JAPANESE_CHARS_RE = re.compile(r'[\u3040-\u309F\u30A0-\u30FF\u4E00-\u9FAF]')
+
+FILENAME_PATTERNS = [
+    re.compile(r'^(?P<artist>[^-]+)\s*-\s*(?P<title>.+)$'),
+    re.compile(r'^(?P<title>[^-]+)\s*-\s*(?P<artist>.+)$'),
+]
+
+# Patterns stripped from scraped lyrics, compiled once at import
+UNWANTED_LYRICS_PATTERNS = [re.compile(pattern, re.IGNORECASE | re.MULTILINE) for pattern in [
+    # Contributors and translation info
+    r'\d+\s*Contributors?',
+    r'Translations?\w*',
+    r'\d+\s*Embed',
+
+    # Song title repetition at start (e.g., "Love in My Pocket Lyrics")
+    r'^.*?Lyrics\s*',
+
+    # Language indicators
+    r'Español|Français|Deutsch|Italiano|Português|العربية|中文|日本語|한국어|Русский',
+
+    # Website metadata
+    r'genius\.com|azlyrics\.com|lyrics\.com',
+    r'\bgenius\b|\bazlyrics\b',
+
+    # Copyright and legal text
+    r'©.*?\d{4}',
+    r'All rights reserved',
+    r'Powered by.*$',
+
+    # Social media and sharing
+    r'Share on Facebook|Tweet|Share|Like|Follow',
+    r'www\.|http[s]?://',
+
+    # Advertisement text
+    r'Advertisement',
+    r'Sponsored',
+
+    # Navigation elements
+    r'Home|About|Contact|Privacy|Terms',
+
+    # Common metadata patterns
+    r'Album:|Artist:|Released:',
+    r'\bfrom the album\b',
+
+    # Multiple spaces, tabs, newlines
+    r'\s{3,}',
+    r'\t+',
+    r'\n{3,}'
+]]
+
+NUMBERS_ONLY_RE = re.compile(r'^\d+$')
+PUNCTUATION_ONLY_RE = re.compile(r'^[^\w]*$')
+LETTERS_ONLY_RE = re.compile(r'^[A-Za-z]+$')
+MULTI_NEWLINE_RE = re.compile(r'\n{2,}')
+
+# Map extensions to our file type categories
+EXTENSION_MAP = {
+    '.mp3': 'mp3',
+    '.m4a': 'm4a', '.mp4': 'm4a',  # MP4 audio files usually M4A
+    '.flac': 'flac',
+    '.ogg': 'ogg', '.oga': 'ogg',
+    '.wav': 'wav', '.wave': 'wav',
+    '.wma': 'wma',
+    '.aac': 'aac',
+    '.opus': 'opus',
+    '.webm': 'other', '.mkv': 'other', '.avi': 'other',
+    '.wv': 'other', '.ape': 'other'
+}
+
+DEFAULT_FILE_TYPES = {
+    'mp3': True, 'm4a': True, 'flac': True, 'ogg': True, 'wav': True,
+    'wma': True, 'aac': True, 'opus': True,
+    'other': False  # webm, mkv, avi, etc.
+}
+
+# Base URL of every lyrics site; the offline benchmark points these at a
+# local mock site (see benchmarks/mock_lyrics_site.py)
+SOURCE_URLS = {
+    'genius': 'https://genius.com',
+    'azlyrics': 'https://www.azlyrics.com',
+    'utaten': 'https://utaten.com',
+    'jlyric_search': 'http://search.j-lyric.net',
+    'jlyric': 'http://j-lyric.net',
+}
+
+FETCH_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+
+# Per-lookup state (thread-local) that candidate page fetches on worker threads need
+LOOKUP_CONTEXT_FIELDS = ('source', 'needs_js', 'duration')
+
+# Scanner runs ahead of processing by at most this many files
+SCAN_QUEUE_SIZE = 1000
+_SCAN_DONE = object()
+
+# Scheduling: 'walk' processes files in scan order; 'priority' looks ahead
+# PRIORITY_WINDOW files and takes the cheapest, most likely hit first
+SCHEDULES = ('walk', 'priority')
+PRIORITY_WINDOW = 1000
+
+# Artist links in the search results, used to find each result's row
+UTATEN_ARTIST_HREF_RE = re.compile(r'/artist/')
+JLYRIC_ARTIST_HREF_RE = re.compile(r'/artist')
+
+# Titles like these rarely match a lyrics page exactly
+NOISY_TITLE_RE = re.compile(r'[\(\[【].*?(live|remix|mix|ver|edit|remaster|demo|acoustic|feat)', re.IGNORECASE)
+
+
+class FailureLog:
+    """Failed files written to disk as they happen instead of kept in memory.
+
+    Entries go to a JSON Lines file; only per-reason counts stay in memory.
+    The grouped text report is rendered from that file at the end of a run.
+    """
+
+    def __init__(self, report_dir='.'):
+        self.report_dir = Path(report_dir)
+        self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.path = self.report_dir / f"failed_lyrics_report_{self.timestamp}.jsonl"
+        self.counts = {}
+        self._file = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(self.counts.values())
+
+    def add(self, entry: dict):
+        with self._lock:
+            if self._file is None:
+                self.report_dir.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self._file.flush()
+            self.counts[entry['reason']] = self.counts.get(entry['reason'], 0) + 1
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def iter_entries(self, reason: Optional[str] = None) -> Iterator[dict]:
+        """Stream entries back from disk, optionally only one reason"""
+        if not self.path.exists():
+            return
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                entry = json.loads(line)
+                if reason is None or entry['reason'] == reason:
+                    yield entry
+
+    def write_text_report(self) -> Optional[Path]:
+        """Write the grouped text report; one pass over the file per reason"""
+        if not self.counts:
+            return None
+        self.close()
+        report_file = self.report_dir / f"failed_lyrics_report_{self.timestamp}.txt"
+
+        with open(report_file, 'w', encoding='utf-8') as f:
+            f.write("=" * 60 + "\n")
+            f.write("FAILED LYRICS REPORT\n")
+            f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write("=" * 60 + "\n\n")
+
+            f.write(f"Total failed files: {len(self)}\n\n")
+
+            # Group by reason
+            for reason, count in self.counts.items():
+                f.write(f"\n{reason.upper()} ({count} files):\n")
+                f.write("-" * 40 + "\n")
+                for file_info in self.iter_entries(reason):
+                    f.write(f"  File: {file_info['file']}\n")
+                    if 'title' in file_info:
+                        f.write(f"    Title: {file_info['title']}\n")
+                        f.write(f"    Artist: {file_info['artist']}\n")
+                    f.write(f"    Path: {file_info['path']}\n\n")
+
+        return report_file
+
+
+class LookupUnavailable(Exception):
+    """A source could not answer right now (server error, throttling); not a miss"""
+
+
+def _ignore(*args, **kwargs):
+    pass
+
+
+class LyricsEngine:
+    def __init__(self, scraper_url: str = "http://localhost:3000", log=print,
+                 on_status=_ignore, on_progress=_ignore, on_stats=_ignore,
+                 on_server_status=_ignore, report_dir='.', metrics_dir=None,
+                 memo_path=DEFAULT_MEMO_PATH, memo_ttl_days=DEFAULT_TTL_DAYS,
+                 harvest_path=DEFAULT_HARVEST_PATH, page_cache_path=DEFAULT_PAGE_CACHE_PATH,
+                 page_cache_mb=DEFAULT_MAX_MB):
+        self.scraper_url = scraper_url
+        self.server_ready = False
+        self.node_process = None
+        self.processing = False
+        self.overwrite = False
+        self.file_types = dict(DEFAULT_FILE_TYPES)
+        self.report_dir = report_dir
+        self.source_urls = dict(SOURCE_URLS)
+        self.rate_limiter = HostRateLimiter()  # per-host token buckets (rate_limits.json)
+        # Known misses per source, so hopeless songs skip the chain (None = off)
+        self.lookup_memo = LookupMemo(memo_path, memo_ttl_days) if memo_path else None
+        # Lyrics already in the library, copied to other copies of a song (None = off)
+        self.harvest = LyricsHarvest(harvest_path) if harvest_path else None
+        self.harvest_first = False  # refresh the harvest map before each run
+        # Raw HTML of fetched pages, revalidated and re-extractable offline (None = off)
+        self.page_cache = PageCache(page_cache_path, page_cache_mb) if page_cache_path else None
+        self.skip_instrumentals = True  # skip intros, karaoke, off-vocal... before the lookup
+        self.detect_vocals = False  # also measure vocal-band energy (NumPy, ffmpeg for non-WAV)
+        self.vocal_threshold = DEFAULT_VOCAL_THRESHOLD
+        self.lyrics_fields = lyrics_tags.DEFAULT_FIELD_POLICY  # 'compatible' or 'single'
+        self.output = 'embed'  # 'embed', 'sidecar' (.txt/.lrc next to the file) or 'both'
+        self.sidecar_format = 'txt'  # or 'lrc'
+        self.schedule = 'walk'  # or 'priority' (see SCHEDULES)
+        self.top_candidates = candidates.TOP_CANDIDATES  # search results fetched per Japanese-site lookup
+        self.scan_workers = dir_scan.DEFAULT_WORKERS  # folders listed at once (network shares want more)
+        self.budget = None  # RunBudget of the current run, if any
+        self.checkpoint = None  # RunCheckpoint of the current run, if any
+        self._lookup_context = threading.local()  # source being queried, budget deferrals
+        self.stats = {'success': 0, 'failed': 0, 'skipped': 0, 'deferred': 0}
+        self.failures = FailureLog(report_dir)
+        self.metrics_dir = metrics_dir  # per-run metrics dumps go here when set
+        self.service_metrics = self._create_service_metrics()
+        self.metrics = RunMetrics(service=self.service_metrics)
+
+        # Callbacks
+        self.log = log
+        self.on_status = on_status
+        self.on_progress = on_progress  # (processed, discovered, scan_complete)
+        self.on_stats = on_stats
+        self.on_server_status = on_server_status  # (text, color)
+
+    def _create_service_metrics(self) -> ServiceMetrics:
+        """Counters and gauges kept for the life of the process (see /metrics)"""
+        metrics = ServiceMetrics()
+        metrics.describe('files_total', 'counter', 'Files processed by result (success, failed, skipped)')
+        metrics.describe('failures_total', 'counter', 'Failed files by reason')
+        metrics.describe('lookup_duration_seconds', 'histogram', 'Lyrics lookup latency per source')
+        metrics.describe('stage_duration_seconds', 'histogram', 'Time spent per processing stage')
+        metrics.describe('scan_queue_depth', 'gauge', 'Files found by the scanner waiting to be processed')
+        metrics.describe('files_discovered', 'gauge', 'Files found so far in the current run')
+        metrics.describe('files_processed', 'gauge', 'Files processed so far in the current run')
+        metrics.describe('processing', 'gauge', '1 while a run is in progress')
+        metrics.describe('unchanged_writes_total', 'counter', 'Writes skipped because the lyrics were identical')
+        metrics.describe('instrumental_skipped_total', 'counter', 'Files skipped as likely instrumental')
+        metrics.describe('cache_requests_total', 'counter', 'Cache lookups by cache and result (hit, miss)')
+        metrics.describe('written_bytes_total', 'counter', 'UTF-8 bytes of lyrics written to files')
+        metrics.describe('candidate_pages_total', 'counter', 'Lyrics pages fetched from search results by source '
+                                                             'and result (used, discarded)')
+        metrics.describe('page_bytes_total', 'counter', 'Lyrics page bytes read, and skipped by stopping '
+                                                        'after the lyrics (result: read, skipped)')
+        metrics.describe('sidecar_writes_total', 'counter', 'Lyrics written to .txt/.lrc sidecar files')
+        metrics.describe('rate_limit_wait_seconds_total', 'counter', 'Time spent waiting for per-host rate limits')
+        metrics.describe('rate_limited_total', 'counter', 'HTTP 429 responses retried after Retry-After')
+        metrics.describe('puppeteer_server_ready', 'gauge', '1 while the Puppeteer server is in use')
+        metrics.set_gauge('processing', lambda: int(self.processing))
+        metrics.set_gauge('puppeteer_server_ready', lambda: int(self.server_ready))
+        return metrics
+
+    def record_cache(self, cache: str, hit: bool):
+        """Count a cache hit or miss for the hit ratio in /metrics"""
+        self.service_metrics.inc('cache_requests_total', cache=cache, result='hit' if hit else 'miss')
+
+    def count_result(self, result: str):
+        """Count a processed file as 'success', 'failed', 'skipped' or 'deferred'"""
+        self.stats[result] += 1
+        self.service_metrics.inc('files_total', result=result)
+        self.on_stats(self.stats)
+
+    def start_server(self):
+        """Start the Node.js Puppeteer server in a background thread"""
+        def server_startup():
+            requests = lazy_import('requests')
+            try:
+                self.log("Starting Puppeteer server...")
+                self.on_server_status("Server: Starting...", "orange")
+
+                # Check if node_modules exists, if not install dependencies
+                if not (APP_DIR / 'node_modules').exists():
+                    self.log("Installing Node.js dependencies...")
+                    self.on_server_status("Server: Installing deps...", "orange")
+                    result = subprocess.run(['npm', 'install'], capture_output=True, text=True,
+                                            shell=True, cwd=APP_DIR)
+                    if result.returncode != 0:
+                        raise Exception(f"npm install failed: {result.stderr}")
+
+                # Start the Node.js server on a free port, so several engines
+                # (or an already running scraper.js) never collide
+                port = free_port()
+                self.scraper_url = f"http://127.0.0.1:{port}"
+                self.node_process = subprocess.Popen(
+                    ['node', 'scraper.js'],
+                    cwd=APP_DIR,
+                    env=dict(os.environ, PORT=str(port)),
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    shell=os.name == 'nt'
+                )
+
+                # Wait for server to start
+                max_attempts = 15  # Increased attempts
+                for attempt in range(max_attempts):
+                    time.sleep(2)  # Longer sleep between attempts
+                    try:
+                        # Test if server is responding
+                        response = requests.get(f"{self.scraper_url}", timeout=5)
+                        if response.status_code == 404:  # Server is up, just no route
+                            # Now try to initialize
+                            init_response = requests.post(f"{self.scraper_url}/init", timeout=10)
+                            if init_response.status_code == 200:
+                                self.log("✓ Puppeteer server started successfully")
+                                self.server_ready = True
+                                self.on_server_status("Server: Ready ✓", "green")
+                                self.on_status("Server running - Ready to process files")
+                                return
+                    except requests.exceptions.ConnectionError:
+                        self.log(f"  Waiting for server... (attempt {attempt + 1}/{max_attempts})")
+                        continue
+                    except Exception as e:
+                        self.log(f"  Server check error: {e}")
+                        continue
+
+                # Server didn't start properly
+                self.log("⚠ Server startup timeout - using fallback mode")
+                self.on_server_status("Server: Fallback mode", "orange")
+                self.on_status("Using fallback scraping - Ready to process files")
+
+            except Exception as e:
+                self.log(f"✗ Error starting server: {e}")
+                self.log("Will use fallback scraping method")
+                self.on_server_status("Server: Failed", "red")
+                self.on_status("Using fallback scraping - Ready to process files")
+
+        # Start server in background thread
+        threading.Thread(target=server_startup, daemon=True).start()
+
+    def connect_server(self) -> bool:
+        """Use a Puppeteer server that is already running at scraper_url"""
+        self.server_ready = True
+        if self.check_server_health():
+            self.on_server_status("Server: Ready ✓", "green")
+            return True
+        return False
+
+    def shutdown(self):
+        """Stop the Node.js server if this engine started it"""
+        if self.node_process:
+            try:
+                lazy_import('requests').post(f"{self.scraper_url}/close", timeout=2)
+            except Exception:
+                pass
+            self.node_process.terminate()
+            self.node_process = None
+        if self.lookup_memo is not None:
+            self.lookup_memo.close()
+            self.lookup_memo = None
+        if self.harvest is not None:
+            self.harvest.close()
+            self.harvest = None
+        if self.page_cache is not None:
+            self.page_cache.close()
+            self.page_cache = None
+
+    def get_selected_extensions(self):
+        """Get list of file extensions based on the enabled file types"""
+        return [ext for ext, file_type in EXTENSION_MAP.items() if self.file_types.get(file_type)]
+
+    def is_audio_file_quick(self, filepath: Path) -> bool:
+        """Quick check if file is audio based on extension and user selection"""
+        file_type = EXTENSION_MAP.get(filepath.suffix.lower())
+        return bool(file_type and self.file_types.get(file_type))
+
+    def iter_audio_files(self, paths) -> Iterator[Path]:
+        """Yield audio files from the selected files and folders as they are found.
+
+        Folders are listed in parallel (scan_workers at a time) and several
+        selected folders are walked side by side, so the first files reach
+        processing immediately and slow network shares are not listed one
+        folder at a time.
+        """
+        folders = []
+        for item in paths:
+            if not self.processing:
+                return
+            path = Path(item)
+            if path.is_file():
+                if self.is_audio_file_quick(path):
+                    yield path
+            elif path.is_dir():
+                folders.append(path)
+        if not folders:
+            return
+
+        self.log(f"Scanning folder{'s' if len(folders) > 1 else ''}: {', '.join(f.name or str(f) for f in folders)}...")
+        entries = dir_scan.scan(
+            folders, lambda name: self.is_audio_file_quick(Path(name)), self.scan_workers,
+            should_stop=lambda: not self.processing,
+            on_error=lambda folder, e: self.log(f"Error scanning {folder}: {e}"),
+        )
+        try:
+            for entry in entries:
+                if not self.processing:
+                    return
+                yield Path(entry.path)
+        finally:
+            entries.close()
+
+    def is_audio_file(self, filepath: Path) -> bool:
+        """Check if file is an audio file that mutagen can handle"""
+        try:
+            audio = load_mutagen().File(str(filepath))
+            return audio is not None
+        except:
+            return False
+
+    def read_metadata(self, filepath: Path) -> dict:
+        """Read metadata from audio file"""
+        info = {'title': '', 'artist': '', 'genre': '', 'album': '', 'duration': None}
+        m = load_mutagen()
+        
+        try:
+            audio = m.File(str(filepath))
+            if not audio:
+                return self.parse_filename(filepath.stem)
+            info['duration'] = getattr(audio.info, 'length', None)
+            
+            # Handle different audio formats
+            if hasattr(audio, 'tags') and audio.tags:
+                # ID3 tags (MP3, WAV with ID3)
+                if hasattr(audio.tags, 'get'):
+                    info['title'] = str(audio.tags.get('TIT2', [''])[0]) if audio.tags.get('TIT2') else ''
+                    info['artist'] = str(audio.tags.get('TPE1', [''])[0]) if audio.tags.get('TPE1') else ''
+                    info['genre'] = str(audio.tags.get('TCON', [''])[0]) if audio.tags.get('TCON') else ''
+                    info['album'] = str(audio.tags.get('TALB', [''])[0]) if audio.tags.get('TALB') else ''
+            
+            # MP4/M4A/AAC format
+            if isinstance(audio, (m.MP4, m.AAC)) or (hasattr(audio, 'mime') and 'mp4' in str(audio.mime)):
+                info['title'] = audio.get('\xa9nam', [''])[0] if audio.get('\xa9nam') else ''
+                info['artist'] = audio.get('\xa9ART', [''])[0] if audio.get('\xa9ART') else ''
+                info['genre'] = audio.get('\xa9gen', [''])[0] if audio.get('\xa9gen') else ''
+                info['album'] = audio.get('\xa9alb', [''])[0] if audio.get('\xa9alb') else ''
+            
+            # Vorbis comments (FLAC, OGG, Opus)
+            elif isinstance(audio, (m.FLAC, m.OggVorbis, m.OggOpus)) or hasattr(audio, 'get'):
+                info['title'] = audio.get('title', [''])[0] if audio.get('title') else ''
+                info['artist'] = audio.get('artist', [''])[0] if audio.get('artist') else ''
+                info['genre'] = audio.get('genre', [''])[0] if audio.get('genre') else ''
+                info['album'] = audio.get('album', [''])[0] if audio.get('album') else ''
+            
+            # ASF format (WMA)
+            elif isinstance(audio, m.ASF):
+                info['title'] = str(audio.get('Title', [''])[0]) if audio.get('Title') else ''
+                info['artist'] = str(audio.get('Author', [''])[0]) if audio.get('Author') else ''
+                info['genre'] = str(audio.get('WM/Genre', [''])[0]) if audio.get('WM/Genre') else ''
+                info['album'] = str(audio.get('WM/AlbumTitle', [''])[0]) if audio.get('WM/AlbumTitle') else ''
+            
+            # Generic fallback for any format
+            if not info['title'] and not info['artist']:
+                # Try common tag names
+                common_title_tags = ['TIT2', 'TITLE', 'Title', '\xa9nam', 'title']
+                common_artist_tags = ['TPE1', 'ARTIST', 'Artist', '\xa9ART', 'artist', 'Author']
+                
+                for tag in common_title_tags:
+                    if hasattr(audio, 'get') and audio.get(tag):
+                        val = audio.get(tag)
+                        info['title'] = str(val[0] if isinstance(val, list) else val)
+                        break
+                
+                for tag in common_artist_tags:
+                    if hasattr(audio, 'get') and audio.get(tag):
+                        val = audio.get(tag)
+                        info['artist'] = str(val[0] if isinstance(val, list) else val)
+                        break
+            
+            # Final fallback to filename parsing
+            if not info['title']:
+                parsed = self.parse_filename(filepath.stem)
+                info['title'] = parsed['title'] or info['title']
+                info['artist'] = parsed['artist'] or info['artist']
+                
+        except Exception as e:
+            self.log(f"Error reading metadata from {filepath.name}: {e}")
+            return self.parse_filename(filepath.stem)
+        
+        return info
+
+    def parse_filename(self, filename: str) -> dict:
+        """Parse artist and title from filename"""
+        # Try common patterns
+        for pattern in FILENAME_PATTERNS:
+            match = pattern.match(filename)
+            if match:
+                return {
+                    'title': match.group('title').strip() if 'title' in match.groupdict() else '',
+                    'artist': match.group('artist').strip() if 'artist' in match.groupdict() else ''
+                }
+        
+        return {'title': filename, 'artist': ''}
+
+    def clean_lyrics(self, lyrics: str) -> str:
+        """Clean scraped lyrics from unwanted text patterns"""
+        if not lyrics:
+            return lyrics
+
+        with self.metrics.stage('clean'):
+            cleaned = lyrics
+
+            # Remove common unwanted patterns
+            for pattern in UNWANTED_LYRICS_PATTERNS:
+                cleaned = pattern.sub(' ', cleaned)
+
+            # Clean up structure
+            lines = [line.strip() for line in cleaned.split('\n')]
+            filtered_lines = []
+
+            for line in lines:
+                # Remove lines that are likely metadata
+                if len(line) == 0:
+                    continue
+                if NUMBERS_ONLY_RE.match(line):  # Just numbers
+                    continue
+                if PUNCTUATION_ONLY_RE.match(line):  # Just punctuation
+                    continue
+                if len(line) < 3 and not LETTERS_ONLY_RE.match(line):  # Very short non-word lines
+                    continue
+                filtered_lines.append(line)
+
+            cleaned = '\n'.join(filtered_lines)
+            cleaned = MULTI_NEWLINE_RE.sub('\n\n', cleaned)  # Max 2 consecutive newlines
+
+        return cleaned.strip()
+
+    def has_japanese_chars(self, text: str) -> bool:
+        """Check if text contains Japanese characters"""
+        return bool(JAPANESE_CHARS_RE.search(text))
+
+    def http_get(self, url: str, **kwargs):
+        """GET through the per-host rate limiter; a 429 with a short Retry-After is retried once"""
+        requests = lazy_import('requests')
+        host = self.rate_limiter.host_key(url)
+        for attempt in range(2):
+            try:
+                waited = self.rate_limiter.acquire(url, should_stop=lambda: not self.processing)
+            except HostBlocked as e:
+                raise LookupUnavailable(str(e)) from e  # Skip the source rather than freeze the run
+            if waited:
+                self.service_metrics.inc('rate_limit_wait_seconds_total', waited, host=host)
+            self.spend_budget()
+            try:
+                response = requests.get(url, **kwargs)
+            except requests.exceptions.RequestException:
+                self.rate_limiter.record(url, None)
+                raise
+            retry_after = self.rate_limiter.record(url, response.status_code,
+                                                   response.headers.get('Retry-After'))
+            if retry_after is None or attempt or retry_after > self.rate_limiter.config['max_retry_after']:
+                return response
+            self.service_metrics.inc('rate_limited_total', host=host)
+            self.log(f"    Rate limited by {host}, retrying in {retry_after:.0f}s...")
+        return response
+
+    def get_page(self, url: str, timeout: float, containers=None):
+        """GET a lyrics page: None if it does not exist (404), LookupUnavailable on other errors.
+
+        A page in the page cache is revalidated with its ETag/Last-Modified;
+        on 304 Not Modified the cached copy is returned. With containers
+        (a source's extraction rule) the page is streamed and only read up to the
+        end of the lyrics.
+        """
+        cached = self.page_cache.get(url) if self.page_cache is not None else None
+        headers = dict(FETCH_HEADERS, **cached.validators()) if cached is not None else FETCH_HEADERS
+        response = self.http_get(url, headers=headers, timeout=timeout, stream=containers is not None)
+        if response.status_code != 200:
+            response.close()
+        if response.status_code == 304 and cached is not None:
+            self.record_cache('pages', True)
+            self.page_cache.touch(url)
+            return cached
+        if response.status_code == 404:
+            if cached is not None:
+                self.page_cache.forget(url)
+            return None
+        if response.status_code != 200:
+            raise LookupUnavailable(f"HTTP {response.status_code}")
+        response_headers = response.headers  # A page read by read_lyrics_page has none
+        if containers is not None:
+            response = self.read_lyrics_page(url, response, containers)
+        if self.page_cache is not None:
+            self.record_cache('pages', False)
+            self.page_cache.put(url, response.content, response_headers)
+        return response
+
+    def read_lyrics_page(self, url: str, response, containers) -> CachedPage:
+        """Read a streamed response up to the end of the lyrics container"""
+        content, complete = html_stream.read_until_closed(response, containers)
+        self.service_metrics.inc('page_bytes_total', len(content), result='read')
+        needs_js = getattr(self._lookup_context, 'needs_js', None)
+        if not complete and needs_js is not None and self._lookup_context.source:
+            needs_js.add(self._lookup_context.source)  # No lyrics element: maybe rendered by JavaScript
+        # Content-Length counts bytes on the wire, so compare it with what was
+        # received, not with the decoded (maybe decompressed) content
+        length = response.headers.get('Content-Length', '')
+        tell = getattr(getattr(response, 'raw', None), 'tell', None)
+        received = tell() if tell else (None if response.headers.get('Content-Encoding') else len(content))
+        if complete and received is not None and length.isdigit() and int(length) > received:
+            self.service_metrics.inc('page_bytes_total', int(length) - received, result='skipped')
+        return CachedPage(url, content, time.time(), response.headers.get('ETag'),
+                          response.headers.get('Last-Modified'), response.headers.get('Content-Type'))
+
+    def spend_budget(self):
+        """Count one request against the budget of the source being queried"""
+        source = getattr(self._lookup_context, 'source', None)
+        if self.budget is not None and source:
+            self.budget.spend(source)
+
+    def try_source(self, source: str, title: str, artist: str, lookup, log_errors: bool = False) -> Optional[str]:
+        """Run one source's lookup unless the memo knows this song is not there.
+
+        A clean miss (404, no search results, no lyrics on the page) is
+        remembered; errors and throttling are not, so they are retried.
+        """
+        query = normalize_query(title, artist)
+        if self.lookup_memo is not None:
+            known_miss = self.lookup_memo.is_known_miss(query, source)
+            self.record_cache('negative_memo', known_miss)
+            if known_miss:
+                self.log(f"    Skipping {lyrics_sources.label(source)} (not found there before)")
+                return None
+
+        if self.budget is not None and not self.budget.allows(source):
+            # Out of requests for this source: retry the file in a later run
+            self._lookup_context.deferred = source
+            return None
+
+        with self.metrics.stage(f'lookup.{source}'):
+            self._lookup_context.source = source
+            try:
+                lyrics = lookup(title, artist)
+            except Exception as e:
+                if log_errors:
+                    self.log(f"    {lyrics_sources.label(source)} failed: {e}")
+                return None
+            finally:
+                self._lookup_context.source = None
+
+        if not lyrics and self.lookup_memo is not None:
+            self.lookup_memo.record_miss(query, source)
+        return lyrics
+
+    def source_lookup(self, source: lyrics_sources.LyricsSource):
+        """lookup(title, artist) of a plain-HTTP source"""
+        if source.lookup is not None:
+            return lambda title, artist: source.lookup(self, title, artist)
+        return getattr(self, f'lookup_{source.name}')
+
+    def fetch_lyrics_http(self, title: str, artist: str) -> Optional[str]:
+        """Try every source that works without a browser, cheapest first"""
+        is_japanese = self.has_japanese_chars(title) or self.has_japanese_chars(artist)
+        if is_japanese:
+            self.log("  Detected Japanese song, trying Japanese sites first...")
+
+        for source in lyrics_sources.http_chain(is_japanese):
+            if source.japanese:
+                self.log(f"    Trying {source.label}...")
+            # Don't log every failure of the English sites
+            lyrics = self.try_source(source.name, title, artist, self.source_lookup(source),
+                                     log_errors=source.japanese)
+            if lyrics:
+                return lyrics
+        return None
+
+    def lookup_genius(self, title: str, artist: str) -> Optional[str]:
+        """Genius song page from the artist/title slug (works without JavaScript)"""
+        # Better Unicode handling for Genius URLs
+        clean_artist = re.sub(r'[^\w\s-]', '', artist).strip().replace(' ', '-').lower()
+        clean_title = re.sub(r'[^\w\s-]', '', title).strip().replace(' ', '-').lower()
+
+        # Remove multiple dashes
+        clean_artist = re.sub(r'-+', '-', clean_artist).strip('-')
+        clean_title = re.sub(r'-+', '-', clean_title).strip('-')
+
+        if not (clean_artist and clean_title):
+            return None
+
+        url = f"{self.source_urls['genius']}/{clean_artist}-{clean_title}-lyrics"
+        response = self.get_page(url, timeout=10, containers=lyrics_sources.SOURCES['genius'].containers)
+        if response is None:
+            return None
+
+        return self.extract_genius(response.text)
+
+    def extract_genius(self, markup) -> Optional[str]:
+        """Lyrics from a Genius song page"""
+        soup = make_soup(markup)
+
+        # Look for lyrics containers
+        lyrics_divs = soup.find_all('div', {'data-lyrics-container': 'true'})
+        if lyrics_divs:
+            lyrics_text = []
+            for div in lyrics_divs:
+                for br in div.find_all('br'):
+                    br.replace_with('\n')
+                lyrics_text.append(div.get_text())
+            raw_lyrics = '\n'.join(lyrics_text).strip()
+            if len(raw_lyrics) > 50:
+                return self.clean_lyrics(raw_lyrics)
+        return None
+
+    def lookup_azlyrics(self, title: str, artist: str) -> Optional[str]:
+        """AZLyrics page from the artist/title slug"""
+        clean_artist = re.sub(r'[^a-z0-9]', '', artist.lower())
+        clean_title = re.sub(r'[^a-z0-9]', '', title.lower())
+
+        if not (clean_artist and clean_title):
+            return None
+
+        url = f"{self.source_urls['azlyrics']}/lyrics/{clean_artist}/{clean_title}.html"
+        response = self.get_page(url, timeout=10, containers=lyrics_sources.SOURCES['azlyrics'].containers)
+        if response is None:
+            return None
+
+        return self.extract_azlyrics(response.text)
+
+    def extract_azlyrics(self, markup) -> Optional[str]:
+        """Lyrics from an AZLyrics song page"""
+        soup = make_soup(markup)
+
+        # Find lyrics div (usually the largest div without class/id)
+        for div in soup.find_all('div'):
+            if not div.get('class') and not div.get('id'):
+                text = div.get_text().strip()
+                if len(text) > 200 and '\n' in text:
+                    return self.clean_lyrics(text)
+        return None
+
+    def lookup_utaten(self, title: str, artist: str) -> Optional[str]:
+        """Utaten search, then the best-matching lyrics pages in the results"""
+        search_query = f"{artist} {title}".strip()
+        encoded_query = quote(search_query)
+        search_url = f"{self.source_urls['utaten']}/search/?search_text={encoded_query}"
+
+        response = self.get_page(search_url, timeout=15)
+        if response is None:
+            return None
+        soup = make_soup(response.text)
+
+        base = self.source_urls['utaten']
+        results = candidates.parse_results(soup, search_url,
+                                           lambda url: '/lyric/' in url and url.startswith(base),
+                                           UTATEN_ARTIST_HREF_RE)
+        return self.fetch_best_candidate('utaten', results, title, artist, self.fetch_utaten_lyrics)
+
+    def lookup_jlyric(self, title: str, artist: str) -> Optional[str]:
+        """J-Lyric search, then the best-matching lyrics pages in the results"""
+        search_query = f"{title} {artist}".strip()
+        encoded_query = quote(search_query.encode('utf-8'))
+        search_url = f"{self.source_urls['jlyric_search']}/index.php?kt={encoded_query}"
+
+        response = self.get_page(search_url, timeout=15)
+        if response is None:
+            return None
+        soup = make_soup(response.content, from_encoding='utf-8')
+
+        # Result links are site-relative to j-lyric.net, not the search host
+        results = candidates.parse_results(soup, self.source_urls['jlyric'] + '/',
+                                           lambda url: '/lyric.php?' in url, JLYRIC_ARTIST_HREF_RE)
+        return self.fetch_best_candidate('jlyric', results, title, artist, self.fetch_jlyric_lyrics)
+
+    def fetch_best_candidate(self, source: str, results: list, title: str, artist: str,
+                             fetch) -> Optional[str]:
+        """Rank search results, fetch the top ones concurrently and keep the best with lyrics.
+
+        A clear winner is fetched alone. Lyrics pages that fail with an error
+        only make the lookup unavailable (not a miss) if no page had lyrics.
+        """
+        ranked = candidates.rank(results, title, artist, getattr(self._lookup_context, 'duration', None))
+        chosen = candidates.pick(ranked, self.top_candidates)
+        if not chosen:
+            return None
+
+        if len(chosen) == 1:
+            outcomes = [self._fetch_candidate(fetch, chosen[0].url)]
+        else:
+            # Worker threads have their own (empty) context: carry the lookup's over
+            context = {name: getattr(self._lookup_context, name, None) for name in LOOKUP_CONTEXT_FIELDS}
+            context['source'] = source
+            with ThreadPoolExecutor(max_workers=len(chosen)) as pool:
+                outcomes = list(pool.map(lambda candidate: self._fetch_candidate(fetch, candidate.url, context),
+                                         chosen))
+
+        best = None
+        for candidate, (lyrics, error) in zip(chosen, outcomes):
+            if lyrics and best is None:
+                best = candidate, lyrics
+            else:
+                self.service_metrics.inc('candidate_pages_total', source=source, result='discarded')
+        if best is not None:
+            candidate, lyrics = best
+            self.service_metrics.inc('candidate_pages_total', source=source, result='used')
+            if candidate.url != results[0].url:
+                self.log(f"    Best match: {candidate.title} / {candidate.artist or '?'} ({candidate.score:.2f})")
+            return lyrics
+        errors = [error for _, error in outcomes if error is not None]
+        if errors:
+            raise errors[0]
+        return None
+
+    def _fetch_candidate(self, fetch, url: str, context: Optional[dict] = None) -> tuple:
+        """(lyrics, None) or (None, error) for one lyrics page, fetched with the
+        given lookup context (source for the budget, needs_js, duration)"""
+        for name, value in (context or {}).items():
+            setattr(self._lookup_context, name, value)
+        try:
+            return fetch(url), None
+        except Exception as e:
+            return None, e
+
+    def fetch_utaten_lyrics(self, url: str) -> Optional[str]:
+        """Fetch lyrics from Utaten page"""
+        response = self.get_page(url, timeout=10, containers=lyrics_sources.SOURCES['utaten'].containers)
+        if response is None:
+            return None
+        return self.extract_utaten(response.text)
+
+    def extract_utaten(self, markup) -> Optional[str]:
+        """Lyrics from an Utaten lyrics page"""
+        soup = make_soup(markup)
+
+        # Utaten lyrics container
+        lyrics_div = soup.find('div', class_='lyric')
+        if not lyrics_div:
+            lyrics_div = soup.find('div', {'id': 'lyric'})
+
+        if lyrics_div:
+            # Replace br tags with newlines
+            for br in lyrics_div.find_all('br'):
+                br.replace_with('\n')
+
+            lyrics = lyrics_div.get_text().strip()
+            if len(lyrics) > 50:
+                return self.clean_lyrics(lyrics)
+        return None
+
+    def fetch_jlyric_lyrics(self, url: str) -> Optional[str]:
+        """Fetch lyrics from J-Lyric page"""
+        response = self.get_page(url, timeout=10, containers=lyrics_sources.SOURCES['jlyric'].containers)
+        if response is None:
+            return None
+        return self.extract_jlyric(response.content)
+
+    def extract_jlyric(self, markup) -> Optional[str]:
+        """Lyrics from a J-Lyric lyrics page (bytes: the site is UTF-8 whatever it says)"""
+        soup = make_soup(markup, from_encoding='utf-8') if isinstance(markup, bytes) else make_soup(markup)
+
+        # J-Lyric lyrics container
+        lyrics_div = soup.find('p', {'id': 'Lyric'})
+        if not lyrics_div:
+            lyrics_div = soup.find('div', {'id': 'Lyric'})
+
+        if lyrics_div:
+            # Replace br tags with newlines
+            for br in lyrics_div.find_all('br'):
+                br.replace_with('\n')
+
+            lyrics = lyrics_div.get_text().strip()
+            if len(lyrics) > 50:
+                return self.clean_lyrics(lyrics)
+        return None
+
+    def lookup_puppeteer(self, title: str, artist: str, sources: Optional[list] = None) -> Optional[str]:
+        """Ask the Puppeteer server to try the given sites (scraper.js names; default: its own chain)"""
+        requests = lazy_import('requests')
+        self.spend_budget()
+        try:
+            response = requests.post(
+                f"{self.scraper_url}/scrape",
+                json={'title': title, 'artist': artist,
+                      'duration': getattr(self._lookup_context, 'duration', None),
+                      'include_pages': self.page_cache is not None,
+                      'sources': sources},
+                timeout=30
+            )
+        except requests.exceptions.ConnectionError:
+            # Server died, mark as not ready
+            self.server_ready = False
+            self.on_server_status("Server: Disconnected", "red")
+            raise LookupUnavailable("server connection lost")
+
+        if response.status_code == 200:
+            data = response.json()
+            if data.get('error'):
+                raise LookupUnavailable(data['error'])  # e.g. browser restarted
+            for page in data.get('pages') or []:
+                # Rendered HTML of the page the lyrics came from, for re-extraction
+                self.page_cache.put(page['url'], page['html'].encode('utf-8'),
+                                    {'Content-Type': 'text/html; charset=utf-8'})
+            lyrics = data.get('lyrics')
+            if lyrics and len(lyrics.strip()) > 50:  # Ensure we got meaningful lyrics
+                return lyrics
+            return None
+        if response.status_code >= 500:
+            # Server error, mark as not ready
+            self.server_ready = False
+            self.on_server_status("Server: Error", "red")
+        raise LookupUnavailable(f"HTTP {response.status_code}")
+
+    def fetch_lyrics(self, title: str, artist: str) -> Optional[str]:
+        """Plain HTTP sources first; the browser only for sources or pages that need JavaScript"""
+        self._lookup_context.needs_js = set()
+        lyrics = self.fetch_lyrics_http(title, artist)
+        if lyrics or not self.server_ready:
+            return lyrics
+
+        # Sites only the browser can scrape, and pages that came back without
+        # their lyrics element (rendered by JavaScript)
+        escalate = [source.browser_name for source in lyrics_sources.browser_only()]
+        escalate += [lyrics_sources.SOURCES[name].browser_name for name in sorted(self._lookup_context.needs_js)
+                     if lyrics_sources.SOURCES[name].browser_name]
+        if not escalate:
+            return None
+        self.log(f"    Trying {', '.join(escalate)} in the browser...")
+        return self.try_source(lyrics_sources.BROWSER, title, artist,
+                               lambda title, artist: self.lookup_puppeteer(title, artist, escalate),
+                               log_errors=True)
+
+    def write_lyrics(self, filepath: Path, lyrics: str) -> bool:
+        """Write lyrics to audio file"""
+        try:
+            audio = load_mutagen().File(str(filepath))
+            if audio is None:  # a file with no tags at all is falsy too
+                return False
+
+            if not lyrics_tags.write_lyrics(audio, lyrics, self.lyrics_fields):
+                self.log("  = Stored lyrics are identical, file left unchanged")
+                self.service_metrics.inc('unchanged_writes_total')
+                return True
+            audio.save()
+            self.service_metrics.inc('written_bytes_total', len(lyrics.encode('utf-8')))
+            return True
+
+        except lyrics_tags.LyricsFormatError as e:
+            self.log(f"Unsupported format for lyrics: {filepath.suffix} ({e})")
+            return False
+        except Exception as e:
+            self.log(f"Error writing lyrics to {filepath.name}: {e}")
+            return False
+
+    def check_has_lyrics(self, filepath: Path) -> bool:
+        """Check if file already has lyrics"""
+        # Header-only probe first; full mutagen parse only for other formats
+        probed = tag_probe.probe_lyrics(filepath)
+        if probed is not None:
+            return probed.has_lyrics
+
+        try:
+            audio = load_mutagen().File(str(filepath))
+            if not audio:
+                return False
+            return lyrics_tags.has_lyrics(audio)
+        except Exception as e:
+            self.log(f"Error checking lyrics in {filepath.name}: {e}")
+        
+        return False
+
+    def has_output_lyrics(self, filepath: Path, probed=None) -> bool:
+        """Check if the file already has lyrics where this run would put them"""
+        if self.output == 'sidecar':
+            return find_sidecar(filepath) is not None
+        embedded = probed.has_lyrics if probed is not None else self.check_has_lyrics(filepath)
+        if self.output == 'both':
+            return embedded and find_sidecar(filepath) is not None
+        return embedded
+
+    def store_lyrics(self, filepath: Path, lyrics: str, info: dict, keep_sidecar: bool = False) -> bool:
+        """Embed lyrics and/or write the sidecar, depending on the output mode.
+
+        keep_sidecar leaves an existing sidecar alone (the lyrics came from it,
+        and an .lrc may have timestamps the plain text has lost).
+        """
+        if self.output in ('embed', 'both') and not self.write_lyrics(filepath, lyrics):
+            return False
+        if self.output in ('sidecar', 'both') and not keep_sidecar:
+            try:
+                path = write_sidecar(filepath, lyrics, self.sidecar_format, info['title'], info['artist'])
+            except OSError as e:
+                self.log(f"Error writing sidecar for {filepath.name}: {e}")
+                return False
+            if path is None:
+                self.log("  = Sidecar is identical, left unchanged")
+            else:
+                self.service_metrics.inc('sidecar_writes_total')
+                self.service_metrics.inc('written_bytes_total', len(lyrics.encode('utf-8')))
+        return True
+
+    def find_sidecar_lyrics(self, filepath: Path) -> Optional[str]:
+        """Lyrics from a .lrc/.txt next to the file, if there is one"""
+        with self.metrics.stage('sidecar'):
+            path = find_sidecar(filepath)
+            lyrics = read_sidecar(path) if path is not None else None
+        if lyrics:
+            self.log(f"  ✓ Found lyrics in {path.name}")
+        return lyrics
+
+    def check_server_health(self):
+        """Check if Puppeteer server is still alive"""
+        if not self.server_ready:
+            return False
+
+        try:
+            response = lazy_import('requests').post(f"{self.scraper_url}/init", timeout=3)
+            return response.status_code == 200
+        except:
+            self.server_ready = False
+            self.on_server_status("Server: Disconnected", "red")
+            return False
+
+    def reset_stats(self):
+        """Reset statistics counters and start a new failure log and metrics"""
+        self.failures.close()
+        self.metrics.close()
+        self.stats = {'success': 0, 'failed': 0, 'skipped': 0, 'deferred': 0}
+        self.failures = FailureLog(self.report_dir)
+        files_path = None
+        if self.metrics_dir:
+            files_path = Path(self.metrics_dir) / f"lyrics_metrics_{self.failures.timestamp}.files.jsonl"
+        self.metrics = RunMetrics(files_path, service=self.service_metrics)
+        self.on_stats(self.stats)
+
+    def record_failure(self, filepath: Path, reason: str, info: Optional[dict] = None):
+        """Count a failure and append it to the on-disk failure log"""
+        entry = {'file': filepath.name, 'path': str(filepath), 'reason': reason}
+        if info:
+            entry['title'] = info['title']
+            entry['artist'] = info['artist'] or 'Unknown'
+        self.failures.add(entry)
+        self.service_metrics.inc('failures_total', reason=reason)
+        self.count_result('failed')
+
+    @staticmethod
+    def harvest_key(info: dict) -> Optional[str]:
+        """Harvest map key of a song; None without both a title and an artist,
+        since a title alone ("Home", "Intro") names many different songs"""
+        if not info.get('title', '').strip() or not info.get('artist', '').strip():
+            return None
+        return normalize_query(info['title'], info['artist'])
+
+    def find_harvested(self, filepath: Path, info: dict, quiet: bool = False) -> Optional[str]:
+        """Lyrics of another copy of this song in the library, if one has them"""
+        key = self.harvest_key(info)
+        if self.harvest is None or key is None:
+            return None
+        with self.metrics.stage('harvest'):
+            found = self.harvest.find(key, info.get('duration'), exclude=filepath,
+                                      album=normalize_text(info.get('album')))
+        if quiet:
+            return found[0] if found else None
+        self.record_cache('harvest', found is not None)
+        if found is None:
+            return None
+        lyrics, source_path = found
+        self.log(f"  ✓ Found lyrics in the library ({Path(source_path).name})")
+        return lyrics
+
+    def remember_harvest(self, filepath: Path, info: dict, lyrics: str):
+        """Add freshly written lyrics to the harvest map for later copies"""
+        key = self.harvest_key(info)
+        if self.harvest is None or key is None:
+            return
+        try:
+            self.harvest.add(filepath, filepath.stat(), key, info.get('duration'), lyrics,
+                             album=normalize_text(info.get('album')))
+        except OSError:
+            pass
+
+    def harvest_library(self, paths) -> int:
+        """Pre-pass: add the lyrics embedded in the selection to the harvest map.
+
+        Files without lyrics cost one header probe; files harvested before
+        and unchanged since are not opened at all. Returns the files added.
+        """
+        if self.harvest is None:
+            return 0
+        self.log("Harvesting lyrics already in the library...")
+        self.on_status("Harvesting lyrics already in the library...")
+        m = load_mutagen()
+        checked = added = 0
+        for filepath in self.iter_audio_files(paths):
+            checked += 1
+            if checked % 500 == 0:
+                self.on_status(f"Harvesting... {checked} files checked, {added} with lyrics")
+                self.harvest.commit()
+            try:
+                stat = filepath.stat()
+                if self.harvest.is_current(filepath, stat):
+                    continue
+                probed = tag_probe.probe_lyrics(filepath)
+                if probed is not None and not probed.has_lyrics:
+                    continue
+                with self.metrics.stage('harvest'):
+                    audio = m.File(str(filepath))
+                    lyrics = lyrics_tags.get_lyrics(audio) if audio else None
+                    if not lyrics:
+                        continue
+                    info = self.read_metadata(filepath)
+                key = self.harvest_key(info)
+                if key is None:
+                    continue
+                self.harvest.add(filepath, stat, key, info.get('duration'), lyrics,
+                                 album=normalize_text(info.get('album')), commit=False)
+                added += 1
+            except Exception as e:
+                self.log(f"Error harvesting {filepath.name}: {e}")
+        self.harvest.commit()
+        self.log(f"📚 Harvested lyrics from {added} new or changed files "
+                 f"({self.harvest.count()} songs with lyrics known)")
+        return added
+
+    def page_extractor(self, url: str):
+        """(source, extractor) for a cached lyrics page, None for search and other pages"""
+        urls = self.source_urls
+        if url.startswith(urls['genius']) and url.endswith('-lyrics'):
+            return 'genius', self.extract_genius
+        if url.startswith(urls['azlyrics']) and '/lyrics/' in url:
+            return 'azlyrics', self.extract_azlyrics
+        if url.startswith(urls['utaten']) and '/lyric/' in url:
+            return 'utaten', self.extract_utaten
+        if url.startswith(urls['jlyric']) and '/lyric.php?' in url:
+            return 'jlyric', self.extract_jlyric
+        return None
+
+    def reextract_cache(self, output_path=None) -> dict:
+        """Run extraction and cleaning again over every cached lyrics page, offline.
+
+        Results go to a JSON Lines file (url, source, fetched_at, lyrics) in
+        the report folder; returns per-source counts of pages with and
+        without lyrics.
+        """
+        if self.page_cache is None:
+            self.log("The page cache is turned off, nothing to re-extract")
+            return {}
+        if output_path is None:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            output_path = Path(self.report_dir) / f"reextracted_lyrics_{timestamp}.jsonl"
+        self.log(f"Re-extracting lyrics from {self.page_cache.count()} cached pages (offline)...")
+        counts = {}
+        with open(output_path, 'w', encoding='utf-8') as out:
+            for page in self.page_cache.iter_pages():
+                extractor = self.page_extractor(page.url)
+                if extractor is None:
+                    continue
+                source, extract = extractor
+                try:
+                    # J-Lyric pages are decoded as UTF-8 whatever they declare
+                    lyrics = extract(page.content if source == 'jlyric' else page.text)
+                except Exception as e:
+                    self.log(f"Error extracting {page.url}: {e}")
+                    lyrics = None
+                totals = counts.setdefault(source, {'found': 0, 'empty': 0})
+                totals['found' if lyrics else 'empty'] += 1
+                out.write(json.dumps({'url': page.url, 'source': source, 'fetched_at': page.fetched_at,
+                                      'lyrics': lyrics}, ensure_ascii=False) + '\n')
+
+        for source, totals in sorted(counts.items()):
+            self.log(f"   {lyrics_sources.label(source):<10} {totals['found']} with lyrics, {totals['empty']} without")
+        self.log(f"📄 Re-extracted lyrics saved: {output_path}")
+        return counts
+
+    def lookup_chain(self, title: str, artist: str) -> list:
+        """Sources fetch_lyrics would try for a song, in order"""
+        is_japanese = self.has_japanese_chars(title) or self.has_japanese_chars(artist)
+        chain = [source.name for source in lyrics_sources.http_chain(is_japanese)]
+        if self.server_ready and lyrics_sources.browser_only():
+            chain.append(lyrics_sources.BROWSER)
+        return chain
+
+    def plan_file(self, filepath: Path, plan: RunPlan):
+        """Classify one file the way process_file would, without network or writes"""
+        plan.counts['files'] += 1
+        probed = tag_probe.probe_lyrics(filepath)
+        if not self.overwrite and self.has_output_lyrics(filepath, probed):
+            plan.counts['skip_has_lyrics'] += 1
+            return
+
+        info = self.read_metadata(filepath)
+        if not info['title']:
+            plan.counts['no_title'] += 1
+            return
+        sidecar = find_sidecar(filepath)
+        if sidecar is None and self.skip_instrumentals and instrumental_reason(
+                info['title'], info.get('genre', ''),
+                filepath if self.detect_vocals else None, self.vocal_threshold):
+            plan.counts['skip_instrumental'] += 1
+            return
+
+        if sidecar is not None:
+            plan.counts['sidecar'] += 1
+        elif self.find_harvested(filepath, info, quiet=True) is not None:
+            plan.counts['harvested'] += 1
+        else:
+            chain = self.lookup_chain(info['title'], info['artist'])
+            if self.lookup_memo is not None:
+                query = normalize_query(info['title'], info['artist'])
+                chain = [source for source in chain if not self.lookup_memo.is_known_miss(query, source)]
+            if not chain:
+                plan.counts['known_miss'] += 1
+                return
+            plan.add_lookup(chain)
+
+        if self.output in ('sidecar', 'both') and sidecar is None:
+            plan.writes['sidecar'] += 1
+        if self.output == 'sidecar':
+            return
+
+        # Would the new lyrics fit in the tag's padding?
+        padding = probed.padding if probed is not None else None
+        fields = 2 if probed is not None and probed.format.startswith(('Ogg', 'FLAC')) \
+            and self.lyrics_fields == 'compatible' else 1
+        freed = probed.lyrics_length * len(probed.fields) if probed is not None else 0
+        plan.add_write(padding, DEFAULT_LYRICS_BYTES * fields - freed)
+
+    def plan_files(self, paths) -> RunPlan:
+        """Dry run: scan, probe and read metadata, then estimate the lookups and time.
+
+        Uses the same header-only probes and skips as a real run, but makes
+        no network requests and writes nothing (the lookup memo is only read).
+        """
+        self.processing = True  # Stop interrupts planning like a run
+        self.log("Planning run (no lookups, no writes)...")
+        self.on_status("Planning...")
+        history = LookupHistory.load(self.metrics_dir)
+        plan = RunPlan(history, self.rate_limiter.config['hosts'] if self.rate_limiter.enabled else None)
+        for filepath in self.iter_audio_files(paths):
+            try:
+                self.plan_file(filepath, plan)
+            except Exception as e:
+                self.log(f"Error planning {filepath.name}: {e}")
+            if plan.counts['files'] % 500 == 0:
+                self.on_status(f"Planning... {plan.counts['files']} files")
+        self.processing = False
+
+        self.log("\n" + "=" * 60)
+        self.log("🗺 RUN PLAN:")
+        self.log("=" * 60)
+        for line in plan.format_report():
+            self.log(f"   {line}")
+        self.log("=" * 60)
+        self.on_status("Plan ready")
+        return plan
+
+    def schedule_key(self, filepath: Path, history: LookupHistory):
+        """Priority (tier, seconds per hit, seconds) of a file and its metadata (None if not read).
+
+        Files that need no network (already tagged, instrumental, untitled,
+        sidecar lyrics, copies of harvested songs, known misses) come first;
+        the rest by expected lookup seconds per likely hit, so clean tags and
+        cheap sources go before likely misses and Puppeteer-only lookups.
+        """
+        if not self.overwrite and self.has_output_lyrics(filepath):
+            return (0, 0.0, 0.0), None
+
+        info = self.read_metadata(filepath)
+        title, artist = info['title'], info['artist']
+        if not title or (self.skip_instrumentals and instrumental_reason(title, info.get('genre', ''))):
+            return (0, 0.0, 0.0), info
+        if find_sidecar(filepath) is not None or self.find_harvested(filepath, info, quiet=True) is not None:
+            return (0, 0.0, 0.0), info
+
+        chain = self.lookup_chain(title, artist)
+        if self.lookup_memo is not None:
+            query = normalize_query(title, artist)
+            chain = [source for source in chain if not self.lookup_memo.is_known_miss(query, source)]
+        if not chain:
+            return (0, 0.0, 0.0), info
+
+        cost = sum(history.reach(source, position) * history.seconds(source)
+                   for position, source in enumerate(chain))
+        likelihood = 0.9 if artist else 0.4
+        if NOISY_TITLE_RE.search(title):
+            likelihood *= 0.6
+        return (1, cost / likelihood, cost), info
+
+    def _iter_scheduled(self, scan_queue: queue.Queue):
+        """Yield (filepath, info) from the scan queue in the configured order"""
+        if self.schedule != 'priority':
+            while self.processing:
+                try:
+                    filepath = scan_queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if filepath is _SCAN_DONE:
+                    return
+                yield filepath, None
+            return
+
+        history = LookupHistory.load(self.metrics_dir)
+        window, order = [], itertools.count()  # order breaks ties in scan order
+        scan_done = False
+        while self.processing:
+            # Top up the look-ahead window, then take the best file in it
+            while not scan_done and len(window) < PRIORITY_WINDOW:
+                try:
+                    filepath = scan_queue.get_nowait() if window else scan_queue.get(timeout=0.5)
+                except queue.Empty:
+                    break
+                if filepath is _SCAN_DONE:
+                    scan_done = True
+                    break
+                with self.metrics.stage('schedule'):
+                    key, info = self.schedule_key(filepath, history)
+                heapq.heappush(window, (key, next(order), filepath, info))
+            if window:
+                (_, _, cost), _, filepath, info = heapq.heappop(window)
+                remaining = self.budget.remaining_seconds() if self.budget is not None else None
+                if remaining is not None and 0 < remaining < cost:
+                    # Would not finish in time; cheaper files may still fit
+                    self.count_result('deferred')
+                    if self.checkpoint is not None:
+                        self.checkpoint.defer('time budget')
+                    continue
+                yield filepath, info
+            elif scan_done:
+                return
+
+    def process_file(self, filepath: Path, info: Optional[dict] = None):
+        """Run one file through check, metadata, lookup and write"""
+        self._lookup_context.deferred = None
+        self._lookup_context.duration = None
+        # Check if has lyrics
+        if not self.overwrite:
+            with self.metrics.stage('probe'):
+                has_lyrics = self.has_output_lyrics(filepath)
+            if has_lyrics:
+                self.log("  ✓ Already has lyrics, skipping")
+                self.count_result('skipped')
+                return
+
+        # Read metadata (unless the scheduler already did)
+        if info is None:
+            with self.metrics.stage('metadata'):
+                info = self.read_metadata(filepath)
+        if not info['title']:
+            self.log("  ✗ Could not determine song title")
+            self.record_failure(filepath, 'Could not determine song title')
+            return
+
+        self.log(f"  Song: {info['title']}")
+        self.log(f"  Artist: {info['artist'] or 'Unknown'}")
+
+        # A sidecar next to the file is the cheapest source there is
+        lyrics = self.find_sidecar_lyrics(filepath)
+        from_sidecar = lyrics is not None
+
+        # Instrumentals have no lyrics to find
+        if self.skip_instrumentals and not from_sidecar:
+            with self.metrics.stage('classify'):
+                reason = instrumental_reason(info['title'], info.get('genre', ''),
+                                             filepath if self.detect_vocals else None,
+                                             self.vocal_threshold)
+            if reason:
+                self.log(f"  ⊖ Likely instrumental ({reason}), skipping")
+                self.service_metrics.inc('instrumental_skipped_total')
+                self.count_result('skipped')
+                return
+
+        # Fetch lyrics
+        # Another copy of the song in the library may already have lyrics
+        if lyrics is None:
+            lyrics = self.find_harvested(filepath, info)
+        if lyrics is None:
+            self.log("  Searching for lyrics...")
+            self._lookup_context.duration = info.get('duration')  # ranks search results
+            lyrics = self.fetch_lyrics(info['title'], info['artist'])
+
+        if lyrics:
+            # Write lyrics
+            with self.metrics.stage('write'):
+                written = self.store_lyrics(filepath, lyrics, info, keep_sidecar=from_sidecar)
+            if written:
+                self.log("  ✓ Successfully added lyrics!")
+                self.count_result('success')
+                self.remember_harvest(filepath, info, lyrics)
+            else:
+                self.log("  ✗ Failed to write lyrics")
+                self.record_failure(filepath, 'Failed to write lyrics to file', info)
+        elif self._lookup_context.deferred:
+            source = self._lookup_context.deferred
+            self.log(f"  ⏸ Deferred ({lyrics_sources.label(source)} request budget used up)")
+            self.count_result('deferred')
+            if self.checkpoint is not None:
+                self.checkpoint.defer(f"{source} budget")
+        else:
+            self.log("  ✗ No lyrics found")
+            self.record_failure(filepath, 'No lyrics found online', info)
+
+    def _scan_into(self, paths, scan_queue: queue.Queue, counters: dict):
+        """Producer: feed discovered files into the bounded queue"""
+        files = self.iter_audio_files(paths)
+        try:
+            while True:
+                # Scan time is the time spent finding each file, not waiting on the queue
+                with self.metrics.stage('scan'):
+                    filepath = next(files, None)
+                if filepath is None:
+                    break
+                if self.checkpoint is not None and self.checkpoint.is_done(filepath):
+                    counters['resumed'] += 1
+                    continue
+                counters['discovered'] += 1
+                while self.processing:
+                    try:
+                        scan_queue.put(filepath, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+                if not self.processing:
+                    break
+        except Exception as e:
+            self.log(f"Error scanning for audio files: {e}")
+        finally:
+            counters['scan_complete'] = True
+            files.close()  # Shuts the scan pool down when stopped early
+            # Nobody drains the queue once processing stops: never block on it then
+            while self.processing:
+                try:
+                    scan_queue.put(_SCAN_DONE, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+
+    def process_files(self, paths, budget: Optional[RunBudget] = None,
+                      checkpoint: Optional[RunCheckpoint] = None) -> dict:
+        """Process all audio files under the given files/folders.
+
+        Scanning runs in a background thread that feeds a bounded queue, so
+        processing starts with the first file found and memory stays flat no
+        matter how large the selection is. Progress is reported as
+        processed/discovered counts since the total is not known up front.
+
+        With a budget the run stops taking new files when its time is up
+        (the file in progress finishes) and skips sources whose requests are
+        used up; a checkpoint records finished files so the rest can be
+        resumed later, and files it lists as done are not scanned again.
+        """
+        self.processing = True
+        try:
+            return self._process_files(paths, budget, checkpoint)
+        finally:
+            # Also on early returns and errors, so the processing gauge and
+            # everything waiting on it (--watch, the job server) see the end
+            self.processing = False
+
+    def _process_files(self, paths, budget: Optional[RunBudget], checkpoint: Optional[RunCheckpoint]) -> dict:
+        self.log("Scanning for audio files...")
+        self.on_status("Scanning for audio files...")
+
+        if not self.get_selected_extensions():
+            self.log("No file types selected! Please select at least one file type.")
+            return self.stats
+
+        # Check server health before starting
+        if self.server_ready:
+            if self.check_server_health():
+                self.log("✓ Puppeteer server is ready")
+            else:
+                self.log("⚠ Puppeteer server not responding, using fallback mode")
+
+        # Reset stats for new processing session
+        self.reset_stats()
+        self.budget, self.checkpoint = budget, checkpoint
+        if budget is not None:
+            budget.start()
+            self.log(f"⏱ Budget: {budget.describe()}")
+
+        if self.harvest_first:
+            self.harvest_library(paths)
+
+        counters = {'discovered': 0, 'resumed': 0, 'scan_complete': False}
+        scan_queue = queue.Queue(maxsize=SCAN_QUEUE_SIZE)
+        scanner = threading.Thread(target=self._scan_into, args=(paths, scan_queue, counters), daemon=True)
+        scanner.start()
+
+        processed = 0
+        self.service_metrics.set_gauge('scan_queue_depth', scan_queue.qsize)
+        self.service_metrics.set_gauge('files_discovered', lambda: counters['discovered'])
+        self.service_metrics.set_gauge('files_processed', lambda: processed)
+        self.log("=" * 50)
+
+        out_of_time = False
+        for filepath, info in self._iter_scheduled(scan_queue):
+            if budget is not None and budget.expired():
+                out_of_time = True
+                self.processing = False  # Stops the scanner too
+                self.log("\n⏱ Time budget used up, stopping")
+                break
+            processed += 1
+            discovered = counters['discovered']
+            total_text = f"{discovered}" if counters['scan_complete'] else f"{discovered}+ found"
+            self.on_progress(processed, discovered, counters['scan_complete'])
+            self.on_status(f"Processing {processed}/{total_text}: {filepath.name}")
+            self.log(f"\n[{processed}/{total_text}] Processing: {filepath.name}")
+
+            deferred = self.stats['deferred']
+            with self.metrics.file(filepath):
+                self.process_file(filepath, info)
+            if checkpoint is not None and self.stats['deferred'] == deferred:
+                checkpoint.mark_done(filepath)
+
+        scanner.join(timeout=1)
+        if counters['resumed']:
+            self.log(f"↪ {counters['resumed']} files already finished in an earlier run")
+        if checkpoint is not None:
+            if out_of_time:
+                # Everything found but not processed (passed-over files included);
+                # files beyond the scan so far are not known yet
+                checkpoint.deferred['time budget'] = counters['discovered'] - processed
+            complete = counters['scan_complete'] and not out_of_time and not checkpoint.deferred
+            checkpoint.save(complete)
+            checkpoint.close()
+        self.failures.close()
+        self.metrics.close()
+
+        if processed == 0 and not self.stats['deferred']:
+            self.log("No audio files found with selected extensions")
+            self.on_status("No audio files found")
+            return self.stats
+
+        self.on_progress(processed, counters['discovered'], counters['scan_complete'])
+        success, skipped, failed = self.stats['success'], self.stats['skipped'], self.stats['failed']
+        total = max(processed, 1)  # All files may have been deferred by the budget
+
+        # Final summary
+        self.log("\n" + "=" * 60)
+        self.log("🎵 PROCESSING COMPLETED! 🎵")
+        self.log("=" * 60)
+        self.log("📊 FINAL STATISTICS:")
+        self.log(f"   ✓ Successfully processed: {success}/{total} ({success/total*100:.1f}%)")
+        self.log(f"   ⊖ Skipped (already have lyrics or instrumental): {skipped}/{total} ({skipped/total*100:.1f}%)")
+        self.log(f"   ✗ Failed to process: {failed}/{total} ({failed/total*100:.1f}%)")
+        if checkpoint is not None and checkpoint.deferred:
+            deferred = ', '.join(f"{count} ({reason})" for reason, count in checkpoint.deferred.items())
+            more = " and files not scanned yet" if not counters['scan_complete'] else ""
+            self.log(f"   ⏸ Deferred: {deferred}{more}")
+            self.log(f"   ↪ Resume with: --resume {checkpoint.path}")
+        self.log("=" * 60)
+
+        if success > 0:
+            self.log(f"🎉 Great! {success} files now have lyrics!")
+        if failed > 0:
+            self.log("💡 Tip: Failed files might have unusual titles or artists")
+            self.save_failed_files_report()
+
+        self.log_stage_timings()
+        if self.metrics_dir:
+            self.save_metrics()
+
+        self.on_status(f"Completed - Success: {success}, Skipped: {skipped}, Failed: {failed}")
+        return self.stats
+
+    def log_stage_timings(self):
+        """Log the per-stage timing histograms of the last run"""
+        self.log("⏱ STAGE TIMINGS:")
+        for line in self.metrics.format_report():
+            self.log(f"   {line}")
+
+    def save_metrics(self) -> Optional[Path]:
+        """Dump the last run's metrics as JSON into metrics_dir"""
+        try:
+            metrics_file = Path(self.metrics_dir) / f"lyrics_metrics_{self.failures.timestamp}.json"
+            self.metrics.dump(metrics_file, self.stats)
+            self.log(f"📄 Run metrics saved: {metrics_file}")
+            return metrics_file
+        except Exception as e:
+            self.log(f"Error saving metrics: {e}")
+            return None
+
+    def save_failed_files_report(self):
+        """Save a report of failed files to a text file"""
+        try:
+            report_file = self.failures.write_text_report()
+            if report_file:
+                self.log(f"📄 Failed files report saved: {report_file}")
+        except Exception as e:
+            self.log(f"Error saving report: {e}")
@@ -0,0 +1,142 @@
+"""
+Lyrics harvest
+Collects the lyrics already embedded in the library, keyed by normalized
+artist/title and duration, so other copies of the same song (compilation
+tracks, an MP3 transcode next to the FLAC) get their lyrics copied locally
+instead of looked up online. The map is kept in SQLite and refreshed
+incrementally: files unchanged since they were harvested are not read again.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_HARVEST_PATH = Path.home() / '.lyrics_updater' / 'lyrics_harvest.db'
+
+# Copies whose durations differ by more than this are treated as different
+# recordings (a live or extended version)
+DEFAULT_DURATION_TOLERANCE = 3.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lyrics (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    query TEXT NOT NULL,
+    duration REAL,
+    album TEXT NOT NULL DEFAULT '',
+    lyrics TEXT NOT NULL,
+    harvested_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lyrics_query ON lyrics (query);
+"""
+
+
+class LyricsHarvest:
+    """SQLite-backed map of normalized song -> embedded lyrics"""
+
+    def __init__(self, db_path=DEFAULT_HARVEST_PATH, tolerance: float = DEFAULT_DURATION_TOLERANCE):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.tolerance = tolerance
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(lyrics)')}
+        if 'album' not in columns:  # Maps harvested before albums were kept
+            self.conn.execute("ALTER TABLE lyrics ADD COLUMN album TEXT NOT NULL DEFAULT ''")
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self.conn:
+                self.conn.commit()
+                self.conn.close()
+                self.conn = None
+
+    def is_current(self, path, stat_result) -> bool:
+        """Whether the file was harvested and has not changed since"""
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT 1 FROM lyrics WHERE path = ? AND mtime_ns = ? AND size = ?',
+                (str(path), stat_result.st_mtime_ns, stat_result.st_size)
+            ).fetchone()
+        return row is not None
+
+    def add(self, path, stat_result, query: str, duration: Optional[float], lyrics: str,
+            album: str = '', commit: bool = True):
+        with self._lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO lyrics (path, mtime_ns, size, query, duration, album, lyrics, harvested_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (str(path), stat_result.st_mtime_ns, stat_result.st_size, query, duration, album or '',
+                 lyrics, time.time())
+            )
+            if commit:
+                self.conn.commit()
+
+    def commit(self):
+        with self._lock:
+            self.conn.commit()
+
+    def find(self, query: str, duration: Optional[float] = None, exclude=None,
+             album: str = '') -> Optional[tuple]:
+        """(lyrics, source path) of the closest-duration copy of a song, or None.
+
+        When either side has no duration, only a copy from the same (named)
+        album matches. Copies whose file is gone or has changed since it was
+        harvested are dropped instead of served.
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT path, mtime_ns, size, duration, album, lyrics FROM lyrics WHERE query = ?', (query,)
+            ).fetchall()
+        best = None
+        stale = []
+        for path, mtime_ns, size, stored_duration, stored_album, lyrics in rows:
+            if exclude is not None and path == str(exclude):
+                continue
+            if duration is None or stored_duration is None:
+                if not album or stored_album != album:
+                    continue
+                distance = self.tolerance
+            else:
+                distance = abs(stored_duration - duration)
+                if distance > self.tolerance:
+                    continue
+            if best is not None and distance >= best[0]:
+                continue
+            try:
+                stat_result = os.stat(path)
+            except OSError:
+                stale.append(path)
+                continue
+            if stat_result.st_mtime_ns != mtime_ns or stat_result.st_size != size:
+                stale.append(path)
+                continue
+            best = (distance, lyrics, path)
+        if stale:
+            with self._lock:
+                self.conn.executemany('DELETE FROM lyrics WHERE path = ?', [(path,) for path in stale])
+                self.conn.commit()
+        return (best[1], best[2]) if best else None
+
+    def forget(self, path):
+        with self._lock:
+            self.conn.execute('DELETE FROM lyrics WHERE path = ?', (str(path),))
+            self.conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM lyrics').fetchone()[0]
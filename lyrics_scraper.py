@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Command line lyrics updater
+Runs the same engine as the GUI without a window. Uses the Puppeteer server
+when one is running (node scraper.js), otherwise the direct-request fallback.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import dir_scan
+import lyrics_tags
+from job_client import RemoteEngine, find_server
+from folder_watch import DEFAULT_POLL_INTERVAL, DEFAULT_SETTLE_SECONDS, watch_folders
+from lyrics_engine import LyricsEngine, DEFAULT_FILE_TYPES, SCHEDULES
+from lookup_memo import DEFAULT_MEMO_PATH, DEFAULT_TTL_DAYS
+from lyrics_harvest import DEFAULT_HARVEST_PATH
+from page_cache import DEFAULT_MAX_MB, DEFAULT_PAGE_CACHE_PATH
+from run_budget import RunBudget, RunCheckpoint, parse_source_budgets
+from run_metrics import PROFILERS, profile_run, start_metrics_server
+from sidecar import OUTPUT_MODES, SIDECAR_FORMATS
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Add lyrics to audio files from the command line',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python lyrics_scraper.py /Music                       # Add missing lyrics
+  python lyrics_scraper.py song.mp3 --overwrite         # Replace existing lyrics
+  python lyrics_scraper.py /Music --types mp3 flac      # Only some formats
+  python lyrics_scraper.py /Music --metrics-dir metrics # Save per-run stage timings
+  python lyrics_scraper.py /Music --profile cprofile    # Profile the run
+  python lyrics_scraper.py /Music --metrics-port 9464   # Serve Prometheus metrics
+  python lyrics_scraper.py /Music --no-memo             # Retry songs not found before
+  python lyrics_scraper.py /Music --detect-vocals       # Also check the audio for vocals
+  python lyrics_scraper.py /Music --plan --metrics-dir metrics  # Estimate the run first
+  python lyrics_scraper.py /Music --schedule priority   # Likely hits first
+  python lyrics_scraper.py /Music --harvest             # Reuse lyrics of other copies first
+  python lyrics_scraper.py /Music --output sidecar --sidecar-format lrc  # song.lrc, audio untouched
+  python lyrics_scraper.py /Music --max-minutes 120 --max-requests genius=3000  # Nightly job
+  python lyrics_scraper.py --resume lyrics_checkpoint_20250101_020000.json       # Continue it
+  python lyrics_scraper.py E:/Music F:/Music --scan-workers 32  # Network shares
+  python lyrics_scraper.py /Music --server              # Run on the shared job server
+  python lyrics_scraper.py /Music --watch               # Daemon: tag new files as they arrive
+  python lyrics_scraper.py --reextract                  # Re-run extractors on cached pages, offline
+        """
+    )
+
+    parser.add_argument('paths', nargs='*', help='Audio files or folders to process')
+    parser.add_argument('--overwrite', action='store_true',
+                       help='Replace lyrics even if they already exist')
+    parser.add_argument('--types', nargs='+', choices=sorted(DEFAULT_FILE_TYPES),
+                       help='File types to process (default: all except "other")')
+    parser.add_argument('--server', nargs='?', const='', metavar='ADDRESS',
+                       help='Run the job on a running job server (job_server.py; found automatically '
+                            'when no address is given) to share its browser and caches')
+    parser.add_argument('--scraper-url', default='http://localhost:3000',
+                       help='URL of the Puppeteer server (default: http://localhost:3000)')
+    parser.add_argument('--report-dir', default='.',
+                       help='Folder for failed files reports (default: current folder)')
+    parser.add_argument('--metrics-dir',
+                       help='Save a JSON metrics dump and per-file stage timings for the run here '
+                            '(--plan reads earlier dumps from here for its time estimate)')
+    parser.add_argument('--plan', action='store_true',
+                       help='Dry run: report skips, lookups, rewrites and estimated time, then exit')
+    parser.add_argument('--plan-json', help='With --plan, also save the plan as JSON here')
+    parser.add_argument('--metrics-port', type=int,
+                       help='Serve Prometheus metrics at http://127.0.0.1:PORT/metrics while running')
+    parser.add_argument('--memo', default=str(DEFAULT_MEMO_PATH),
+                       help=f'Database of lookups that found nothing (default: {DEFAULT_MEMO_PATH})')
+    parser.add_argument('--memo-ttl-days', type=float, default=DEFAULT_TTL_DAYS,
+                       help=f'Retry a source for a song after this many days (default: {DEFAULT_TTL_DAYS}, ±25%%)')
+    parser.add_argument('--no-memo', action='store_true',
+                       help='Ignore remembered misses and query every source')
+    parser.add_argument('--lyrics-fields', choices=lyrics_tags.FIELD_POLICIES,
+                       default=lyrics_tags.DEFAULT_FIELD_POLICY,
+                       help='compatible: LYRICS + UNSYNCED LYRICS in FLAC/OGG; single: LYRICS only '
+                            '(default: %(default)s)')
+    parser.add_argument('--output', choices=OUTPUT_MODES, default='embed',
+                       help='embed: write the audio tags; sidecar: write song.txt/song.lrc next to the '
+                            'file instead (no audio rewrite); both (default: %(default)s)')
+    parser.add_argument('--sidecar-format', choices=SIDECAR_FORMATS, default='txt',
+                       help='Sidecar file type to write (default: %(default)s). Existing .lrc/.txt '
+                            'sidecars are always used as a lyrics source')
+    parser.add_argument('--harvest', action='store_true',
+                       help='First collect the lyrics already embedded in the selection, so other '
+                            'copies of those songs are filled in without going online')
+    parser.add_argument('--harvest-db', default=str(DEFAULT_HARVEST_PATH),
+                       help=f'Map of lyrics found in the library (default: {DEFAULT_HARVEST_PATH})')
+    parser.add_argument('--no-harvest', action='store_true',
+                       help='Do not copy lyrics between copies of a song')
+    parser.add_argument('--page-cache', default=str(DEFAULT_PAGE_CACHE_PATH),
+                       help=f'Compressed cache of fetched pages (default: {DEFAULT_PAGE_CACHE_PATH})')
+    parser.add_argument('--page-cache-mb', type=float, default=DEFAULT_MAX_MB,
+                       help='Size cap of the page cache; least recently used pages go first (default: %(default)s)')
+    parser.add_argument('--no-page-cache', action='store_true',
+                       help='Do not keep fetched pages')
+    parser.add_argument('--reextract', nargs='?', const='', metavar='OUT',
+                       help='Extract and clean lyrics again from every cached page without going online, '
+                            'save them as JSON Lines (default: in --report-dir) and exit')
+    parser.add_argument('--schedule', choices=SCHEDULES, default='walk',
+                       help='walk: files in scan order; priority: cheap, likely hits first (default: walk)')
+    parser.add_argument('--scan-workers', type=int, default=dir_scan.DEFAULT_WORKERS,
+                       help='Folders listed at once while scanning; raise for network shares (default: %(default)s)')
+    parser.add_argument('--include-instrumentals', action='store_true',
+                       help='Look up tracks that look instrumental (intro, karaoke, off vocal...) too')
+    parser.add_argument('--detect-vocals', action='store_true',
+                       help='Also skip tracks with little vocal-band energy (needs NumPy; ffmpeg for non-WAV files)')
+    parser.add_argument('--max-minutes', type=float,
+                       help='Stop taking new files after this many minutes (leaves a checkpoint)')
+    parser.add_argument('--max-requests', nargs='+', metavar='SOURCE=N', default=[],
+                       help='Per-source request budgets, e.g. genius=3000 azlyrics=500 '
+                            '(sources: puppeteer, utaten, jlyric, genius, azlyrics)')
+    parser.add_argument('--resume', metavar='CHECKPOINT',
+                       help='Continue a budgeted run from its checkpoint, skipping finished files')
+    parser.add_argument('--watch', action='store_true',
+                       help='Keep running and process new or modified files under the folders')
+    parser.add_argument('--settle', type=float, default=DEFAULT_SETTLE_SECONDS,
+                       help=f'With --watch, wait until a file is unchanged this long (default: {DEFAULT_SETTLE_SECONDS:.0f}s)')
+    parser.add_argument('--polling', action='store_true',
+                       help='With --watch, poll instead of using inotify (network shares, non-Linux)')
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                       help=f'Seconds between polls (default: {DEFAULT_POLL_INTERVAL:.0f})')
+    parser.add_argument('--profile', choices=PROFILERS,
+                       help='Profile the run with cProfile or pyinstrument')
+    parser.add_argument('--profile-out',
+                       help='Profile output file (default: lyrics_profile.prof / lyrics_profile.html)')
+
+    args = parser.parse_args()
+    try:
+        source_budgets = parse_source_budgets(args.max_requests)
+    except ValueError as e:
+        parser.error(str(e))
+    if not args.paths and not args.resume and args.reextract is None:
+        parser.error('give audio files/folders or --resume CHECKPOINT')
+
+    if args.server is not None:
+        return run_on_server(parser, args)
+
+    engine = LyricsEngine(scraper_url=args.scraper_url, report_dir=args.report_dir,
+                          metrics_dir=args.metrics_dir,
+                          memo_path=None if args.no_memo else args.memo,
+                          memo_ttl_days=args.memo_ttl_days,
+                          harvest_path=None if args.no_harvest else args.harvest_db,
+                          page_cache_path=None if args.no_page_cache else args.page_cache,
+                          page_cache_mb=args.page_cache_mb)
+    engine.overwrite = args.overwrite
+    engine.lyrics_fields = args.lyrics_fields
+    engine.output = args.output
+    engine.sidecar_format = args.sidecar_format
+    engine.schedule = args.schedule
+    engine.scan_workers = max(1, args.scan_workers)
+    engine.harvest_first = args.harvest and not args.no_harvest
+    engine.skip_instrumentals = not args.include_instrumentals
+    engine.detect_vocals = args.detect_vocals
+    if args.types:
+        engine.file_types = {file_type: file_type in args.types for file_type in DEFAULT_FILE_TYPES}
+
+    try:
+        return run_locally(engine, args, source_budgets)
+    finally:
+        engine.shutdown()  # Closes the memo, harvest map and page cache
+
+
+def run_locally(engine, args, source_budgets) -> int:
+    """Run the command on this engine: re-extract, plan, watch or a normal run"""
+    if args.reextract is not None:
+        counts = engine.reextract_cache(args.reextract or None)
+        return 0 if counts else 1
+
+    if args.metrics_port:
+        start_metrics_server(engine.service_metrics, args.metrics_port)
+        print(f"📈 Metrics at http://127.0.0.1:{args.metrics_port}/metrics")
+
+    checkpoint = None
+    if args.resume:
+        checkpoint = RunCheckpoint.load(args.resume)
+        args.paths = args.paths or checkpoint.paths
+        print(f"↪ Resuming {args.resume}: {len(checkpoint.done)} files already finished")
+
+    missing = [p for p in args.paths if not Path(p).exists()]
+    for path in missing:
+        print(f"❌ Path not found: {path}")
+
+    if args.plan:
+        if engine.harvest_first:
+            engine.processing = True
+            engine.harvest_library([p for p in args.paths if p not in missing])
+        plan = engine.plan_files([p for p in args.paths if p not in missing])
+        if args.plan_json:
+            with open(args.plan_json, 'w', encoding='utf-8') as f:
+                json.dump(plan.to_dict(), f, indent=2)
+            print(f"📄 Plan saved: {args.plan_json}")
+        return 1 if missing else 0
+
+    # Not before --plan: /init launches the browser of a running scraper.js
+    if engine.connect_server():
+        print("✓ Using Puppeteer server")
+    else:
+        print("⚠ Puppeteer server not running, using fallback mode")
+
+    if args.watch:
+        roots = [p for p in args.paths if p not in missing and Path(p).is_dir()]
+        if not roots:
+            print("❌ --watch needs at least one existing folder")
+            return 1
+        try:
+            watch_folders(engine, roots, args.settle, args.polling, args.poll_interval)
+        except KeyboardInterrupt:
+            engine.processing = False
+            print("\nStopped watching")
+        return 0
+
+    budget = None
+    if args.max_minutes or source_budgets:
+        budget = RunBudget(args.max_minutes * 60 if args.max_minutes else None, source_budgets)
+        if checkpoint is None:
+            checkpoint = RunCheckpoint.create(args.report_dir, [p for p in args.paths if p not in missing])
+
+    try:
+        with profile_run(args.profile, args.profile_out):
+            stats = engine.process_files([p for p in args.paths if p not in missing], budget, checkpoint)
+    except KeyboardInterrupt:
+        engine.processing = False
+        print("\nProcessing stopped by user")
+        return 1
+
+    return 1 if stats['failed'] or missing else 0
+
+
+def run_on_server(parser, args) -> int:
+    """Submit the paths to the job server and follow the job"""
+    local_only = args.plan or args.watch or args.resume or args.reextract is not None
+    if local_only or args.max_minutes or args.max_requests:
+        parser.error('--plan, --watch, --resume, --reextract and budgets run locally, not with --server')
+    client = find_server(args.server or None)
+    if client is None:
+        print("❌ No job server running (start one with: python job_server.py)")
+        return 1
+
+    engine = RemoteEngine(client)
+    engine.overwrite = args.overwrite
+    engine.skip_instrumentals = not args.include_instrumentals
+    if args.types:
+        engine.file_types = {file_type: file_type in args.types for file_type in DEFAULT_FILE_TYPES}
+    engine.options = {
+        'lyrics_fields': args.lyrics_fields, 'output': args.output, 'sidecar_format': args.sidecar_format,
+        'schedule': args.schedule, 'scan_workers': max(1, args.scan_workers),
+        'harvest_first': args.harvest and not args.no_harvest, 'detect_vocals': args.detect_vocals,
+    }
+    if not engine.connect_server():
+        return 1
+
+    missing = [p for p in args.paths if not Path(p).exists()]
+    for path in missing:
+        print(f"❌ Path not found: {path}")
+    try:
+        stats = engine.process_files([p for p in args.paths if p not in missing])
+    except KeyboardInterrupt:
+        engine.processing = False
+        print("\nProcessing stopped by user (job stopped on the server)")
+        return 1
+    return 1 if stats['failed'] or missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Lyrics source registry
+Every lyrics site is declared once: whether it needs a JavaScript-capable
+browser, the element its lyrics are in (the extraction rule the streaming
+reader and extractors use), and what a lookup is expected to cost. The
+engine builds its lookup chain from here, trying plain HTTP sources first,
+cheapest first, and only escalating to the Puppeteer browser for sources or
+pages that need one.
+"""
+
+from typing import Callable, NamedTuple, Optional
+
+from html_stream import Container
+
+# The Puppeteer server counts as one source for stages, memo and budgets
+BROWSER = 'puppeteer'
+BROWSER_LABEL = 'Puppeteer'
+BROWSER_SECONDS = 12.0
+
+
+class LyricsSource(NamedTuple):
+    name: str  # key of the lookup.<name> stage, memo entries and budgets
+    label: str
+    host: str  # counts against this host in rate_limits.json
+    needs_js: bool = False  # only reachable through the browser
+    japanese: bool = False  # Japanese songs only, tried before the others
+    containers: tuple = ()  # where the lyrics are on a lyrics page (html_stream.Container)
+    seconds: float = 1.0  # expected seconds per lookup, until there is history
+    requests: int = 1  # HTTP requests per lookup (search + lyrics page = 2)
+    browser_name: Optional[str] = None  # name of the source in scraper.js, if it has one
+    # lookup(engine, title, artist) for plugins; built-in sources are LyricsEngine.lookup_<name>
+    lookup: Optional[Callable] = None
+
+
+SOURCES = {}
+
+
+def register(source: LyricsSource) -> LyricsSource:
+    """Add (or replace) a source; registration order breaks cost ties"""
+    SOURCES[source.name] = source
+    return source
+
+
+register(LyricsSource(
+    'utaten', 'Utaten', 'utaten.com', japanese=True, seconds=2.0, requests=2, browser_name='Utaten',
+    containers=(Container('div', {'class': 'lyric'}), Container('div', {'id': 'lyric'})),
+))
+register(LyricsSource(
+    'jlyric', 'J-Lyric', 'j-lyric.net', japanese=True, seconds=2.0, requests=2,
+    containers=(Container('p', {'id': 'Lyric'}), Container('div', {'id': 'Lyric'})),
+))
+register(LyricsSource(
+    'genius', 'Genius', 'genius.com', seconds=1.0, browser_name='Genius',
+    # Lyrics are split over sibling containers: read until their parent closes
+    containers=(Container('div', {'data-lyrics-container': 'true'}, scope='parent'),),
+))
+register(LyricsSource(
+    'azlyrics', 'AZLyrics', 'azlyrics.com', seconds=1.0, browser_name='AZLyrics',
+    containers=(Container('div', {'class': None, 'id': None}, after_comment='Usage of azlyrics'),),
+))
+register(LyricsSource(
+    'google', 'Google', 'google.com', needs_js=True, seconds=BROWSER_SECONDS, browser_name='Google',
+))
+
+
+def label(name: str) -> str:
+    if name == BROWSER:
+        return BROWSER_LABEL
+    source = SOURCES.get(name)
+    return source.label if source else name
+
+
+def http_chain(japanese: bool) -> list:
+    """Sources that work over plain HTTP, in the order to try them"""
+    sources = [source for source in SOURCES.values()
+               if not source.needs_js and (japanese or not source.japanese)]
+    # Japanese sites first for Japanese songs, then by expected cost
+    return sorted(sources, key=lambda source: (not source.japanese, source.seconds))
+
+
+def browser_only() -> list:
+    """Sources that can only be scraped with the browser"""
+    return [source for source in SOURCES.values() if source.needs_js and source.browser_name]
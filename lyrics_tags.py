@@ -0,0 +1,316 @@
+"""
+Lyrics tag access shared by the GUI and the verification scripts
+One dispatch table maps each mutagen file type to the tag fields that hold
+lyrics, so every caller agrees on what "has lyrics" means. The scripts also
+share the walk that finds the audio files to check.
+
+Writes replace whatever lyrics fields a file already has with exactly the
+fields of the chosen policy, and report when the stored lyrics are already
+identical so the caller can skip saving the file.
+"""
+
+import os
+from typing import Iterator, List, Optional, Tuple
+
+import dir_scan
+
+# Audio files the verification scripts look at
+AUDIO_EXTENSIONS = {'.mp3', '.m4a', '.mp4', '.flac', '.ogg', '.wav', '.wma', '.aac'}
+
+# Lyrics fields in Vorbis comments (FLAC, OGG, Opus); keys are case-insensitive
+VORBIS_LYRICS_FIELDS = ['LYRICS', 'UNSYNCED LYRICS', 'UNSYNCEDLYRICS']
+
+# Field-set policies: 'compatible' writes every field common taggers read
+# (Vorbis: LYRICS and UNSYNCED LYRICS), 'single' writes one field per format
+FIELD_POLICIES = ('compatible', 'single')
+DEFAULT_FIELD_POLICY = 'compatible'
+
+# Fields probed when a file type is not in the table
+GENERIC_LYRICS_FIELDS = ['lyrics', 'LYRICS', 'UNSYNCED LYRICS', 'UNSYNCEDLYRICS',
+                         '\xa9lyr', 'WM/Lyrics', 'Lyrics']
+
+
+class LyricsFormatError(Exception):
+    """Raised when lyrics cannot be stored in a file format"""
+
+
+def _text(value) -> str:
+    """Normalize a tag value (list, frame or attribute) to a string"""
+    if isinstance(value, list):
+        value = value[0] if value else ''
+    return str(value)
+
+
+def _values(value) -> List[str]:
+    """All strings stored in a tag value"""
+    if isinstance(value, list):
+        return [str(item) for item in value]
+    return [str(value)]
+
+
+class LyricsFormat:
+    """Where one family of tag formats keeps its lyrics"""
+    name = 'Unknown'
+    fields: List[str] = []
+    writable = False  # True where the generic mapping-style write() applies
+
+    def read(self, audio) -> List[Tuple[str, str]]:
+        """Return (field, lyrics) for every non-empty lyrics field"""
+        found = []
+        for field in self.fields:
+            try:
+                if field in audio:
+                    text = _text(audio[field])
+                    if text.strip():
+                        found.append((field, text))
+            except (KeyError, ValueError, TypeError):
+                continue
+        return found
+
+    def targets(self, policy: str) -> List[str]:
+        """Fields to write under a field-set policy"""
+        return self.fields[:1]
+
+    def tag_map(self, audio):
+        """The mapping holding the lyrics fields (the file itself for most formats)"""
+        return audio
+
+    def write(self, audio, lyrics: str, policy: str = DEFAULT_FIELD_POLICY) -> bool:
+        """Store lyrics in exactly the policy's fields; False if nothing changed"""
+        if not self.writable:
+            raise LyricsFormatError(f"Cannot write lyrics to {type(audio).__name__} files")
+        if audio.tags is None:
+            audio.add_tags()
+        tags = self.tag_map(audio)
+        targets = self.targets(policy)
+
+        stale = [field for field in self.fields if field not in targets and field in tags]
+        if not stale and all(field in tags and _values(tags[field]) == [lyrics] for field in targets):
+            return False
+
+        for field in stale:
+            del tags[field]
+        for field in targets:
+            tags[field] = lyrics
+        return True
+
+
+class Id3Lyrics(LyricsFormat):
+    """USLT frames in ID3 tags (MP3, WAV, AIFF, ...)"""
+    name = 'ID3'
+    fields = ['USLT']
+
+    def read(self, audio):
+        if audio.tags is None or not hasattr(audio.tags, 'getall'):
+            return []
+        return [('USLT', str(frame.text)) for frame in audio.tags.getall('USLT')
+                if str(frame.text).strip()]
+
+    def write(self, audio, lyrics, policy=DEFAULT_FIELD_POLICY):
+        from mutagen.id3 import USLT
+        if audio.tags is None:
+            audio.add_tags()
+        # Frames with another language/description would otherwise pile up
+        frames = audio.tags.getall('USLT')
+        if len(frames) == 1 and frames[0].text == lyrics:
+            return False
+        audio.tags.delall('USLT')
+        audio.tags.add(USLT(encoding=3, lang='eng', desc='', text=lyrics))
+        return True
+
+
+class Mp4Lyrics(LyricsFormat):
+    """The ©lyr atom in MP4/M4A files"""
+    name = 'MP4'
+    fields = ['\xa9lyr']
+    writable = True
+
+
+class VorbisLyrics(LyricsFormat):
+    """Vorbis comments (FLAC, OGG, Opus)"""
+    name = 'Vorbis'
+    fields = VORBIS_LYRICS_FIELDS
+    writable = True
+
+    def targets(self, policy):
+        if policy == 'single':
+            return ['LYRICS']
+        # MP3Tag compatible fields
+        return ['LYRICS', 'UNSYNCED LYRICS']  # MP3Tag uses this exact field name
+
+
+class AsfLyrics(LyricsFormat):
+    """WMA attributes"""
+    name = 'ASF'
+    fields = ['WM/Lyrics', 'Lyrics']
+    writable = True
+
+
+class ApeLyrics(LyricsFormat):
+    """APEv2 tags (Monkey's Audio, WavPack, Musepack, ...); keys are case-insensitive"""
+    name = 'APEv2'
+    fields = ['Lyrics']
+    writable = True
+
+    def read(self, audio):
+        if audio.tags is None:
+            return []
+        return super().read(audio.tags)
+
+    def tag_map(self, audio):
+        return audio.tags
+
+
+class NoLyrics(LyricsFormat):
+    """Formats mutagen cannot tag (raw AAC/AC3 streams, MIDI)"""
+    name = 'None'
+
+    def read(self, audio):
+        return []
+
+
+class GenericLyrics(LyricsFormat):
+    """Fallback for file types missing from the table"""
+    name = 'Generic'
+    fields = GENERIC_LYRICS_FIELDS
+
+    def read(self, audio):
+        if not hasattr(audio, '__contains__'):
+            return []
+        found = super().read(audio)
+        if audio.tags is not None and hasattr(audio.tags, 'getall'):
+            found += Id3Lyrics().read(audio)
+        return found
+
+    def write(self, audio, lyrics, policy=DEFAULT_FIELD_POLICY):
+        if audio.tags is not None and hasattr(audio.tags, 'getall'):
+            return Id3Lyrics().write(audio, lyrics, policy)
+        for field in ('lyrics', 'LYRICS', '\xa9lyr'):
+            try:
+                audio[field] = lyrics
+                return True
+            except Exception:
+                continue
+        return super().write(audio, lyrics, policy)
+
+
+ID3_LYRICS = Id3Lyrics()
+MP4_LYRICS = Mp4Lyrics()
+VORBIS_LYRICS = VorbisLyrics()
+ASF_LYRICS = AsfLyrics()
+APE_LYRICS = ApeLyrics()
+NO_LYRICS = NoLyrics()
+GENERIC_LYRICS = GenericLyrics()
+
+# mutagen FileType class name -> lyrics format
+FORMAT_TABLE = {
+    'MP3': ID3_LYRICS,
+    'TrueAudio': ID3_LYRICS,
+    'WAVE': ID3_LYRICS,
+    'AIFF': ID3_LYRICS,
+    'DSF': ID3_LYRICS,
+    'DSDIFF': ID3_LYRICS,
+    'MP4': MP4_LYRICS,
+    'FLAC': VORBIS_LYRICS,
+    'OggVorbis': VORBIS_LYRICS,
+    'OggOpus': VORBIS_LYRICS,
+    'OggFLAC': VORBIS_LYRICS,
+    'OggSpeex': VORBIS_LYRICS,
+    'OggTheora': VORBIS_LYRICS,
+    'ASF': ASF_LYRICS,
+    'APEv2File': APE_LYRICS,
+    'MonkeysAudio': APE_LYRICS,
+    'WavPack': APE_LYRICS,
+    'Musepack': APE_LYRICS,
+    'OptimFROG': APE_LYRICS,
+    'TAK': APE_LYRICS,
+    'AAC': NO_LYRICS,
+    'AC3': NO_LYRICS,
+    'SMF': NO_LYRICS,
+}
+
+# Resolved once per concrete file type (subclasses such as EasyMP3 included)
+_format_cache = {}
+
+
+def format_for(audio) -> LyricsFormat:
+    """Return the lyrics format for a loaded mutagen file"""
+    file_type = type(audio)
+    lyrics_format = _format_cache.get(file_type)
+    if lyrics_format is None:
+        lyrics_format = GENERIC_LYRICS
+        for cls in file_type.__mro__:
+            if cls.__name__ in FORMAT_TABLE:
+                lyrics_format = FORMAT_TABLE[cls.__name__]
+                break
+        _format_cache[file_type] = lyrics_format
+    return lyrics_format
+
+
+def read_lyrics(audio) -> List[Tuple[str, str]]:
+    """Return (field, lyrics) for every lyrics field present in the file"""
+    return format_for(audio).read(audio)
+
+
+def get_lyrics(audio) -> Optional[str]:
+    """Return the longest stored lyrics, or None"""
+    found = read_lyrics(audio)
+    if not found:
+        return None
+    return max((text for _, text in found), key=len)
+
+
+def has_lyrics(audio) -> bool:
+    """Check if a loaded mutagen file has non-empty lyrics"""
+    return bool(read_lyrics(audio))
+
+
+def write_lyrics(audio, lyrics: str, policy: str = DEFAULT_FIELD_POLICY) -> bool:
+    """Set lyrics on a loaded mutagen file (the caller saves it).
+
+    Returns False when the file already holds exactly these lyrics in exactly
+    the policy's fields, so there is nothing to save.
+    """
+    return format_for(audio).write(audio, lyrics, policy)
+
+
+def iter_audio_files(directory) -> Iterator[tuple]:
+    """Walk a directory tree in parallel, yielding (path, DirEntry) for audio files"""
+    def is_audio(name):
+        return os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS
+
+    for entry in dir_scan.scan([directory], is_audio):
+        yield entry.path, entry
+
+
+def check_file(filepath, use_probe: bool = True) -> dict:
+    """Report a file's format and lyrics without printing anything.
+
+    The header-only probe in tag_probe is tried first; mutagen is only used
+    for formats the probe does not handle.
+    """
+    result = {'path': str(filepath), 'format': None, 'has_lyrics': False,
+              'lyrics_length': 0, 'fields': [], 'error': None}
+    if use_probe:
+        from tag_probe import probe_lyrics
+        probed = probe_lyrics(filepath)
+        if probed is not None:
+            result.update(format=probed.format, has_lyrics=probed.has_lyrics,
+                          lyrics_length=probed.lyrics_length, fields=list(probed.fields))
+            return result
+
+    import mutagen
+    try:
+        audio = mutagen.File(str(filepath))
+        if not audio:
+            result['error'] = 'Could not read audio file'
+            return result
+        result['format'] = type(audio).__name__
+        found = read_lyrics(audio)
+        if found:
+            result['has_lyrics'] = True
+            result['lyrics_length'] = max(len(text) for _, text in found)
+            result['fields'] = [field for field, _ in found]
+    except Exception as e:
+        result['error'] = str(e)
+    return result
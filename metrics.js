@@ -0,0 +1,101 @@
+// Prometheus-style metrics for the scraper server.
+// Buckets match BUCKETS in run_metrics.py so Python and Node latencies can be
+// compared on the same dashboard.
+
+const BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30];
+
+function labelKey(labels) {
+    return JSON.stringify(Object.keys(labels).sort().map(key => [key, String(labels[key])]));
+}
+
+function formatLabels(entries) {
+    if (!entries.length) return '';
+    const parts = entries.map(([key, value]) =>
+        `${key}="${value.replace(/\\/g, '\\\\').replace(/"/g, '\\"').replace(/\n/g, '\\n')}"`);
+    return `{${parts.join(',')}}`;
+}
+
+class Metrics {
+    constructor(prefix = 'lyrics_scraper') {
+        this.prefix = prefix;
+        this.families = new Map(); // name -> { type, help, series: Map(labelKey -> value) }
+    }
+
+    family(name, type, help) {
+        const fullName = `${this.prefix}_${name}`;
+        if (!this.families.has(fullName)) {
+            this.families.set(fullName, { type, help, series: new Map() });
+        }
+        return this.families.get(fullName);
+    }
+
+    inc(name, labels = {}, amount = 1, help = '') {
+        const series = this.family(name, 'counter', help).series;
+        const key = labelKey(labels);
+        series.set(key, (series.get(key) || 0) + amount);
+    }
+
+    // fn is called at scrape time
+    gauge(name, fn, labels = {}, help = '') {
+        this.family(name, 'gauge', help).series.set(labelKey(labels), fn);
+    }
+
+    observe(name, seconds, labels = {}, help = '') {
+        const series = this.family(name, 'histogram', help).series;
+        const key = labelKey(labels);
+        let histogram = series.get(key);
+        if (!histogram) {
+            histogram = { counts: new Array(BUCKETS.length + 1).fill(0), sum: 0, count: 0 };
+            series.set(key, histogram);
+        }
+        let index = BUCKETS.findIndex(bound => seconds <= bound);
+        if (index === -1) index = BUCKETS.length;
+        histogram.counts[index] += 1;
+        histogram.sum += seconds;
+        histogram.count += 1;
+    }
+
+    // Time an async call and record it in a histogram
+    async time(name, labels, fn, help = '') {
+        const start = process.hrtime.bigint();
+        try {
+            return await fn();
+        } finally {
+            this.observe(name, Number(process.hrtime.bigint() - start) / 1e9, labels, help);
+        }
+    }
+
+    render() {
+        const lines = [];
+        for (const [name, { type, help, series }] of [...this.families.entries()].sort()) {
+            if (help) lines.push(`# HELP ${name} ${help}`);
+            lines.push(`# TYPE ${name} ${type}`);
+            for (const [key, value] of series) {
+                const labels = JSON.parse(key);
+                if (type === 'histogram') {
+                    let cumulative = 0;
+                    value.counts.forEach((count, i) => {
+                        cumulative += count;
+                        const le = i < BUCKETS.length ? String(BUCKETS[i]) : '+Inf';
+                        lines.push(`${name}_bucket${formatLabels([...labels, ['le', le]])} ${cumulative}`);
+                    });
+                    lines.push(`${name}_sum${formatLabels(labels)} ${value.sum}`);
+                    lines.push(`${name}_count${formatLabels(labels)} ${value.count}`);
+                } else if (type === 'gauge') {
+                    let current;
+                    try {
+                        current = value();
+                    } catch (e) {
+                        continue;
+                    }
+                    lines.push(`${name}${formatLabels(labels)} ${Number(current)}`);
+                } else {
+                    lines.push(`${name}${formatLabels(labels)} ${value}`);
+                }
+            }
+        }
+        return lines.join('\n') + '\n';
+    }
+}
+
+module.exports = { Metrics, BUCKETS };
@@ -0,0 +1,189 @@
+"""
+Raw page cache
+Keeps the HTML of fetched lyrics and search pages, zlib-compressed and
+stored once per distinct content (SHA-256), with the URL, fetch time and the
+ETag/Last-Modified validators. Cached pages are revalidated with conditional
+requests (a 304 costs no page download), and the cache can be re-extracted
+entirely offline after an extractor or clean_lyrics change. Least recently
+used pages are evicted above a size cap. Streamed lyrics pages are stored as
+read, i.e. up to the end of the lyrics.
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Iterator, Optional
+
+DEFAULT_PAGE_CACHE_PATH = Path.home() / '.lyrics_updater' / 'page_cache.db'
+DEFAULT_MAX_MB = 256
+
+# Evict down to this share of the cap, so eviction does not run on every store
+EVICT_TO = 0.9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    used_at REAL NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    content_type TEXT
+);
+CREATE INDEX IF NOT EXISTS pages_used ON pages (used_at);
+CREATE INDEX IF NOT EXISTS pages_hash ON pages (hash);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL
+);
+"""
+
+_CHARSET_RE = re.compile(r'charset=["\']?([\w-]+)', re.IGNORECASE)
+
+
+class CachedPage:
+    """A cached response; has the parts of requests.Response the extractors use"""
+
+    status_code = 200
+
+    def __init__(self, url: str, content: bytes, fetched_at: float, etag: Optional[str] = None,
+                 last_modified: Optional[str] = None, content_type: Optional[str] = None):
+        self.url = url
+        self.content = content
+        self.fetched_at = fetched_at
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_type = content_type
+
+    @property
+    def encoding(self) -> str:
+        match = _CHARSET_RE.search(self.content_type or '')
+        return match.group(1) if match else 'utf-8'
+
+    @property
+    def text(self) -> str:
+        try:
+            return self.content.decode(self.encoding, errors='replace')
+        except LookupError:
+            return self.content.decode('utf-8', errors='replace')
+
+    def validators(self) -> dict:
+        """Headers for a conditional request"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class PageCache:
+    """SQLite-backed, content-addressed store of compressed pages with LRU eviction"""
+
+    def __init__(self, db_path=DEFAULT_PAGE_CACHE_PATH, max_mb: float = DEFAULT_MAX_MB):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        self.total_bytes = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self.conn:
+                self.conn.commit()
+                self.conn.close()
+                self.conn = None
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT p.fetched_at, p.etag, p.last_modified, p.content_type, b.data '
+                'FROM pages p JOIN blobs b ON b.hash = p.hash WHERE p.url = ?', (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        fetched_at, etag, last_modified, content_type, data = row
+        return CachedPage(url, zlib.decompress(data), fetched_at, etag, last_modified, content_type)
+
+    def touch(self, url: str):
+        """Mark a page as used (revalidated with a 304)"""
+        with self._lock:
+            self.conn.execute('UPDATE pages SET used_at = ? WHERE url = ?', (time.time(), url))
+            self.conn.commit()
+
+    def put(self, url: str, content: bytes, headers=None):
+        """Store a page; identical content fetched from several URLs is kept once"""
+        headers = headers or {}
+        digest = hashlib.sha256(content).hexdigest()
+        now = time.time()
+        with self._lock:
+            if self.conn.execute('SELECT 1 FROM blobs WHERE hash = ?', (digest,)).fetchone() is None:
+                data = zlib.compress(content, 6)
+                self.conn.execute('INSERT INTO blobs (hash, data, size) VALUES (?, ?, ?)',
+                                  (digest, data, len(data)))
+                self.total_bytes += len(data)
+            old = self.conn.execute('SELECT hash FROM pages WHERE url = ?', (url,)).fetchone()
+            self.conn.execute(
+                'INSERT OR REPLACE INTO pages (url, hash, fetched_at, used_at, etag, last_modified, content_type) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (url, digest, now, now, headers.get('ETag'), headers.get('Last-Modified'),
+                 headers.get('Content-Type'))
+            )
+            if old is not None and old[0] != digest:
+                self._drop_unused_blob(old[0])
+            if self.total_bytes > self.max_bytes:
+                self._evict(int(self.max_bytes * EVICT_TO))
+            self.conn.commit()
+
+    def forget(self, url: str):
+        """Drop a page that no longer exists (404)"""
+        with self._lock:
+            row = self.conn.execute('SELECT hash FROM pages WHERE url = ?', (url,)).fetchone()
+            if row is not None:
+                self.conn.execute('DELETE FROM pages WHERE url = ?', (url,))
+                self._drop_unused_blob(row[0])
+                self.conn.commit()
+
+    def _drop_unused_blob(self, digest: str):
+        if self.conn.execute('SELECT 1 FROM pages WHERE hash = ? LIMIT 1', (digest,)).fetchone() is None:
+            row = self.conn.execute('SELECT size FROM blobs WHERE hash = ?', (digest,)).fetchone()
+            if row is not None:
+                self.conn.execute('DELETE FROM blobs WHERE hash = ?', (digest,))
+                self.total_bytes -= row[0]
+
+    def _evict(self, target: int):
+        """Drop least recently used pages until the blobs fit in target bytes"""
+        for url, digest in self.conn.execute('SELECT url, hash FROM pages ORDER BY used_at').fetchall():
+            if self.total_bytes <= target:
+                break
+            self.conn.execute('DELETE FROM pages WHERE url = ?', (url,))
+            self._drop_unused_blob(digest)
+
+    def iter_pages(self) -> Iterator[CachedPage]:
+        """Every cached page, for offline re-extraction"""
+        with self._lock:
+            urls = [row[0] for row in self.conn.execute('SELECT url FROM pages ORDER BY url')]
+        for url in urls:
+            page = self.get(url)
+            if page is not None:
+                yield page
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
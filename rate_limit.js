@@ -0,0 +1,107 @@
+// Per-host token buckets for scraper.js, the same scheme as rate_limit.py:
+// rates come from rate_limits.json, 429 Retry-After blocks the host, and each
+// host's rate is halved on 429/5xx/navigation errors and raised slowly on success.
+
+const fs = require('fs');
+const path = require('path');
+
+const DEFAULT_CONFIG = {
+    default: { rate: 1.0, burst: 2, min_rate: 0.1, max_rate: 2.0 },
+    hosts: {},
+    backoff: 0.5,
+    increase: 0.05,
+    max_retry_after: 30
+};
+
+function loadConfig(configPath = path.join(__dirname, 'rate_limits.json')) {
+    try {
+        return Object.assign({}, DEFAULT_CONFIG, JSON.parse(fs.readFileSync(configPath, 'utf8')));
+    } catch (e) {
+        return Object.assign({}, DEFAULT_CONFIG);
+    }
+}
+
+// Seconds to wait from a Retry-After header (delta-seconds or HTTP date)
+function parseRetryAfter(value) {
+    if (!value) return null;
+    const seconds = Number(value);
+    if (!Number.isNaN(seconds)) return Math.max(0, seconds);
+    const date = Date.parse(value);
+    return Number.isNaN(date) ? null : Math.max(0, (date - Date.now()) / 1000);
+}
+
+const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+class HostRateLimiter {
+    constructor(config = loadConfig()) {
+        this.config = config;
+        this.buckets = new Map();
+    }
+
+    // Configured host for a URL (www.google.com -> google.com), else host:port
+    hostKey(url) {
+        const { host, hostname } = new URL(url);
+        for (const configured of Object.keys(this.config.hosts)) {
+            if (hostname === configured || hostname.endsWith('.' + configured)) {
+                return configured;
+            }
+        }
+        return host;
+    }
+
+    bucket(key) {
+        if (!this.buckets.has(key)) {
+            const settings = Object.assign({}, this.config.default, this.config.hosts[key] || {});
+            this.buckets.set(key, {
+                rate: settings.rate,
+                burst: Math.max(1, settings.burst),
+                minRate: settings.min_rate,
+                maxRate: settings.max_rate,
+                tokens: Math.max(1, settings.burst),
+                updated: Date.now() / 1000,
+                blockedUntil: 0
+            });
+        }
+        return this.buckets.get(key);
+    }
+
+    // Wait until a request to this URL's host is allowed; resolves to seconds waited.
+    // A host blocked (429 Retry-After) for longer than max_retry_after is not
+    // waited for: that rejects with a HostBlocked error and the source is skipped.
+    async acquire(url) {
+        const key = this.hostKey(url);
+        const bucket = this.bucket(key);
+        const now = Date.now() / 1000;
+        const blocked = bucket.blockedUntil - now;
+        if (blocked > this.config.max_retry_after) {
+            const error = new Error(`${key} blocked for ${Math.round(blocked)}s`);
+            error.name = 'HostBlocked';
+            throw error;
+        }
+        bucket.tokens = Math.min(bucket.burst, bucket.tokens + (now - bucket.updated) * bucket.rate);
+        bucket.updated = now;
+        bucket.tokens -= 1;
+        const wait = Math.max(bucket.tokens >= 0 ? 0 : -bucket.tokens / bucket.rate, bucket.blockedUntil - now);
+        if (wait > 0) await sleep(wait * 1000);
+        return wait;
+    }
+
+    // Adapt the host's rate to a response (status null = navigation error)
+    record(url, status, retryAfter = null) {
+        const bucket = this.bucket(this.hostKey(url));
+        if (!status || status === 429 || status >= 500) {
+            bucket.rate = Math.max(bucket.minRate, bucket.rate * this.config.backoff);
+        } else {
+            bucket.rate = Math.min(bucket.maxRate, bucket.rate + this.config.increase);
+        }
+        if (status === 429) {
+            let delay = parseRetryAfter(retryAfter);
+            if (delay === null) delay = 1 / bucket.rate;
+            bucket.blockedUntil = Math.max(bucket.blockedUntil, Date.now() / 1000 + delay);
+            return delay;
+        }
+        return null;
+    }
+}
+
+module.exports = { HostRateLimiter, loadConfig, parseRetryAfter };
@@ -0,0 +1,166 @@
+"""
+Per-host rate limiting for the lyrics fetchers
+One token bucket per host instead of a global pause after every file: hosts
+are throttled independently, 429 Retry-After is honoured, and each host's
+rate adapts to its error rate (halved on 429/5xx/connection errors, raised
+slowly on success). rate_limit.js implements the same scheme for scraper.js
+from the same rate_limits.json.
+"""
+
+import json
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlsplit
+
+DEFAULT_CONFIG_PATH = Path(__file__).resolve().parent / 'rate_limits.json'
+
+# Long waits are slept in slices of this so a stop is noticed
+WAIT_SLICE = 0.25
+
+DEFAULT_CONFIG = {
+    'default': {'rate': 1.0, 'burst': 2, 'min_rate': 0.1, 'max_rate': 2.0},
+    'hosts': {},
+    'backoff': 0.5,
+    'increase': 0.05,
+    'max_retry_after': 30,
+}
+
+
+def load_config(path=DEFAULT_CONFIG_PATH) -> dict:
+    """Read rate_limits.json, falling back to built-in defaults"""
+    config = dict(DEFAULT_CONFIG)
+    try:
+        with open(path, encoding='utf-8') as f:
+            config.update(json.load(f))
+    except (OSError, ValueError):
+        pass
+    return config
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HostBlocked(Exception):
+    """A host cannot be requested now: it asked for a pause longer than
+    max_retry_after, or the wait for it was stopped"""
+
+    def __init__(self, host: str, seconds: float):
+        super().__init__(f"{host} blocked for {seconds:.0f}s")
+        self.host = host
+        self.seconds = seconds
+
+
+class TokenBucket:
+    """Token bucket with an adjustable rate; not thread-safe on its own"""
+
+    def __init__(self, rate: float, burst: float, min_rate: float, max_rate: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def reserve(self, now: float) -> float:
+        """Take a token and return how long to wait before using it"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+        return max(wait, self.blocked_until - now)
+
+
+class HostRateLimiter:
+    """Token buckets keyed by host, shared by every fetch in the process"""
+
+    def __init__(self, config: Optional[dict] = None, enabled: bool = True):
+        self.config = config if config is not None else load_config()
+        self.enabled = enabled  # when off, requests are never delayed
+        self.buckets = {}
+        self._lock = threading.Lock()
+
+    def host_key(self, url: str) -> str:
+        """Configured host for a URL (search.j-lyric.net -> j-lyric.net), else host:port"""
+        netloc = urlsplit(url).netloc.lower()
+        host = netloc.split(':')[0]
+        for configured in self.config['hosts']:
+            if host == configured or host.endswith('.' + configured):
+                return configured
+        return netloc
+
+    def _bucket(self, key: str) -> TokenBucket:
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            settings = dict(self.config['default'], **self.config['hosts'].get(key, {}))
+            bucket = self.buckets[key] = TokenBucket(
+                settings['rate'], settings['burst'], settings['min_rate'], settings['max_rate'])
+        return bucket
+
+    def acquire(self, url: str, should_stop=None) -> float:
+        """Block until a request to this URL's host is allowed; returns seconds waited.
+
+        Raises HostBlocked instead of waiting when the host is blocked (429
+        Retry-After) for longer than max_retry_after, or when should_stop()
+        turns true during the wait.
+        """
+        if not self.enabled:
+            return 0.0
+        key = self.host_key(url)
+        with self._lock:
+            bucket = self._bucket(key)
+            now = time.monotonic()
+            blocked = bucket.blocked_until - now
+            if blocked > self.config['max_retry_after']:
+                raise HostBlocked(key, blocked)
+            wait = bucket.reserve(now)
+        deadline = time.monotonic() + wait
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return wait
+            if should_stop is not None and should_stop():
+                with self._lock:
+                    bucket.tokens += 1  # The request is not made: give the token back
+                raise HostBlocked(key, remaining)
+            time.sleep(min(remaining, WAIT_SLICE))
+
+    def record(self, url: str, status: Optional[int], retry_after=None) -> Optional[float]:
+        """Adapt the host's rate to a response (status None = connection error).
+
+        Returns the Retry-After delay for a 429, so the caller can decide to retry.
+        """
+        key = self.host_key(url)
+        with self._lock:
+            bucket = self._bucket(key)
+            if status is None or status == 429 or status >= 500:
+                bucket.rate = max(bucket.min_rate, bucket.rate * self.config['backoff'])
+            else:
+                bucket.rate = min(bucket.max_rate, bucket.rate + self.config['increase'])
+
+            if status == 429:
+                delay = parse_retry_after(retry_after)
+                if delay is None:
+                    delay = 1.0 / bucket.rate
+                bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + delay)
+                return delay
+        return None
+
+    def rates(self) -> dict:
+        """Current requests/second per host"""
+        with self._lock:
+            return {key: bucket.rate for key, bucket in self.buckets.items()}
@@ -0,0 +1,130 @@
+"""
+Time-boxed and budgeted runs
+A RunBudget caps a run's wall time and the requests made to each source; a
+RunCheckpoint records which files are finished so a run that stopped on its
+budget (or was interrupted) can be resumed where it left off.
+"""
+
+import json
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+
+class RunBudget:
+    """Wall-clock and per-source request limits for one run"""
+
+    def __init__(self, wall_seconds: Optional[float] = None, source_requests: Optional[dict] = None):
+        self.wall_seconds = wall_seconds
+        self.source_requests = dict(source_requests or {})  # source -> max requests
+        self.spent = {}
+        self.started = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.started = time.monotonic()
+        self.spent = {}
+
+    def remaining_seconds(self) -> Optional[float]:
+        if self.wall_seconds is None or self.started is None:
+            return None
+        return self.wall_seconds - (time.monotonic() - self.started)
+
+    def expired(self) -> bool:
+        remaining = self.remaining_seconds()
+        return remaining is not None and remaining <= 0
+
+    def allows(self, source: str) -> bool:
+        """Whether a source still has requests left"""
+        limit = self.source_requests.get(source)
+        with self._lock:
+            return limit is None or self.spent.get(source, 0) < limit
+
+    def spend(self, source: str, requests: int = 1):
+        with self._lock:
+            self.spent[source] = self.spent.get(source, 0) + requests
+
+    def exhausted_sources(self) -> list:
+        return [source for source in self.source_requests if not self.allows(source)]
+
+    def describe(self) -> str:
+        parts = []
+        if self.wall_seconds is not None:
+            parts.append(f"{self.wall_seconds / 60:.0f} min")
+        parts += [f"{limit} {source} requests" for source, limit in self.source_requests.items()]
+        return ', '.join(parts) or 'unlimited'
+
+
+def parse_source_budgets(values) -> dict:
+    """Parse ['genius=3000', 'azlyrics=500'] into {'genius': 3000, 'azlyrics': 500}"""
+    budgets = {}
+    for value in values or []:
+        source, sep, limit = value.partition('=')
+        if not sep or not limit.strip().isdigit():
+            raise ValueError(f"Expected SOURCE=REQUESTS, got '{value}'")
+        budgets[source.strip()] = int(limit)
+    return budgets
+
+
+class RunCheckpoint:
+    """The selection of a run plus an append-only list of finished files.
+
+    ``<name>.json`` holds the paths and the deferral summary; ``<name>.done``
+    gets one finished file per line as the run goes, so even a killed run
+    can be resumed.
+    """
+
+    def __init__(self, path: Path, paths: list, done: Optional[set] = None):
+        self.path = Path(path)
+        self.done_path = self.path.with_suffix('.done')
+        self.paths = [str(p) for p in paths]
+        self.done = done if done is not None else set()
+        self.deferred = {}
+        self._file = None
+
+    @classmethod
+    def create(cls, report_dir, paths: list) -> 'RunCheckpoint':
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        checkpoint = cls(Path(report_dir) / f"lyrics_checkpoint_{timestamp}.json", paths)
+        checkpoint.save()
+        return checkpoint
+
+    @classmethod
+    def load(cls, path) -> 'RunCheckpoint':
+        path = Path(path)
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        done = set()
+        done_path = path.with_suffix('.done')
+        if done_path.exists():
+            with open(done_path, encoding='utf-8') as f:
+                done = {line.rstrip('\n') for line in f if line.strip()}
+        return cls(path, data['paths'], done)
+
+    def is_done(self, filepath) -> bool:
+        return str(filepath) in self.done
+
+    def mark_done(self, filepath):
+        if self._file is None:
+            self.done_path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.done_path, 'a', encoding='utf-8')
+        self.done.add(str(filepath))
+        self._file.write(f"{filepath}\n")
+        self._file.flush()
+
+    def defer(self, reason: str):
+        self.deferred[reason] = self.deferred.get(reason, 0) + 1
+
+    def save(self, complete: bool = False):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'paths': self.paths, 'finished_files': len(self.done),
+                       'deferred': self.deferred, 'complete': complete,
+                       'saved': datetime.now().isoformat(timespec='seconds')}, f, indent=2)
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
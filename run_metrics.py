@@ -0,0 +1,349 @@
+"""
+Per-stage timing for lyrics runs
+Every file is timed through its stages (scan, probe, metadata, lookup per
+source, clean, write). Durations go into fixed-bucket histograms so memory
+stays flat on huge runs; per-file timings can be streamed to a JSON Lines
+file and the aggregates dumped as JSON at the end of a run.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Histogram bucket upper bounds in seconds (the last bucket is +Inf)
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Stage names in pipeline order, used to order reports
+STAGE_ORDER = ['scan', 'schedule', 'probe', 'metadata', 'sidecar', 'classify', 'harvest', 'lookup.puppeteer', 'lookup.utaten',
+               'lookup.jlyric', 'lookup.genius', 'lookup.azlyrics', 'clean', 'write', 'file']
+
+PROFILERS = ('cprofile', 'pyinstrument')
+
+
+class Histogram:
+    """Duration histogram with fixed buckets; count, sum and max are exact"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation inside its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, count in enumerate(self.counts):
+            upper = self.buckets[i] if i < len(self.buckets) else self.max
+            if count and seen + count >= rank:
+                fraction = (rank - seen) / count
+                return min(self.max, lower + (upper - lower) * fraction)
+            seen += count
+            lower = upper
+        return self.max
+
+    def to_dict(self) -> dict:
+        bounds = [str(b) for b in self.buckets] + ['+Inf']
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else 0.0,
+            'p50': round(self.quantile(0.5), 6),
+            'p95': round(self.quantile(0.95), 6),
+            'max': round(self.max, 6),
+            'buckets': dict(zip(bounds, self.counts)),
+        }
+
+
+def _stage_sort_key(name: str):
+    return (STAGE_ORDER.index(name) if name in STAGE_ORDER else len(STAGE_ORDER), name)
+
+
+class RunMetrics:
+    """Stage timings for one processing run.
+
+    Use ``file(path)`` around the work for one file and ``stage(name)``
+    around each step; stages may nest (clean runs inside a lookup), so
+    nested time is counted in both.
+    """
+
+    def __init__(self, files_path: Optional[Path] = None, service: Optional['ServiceMetrics'] = None):
+        self.started = datetime.now()
+        self.start_time = time.perf_counter()
+        self.stages: Dict[str, Histogram] = {}
+        self.files_path = Path(files_path) if files_path else None
+        self.service = service  # also fed to the long-lived metrics when set
+        self._files_out = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def observe(self, name: str, seconds: float):
+        """Record one duration for a stage"""
+        with self._lock:
+            histogram = self.stages.get(name)
+            if histogram is None:
+                histogram = self.stages[name] = Histogram()
+            histogram.observe(seconds)
+        if self.service is not None:
+            if name.startswith('lookup.'):
+                self.service.observe('lookup_duration_seconds', seconds, source=name[len('lookup.'):])
+            else:
+                self.service.observe('stage_duration_seconds', seconds, stage=name)
+        current = getattr(self._local, 'file', None)
+        if current is not None:
+            current[name] = round(current.get(name, 0.0) + seconds, 6)
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    @contextmanager
+    def file(self, filepath):
+        """Time one file; its stage timings are streamed to files_path"""
+        timings = {}
+        self._local.file = timings
+        start = time.perf_counter()
+        try:
+            yield timings
+        finally:
+            self._local.file = None
+            self.observe('file', time.perf_counter() - start)
+            timings['file'] = round(time.perf_counter() - start, 6)
+            if self.files_path:
+                self._write_file_record({'path': str(filepath), 'timings': timings})
+
+    def _write_file_record(self, record: dict):
+        with self._lock:
+            if self._files_out is None:
+                self.files_path.parent.mkdir(parents=True, exist_ok=True)
+                self._files_out = open(self.files_path, 'a', encoding='utf-8')
+            self._files_out.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def close(self):
+        with self._lock:
+            if self._files_out:
+                self._files_out.close()
+                self._files_out = None
+
+    def to_dict(self, stats: Optional[dict] = None) -> dict:
+        with self._lock:
+            stages = {name: self.stages[name].to_dict()
+                      for name in sorted(self.stages, key=_stage_sort_key)}
+        result = {
+            'started': self.started.isoformat(timespec='seconds'),
+            'wall_time': round(time.perf_counter() - self.start_time, 3),
+            'stages': stages,
+        }
+        if stats is not None:
+            result['stats'] = dict(stats)
+        if self.files_path:
+            result['files'] = str(self.files_path)
+        return result
+
+    def dump(self, path: Path, stats: Optional[dict] = None) -> Path:
+        """Write the aggregate metrics for this run as JSON"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(stats), f, indent=2)
+        return path
+
+    def format_report(self) -> List[str]:
+        """Text table of the stage histograms for the log"""
+        lines = [f"{'Stage':<18}{'Count':>7}{'Total':>10}{'Mean':>9}{'p50':>9}{'p95':>9}{'Max':>9}"]
+        for name, data in self.to_dict()['stages'].items():
+            lines.append(
+                f"{name:<18}{data['count']:>7}{data['sum']:>9.2f}s"
+                f"{data['mean'] * 1000:>7.0f}ms{data['p50'] * 1000:>7.0f}ms"
+                f"{data['p95'] * 1000:>7.0f}ms{data['max'] * 1000:>7.0f}ms"
+            )
+        return lines
+
+
+@contextmanager
+def profile_run(profiler: Optional[str], output: Optional[Path] = None, log=print):
+    """Optionally profile the enclosed code with cProfile or pyinstrument.
+
+    cProfile stats are saved to ``output`` (default lyrics_profile.prof) and
+    the top functions are logged; pyinstrument writes an HTML report.
+    """
+    if not profiler:
+        yield
+        return
+
+    if profiler == 'cprofile':
+        import cProfile
+        import io
+        import pstats
+        output = Path(output or 'lyrics_profile.prof')
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            prof.dump_stats(str(output))
+            buffer = io.StringIO()
+            pstats.Stats(prof, stream=buffer).sort_stats('cumulative').print_stats(25)
+            log(buffer.getvalue())
+            log(f"📄 cProfile stats saved: {output}")
+    elif profiler == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise RuntimeError("pyinstrument is not installed (pip install pyinstrument)")
+        output = Path(output or 'lyrics_profile.html')
+        prof = Profiler()
+        prof.start()
+        try:
+            yield
+        finally:
+            prof.stop()
+            output.write_text(prof.output_html(), encoding='utf-8')
+            log(prof.output_text(unicode=True))
+            log(f"📄 pyinstrument report saved: {output}")
+    else:
+        raise ValueError(f"Unknown profiler: {profiler} (choose from {', '.join(PROFILERS)})")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ''
+    parts = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+class ServiceMetrics:
+    """Process-lifetime counters, gauges and histograms in Prometheus format.
+
+    Unlike RunMetrics this is never reset, so a scraper sees monotonic
+    counters across runs. Gauges are callables read at scrape time.
+    """
+
+    def __init__(self, prefix: str = 'lyrics'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters: Dict[tuple, float] = {}
+        self._histograms: Dict[tuple, Histogram] = {}
+        self._gauges: Dict[tuple, object] = {}
+        self._help: Dict[str, tuple] = {}
+
+    def _key(self, name: str, labels: dict) -> tuple:
+        return (f"{self.prefix}_{name}", tuple(sorted(labels.items())))
+
+    def describe(self, name: str, kind: str, text: str):
+        self._help[f"{self.prefix}_{name}"] = (kind, text)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def set_gauge(self, name: str, value_fn, **labels):
+        """Register a callable (or a constant) reported as a gauge"""
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value_fn
+
+    def remove_gauge(self, name: str, **labels):
+        with self._lock:
+            self._gauges.pop(self._key(name, labels), None)
+
+    def counter_value(self, name: str, **labels) -> float:
+        return self._counters.get(self._key(name, labels), 0)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: h.to_dict() for key, h in self._histograms.items()}
+            gauges = dict(self._gauges)
+
+        families: Dict[str, List[str]] = {}
+        kinds: Dict[str, str] = {}
+        for (name, labels), value in sorted(counters.items()):
+            kinds[name] = 'counter'
+            families.setdefault(name, []).append(f"{name}{_format_labels(dict(labels))} {value:g}")
+        for (name, labels), value_fn in sorted(gauges.items(), key=lambda item: item[0]):
+            try:
+                value = value_fn() if callable(value_fn) else value_fn
+            except Exception:
+                continue
+            kinds[name] = 'gauge'
+            families.setdefault(name, []).append(f"{name}{_format_labels(dict(labels))} {float(value):g}")
+        for (name, labels), data in sorted(histograms.items()):
+            kinds[name] = 'histogram'
+            labels = dict(labels)
+            lines = families.setdefault(name, [])
+            cumulative = 0
+            for bound, count in data['buckets'].items():
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(dict(labels, le=bound))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {data['sum']:g}")
+            lines.append(f"{name}_count{_format_labels(labels)} {data['count']}")
+
+        output = []
+        for name in sorted(families):
+            kind, text = self._help.get(name, (kinds[name], ''))
+            if text:
+                output.append(f"# HELP {name} {text}")
+            output.append(f"# TYPE {name} {kinds[name]}")
+            output.extend(families[name])
+        return '\n'.join(output) + '\n'
+
+
+def start_metrics_server(metrics: ServiceMetrics, port: int, host: str = '127.0.0.1'):
+    """Serve ``metrics`` at http://host:port/metrics from a daemon thread"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes every few seconds would flood the log
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,178 @@
+"""
+Dry-run planning
+Estimates what a processing run would do (skips, lookups per source, in-place
+writes vs full-file rewrites) and how long it would take, from the per-source
+latencies of earlier runs' metrics dumps. Nothing here touches the network
+or writes to audio files.
+"""
+
+import json
+from pathlib import Path
+from typing import Optional
+
+import lyrics_sources
+
+# Used for sources without history (seconds per lookup)
+DEFAULT_SOURCE_SECONDS = dict({lyrics_sources.BROWSER: lyrics_sources.BROWSER_SECONDS},
+                              **{name: source.seconds for name, source in lyrics_sources.SOURCES.items()})
+DEFAULT_LOCAL_SECONDS = 0.05  # probe + metadata + write per file
+DEFAULT_MISS_RATE = 0.5  # chance each source misses, when there is no history
+DEFAULT_LYRICS_BYTES = 2500
+
+# HTTP requests one lookup makes (search page + lyrics page)
+REQUESTS_PER_LOOKUP = {name: source.requests for name, source in lyrics_sources.SOURCES.items()}
+
+# Host each source's requests count against in rate_limits.json
+SOURCE_HOSTS = {name: source.host for name, source in lyrics_sources.SOURCES.items() if not source.needs_js}
+
+HISTORY_RUNS = 10
+
+
+class LookupHistory:
+    """Per-source latency and reach rate from earlier runs' metrics dumps"""
+
+    def __init__(self):
+        self.runs = 0
+        self.looked_up = 0  # files that went to the lookup stage
+        self.sources = {}  # source -> [lookups, seconds]
+        self.local = [0, 0.0]  # [files, seconds] for probe/metadata/write
+
+    @classmethod
+    def load(cls, metrics_dir, limit: int = HISTORY_RUNS) -> 'LookupHistory':
+        history = cls()
+        if not metrics_dir:
+            return history
+        dumps = sorted(Path(metrics_dir).glob('lyrics_metrics_*.json'), reverse=True)[:limit]
+        for dump in dumps:
+            try:
+                with open(dump, encoding='utf-8') as f:
+                    history.add(json.load(f))
+            except (OSError, ValueError, KeyError, TypeError):
+                continue
+        return history
+
+    def add(self, data: dict):
+        stats = data.get('stats', {})
+        stages = data['stages']
+        self.runs += 1
+        self.looked_up += stats.get('success', 0) + stats.get('failed', 0)
+        for name, stage in stages.items():
+            if name.startswith('lookup.'):
+                totals = self.sources.setdefault(name[len('lookup.'):], [0, 0.0])
+                totals[0] += stage['count']
+                totals[1] += stage['sum']
+        if 'file' in stages:
+            self.local[0] += stages['file']['count']
+            self.local[1] += sum(stages[name]['sum'] for name in ('probe', 'metadata', 'write')
+                                 if name in stages)
+
+    def seconds(self, source: str) -> float:
+        """Mean seconds per lookup at a source"""
+        lookups, seconds = self.sources.get(source, (0, 0.0))
+        return seconds / lookups if lookups else DEFAULT_SOURCE_SECONDS.get(source, 1.0)
+
+    def reach(self, source: str, position: int) -> float:
+        """Share of looked-up files that got as far as this source"""
+        lookups, _ = self.sources.get(source, (0, 0.0))
+        if self.looked_up and lookups:
+            return min(1.0, lookups / self.looked_up)
+        return DEFAULT_MISS_RATE ** position
+
+    def local_seconds(self) -> float:
+        files, seconds = self.local
+        return seconds / files if files else DEFAULT_LOCAL_SECONDS
+
+
+class RunPlan:
+    """Counts for a planned run and its time estimate"""
+
+    def __init__(self, history: LookupHistory, rate_limits: Optional[dict] = None):
+        self.history = history
+        self.rate_limits = rate_limits or {}
+        self.counts = {
+            'files': 0,
+            'skip_has_lyrics': 0,
+            'skip_instrumental': 0,
+            'no_title': 0,
+            'sidecar': 0,  # .lrc/.txt next to the file: no network
+            'harvested': 0,  # another copy in the library has lyrics: no network
+            'known_miss': 0,  # every source is a remembered miss: no network
+            'lookup': 0,
+        }
+        self.writes = {'in_place': 0, 'rewrite': 0, 'unknown': 0, 'sidecar': 0}
+        self.source_lookups = {}  # source -> expected lookups
+        self.lookup_seconds = 0.0
+
+    def add_lookup(self, chain: list):
+        """Account for one file that goes to the network; chain excludes known misses"""
+        self.counts['lookup'] += 1
+        for position, source in enumerate(chain):
+            reach = self.history.reach(source, position)
+            self.source_lookups[source] = self.source_lookups.get(source, 0.0) + reach
+            self.lookup_seconds += reach * self.history.seconds(source)
+
+    def add_write(self, padding: Optional[int], needed: int):
+        if padding is None:
+            self.writes['unknown'] += 1
+        elif needed > padding:
+            self.writes['rewrite'] += 1
+        else:
+            self.writes['in_place'] += 1
+
+    def rate_limit_floor(self) -> float:
+        """Seconds the per-host rate limits alone would take"""
+        floor = 0.0
+        for source, lookups in self.source_lookups.items():
+            host = SOURCE_HOSTS.get(source)
+            rate = self.rate_limits.get(host, {}).get('rate') if host else None
+            if rate:
+                floor = max(floor, lookups * REQUESTS_PER_LOOKUP.get(source, 1) / rate)
+        return floor
+
+    def estimated_seconds(self) -> float:
+        local = self.counts['files'] * self.history.local_seconds()
+        return local + max(self.lookup_seconds, self.rate_limit_floor())
+
+    def to_dict(self) -> dict:
+        return {
+            'counts': dict(self.counts),
+            'writes': dict(self.writes),
+            'source_lookups': {source: round(count, 1) for source, count in self.source_lookups.items()},
+            'lookup_seconds': round(self.lookup_seconds, 1),
+            'rate_limit_floor_seconds': round(self.rate_limit_floor(), 1),
+            'estimated_seconds': round(self.estimated_seconds(), 1),
+            'history_runs': self.history.runs,
+        }
+
+    def format_report(self) -> list:
+        counts, writes = self.counts, self.writes
+        lines = [
+            f"Files found:               {counts['files']}",
+            f"  Skip (already lyrics):   {counts['skip_has_lyrics']}",
+            f"  Skip (instrumental):     {counts['skip_instrumental']}",
+            f"  No title:                {counts['no_title']}",
+            f"  Sidecar lyrics:          {counts['sidecar']}",
+            f"  Copy from library:       {counts['harvested']}",
+            f"  Known misses (memo):     {counts['known_miss']}",
+            f"  Need network lookups:    {counts['lookup']}",
+            f"Writes if all found:       {writes['in_place']} in place, "
+            f"{writes['rewrite']} full-file rewrites, {writes['unknown']} unknown, "
+            f"{writes['sidecar']} sidecar files",
+            "Expected lookups per source:",
+        ]
+        for source, lookups in sorted(self.source_lookups.items(), key=lambda item: -item[1]):
+            lines.append(f"  {source:<12}{lookups:>8.0f} × {self.history.seconds(source) * 1000:.0f}ms")
+        source_note = f"from {self.history.runs} earlier run(s)" if self.history.runs else "default latencies"
+        lines.append(f"Estimated wall time:       {format_duration(self.estimated_seconds())} ({source_note}, "
+                     f"rate limits alone {format_duration(self.rate_limit_floor())})")
+        return lines
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    if minutes:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
@@ -1,17 +1,46 @@
 const puppeteer = require('puppeteer');
 const express = require('express');
 const cors = require('cors');
+const { Metrics } = require('./metrics');
+const { HostRateLimiter } = require('./rate_limit');
+const { TOP_CANDIDATES, pickCandidates, parseDuration } = require('./candidates');
+const { loadProfileConfig, launchOptions, dirSize, trimProfile, prepareProfile } = require('./browser_profile');
+
+const metrics = new Metrics();
+const rateLimiter = new HostRateLimiter();
+const PROFILE = loadProfileConfig();
+let profileBytes = 0;
+
+// Base URL of every lyrics site; LYRICS_SOURCE_URLS (JSON) overrides them,
+// e.g. to point at the offline benchmark's mock site
+const SOURCE_URLS = Object.assign({
+    genius: 'https://genius.com',
+    azlyrics: 'https://www.azlyrics.com',
+    utaten: 'https://utaten.com',
+    google: 'https://www.google.com'
+}, JSON.parse(process.env.LYRICS_SOURCE_URLS || '{}'));
 
 class LyricsScraper {
     constructor() {
         this.browser = null;
+        this.openPages = 0;
     }
 
     async init() {
-        this.browser = await puppeteer.launch({
-            headless: 'new',
-            args: ['--no-sandbox', '--disable-setuid-sandbox']
-        });
+        // Persistent profile (cookies, HTTP cache) unless LYRICS_BROWSER_PROFILE=none
+        const prepared = await prepareProfile(PROFILE);
+        if (prepared && prepared.locked) {
+            console.log(`Browser profile ${PROFILE.dir} is in use by another browser, ` +
+                'using a temporary profile instead');
+            PROFILE.dir = null;  // Also stops the periodic cleanup from touching it
+        } else if (prepared) {
+            profileBytes = prepared.size;
+            countCleanup(prepared.freed);
+        }
+        const profile = launchOptions(PROFILE);
+        this.browser = await puppeteer.launch(Object.assign({ headless: 'new' }, profile, {
+            args: ['--no-sandbox', '--disable-setuid-sandbox', ...profile.args]
+        }));
     }
 
     async close() {
@@ -20,6 +49,52 @@ class LyricsScraper {
         }
     }
 
+    // Navigate through the per-host rate limiter; a 429 with a short
+    // Retry-After is retried once after waiting
+    async goto(page, url, options) {
+        let response = null;
+        for (let attempt = 0; attempt < 2; attempt++) {
+            const waited = await rateLimiter.acquire(url);
+            if (waited > 0) {
+                metrics.inc('rate_limit_wait_seconds_total', { host: rateLimiter.hostKey(url) }, waited,
+                    'Time spent waiting for per-host rate limits');
+            }
+            try {
+                response = await page.goto(url, options);
+            } catch (error) {
+                rateLimiter.record(url, null);
+                throw error;
+            }
+            const status = response ? response.status() : null;
+            const retryAfter = rateLimiter.record(url, status, response ? response.headers()['retry-after'] : null);
+            if (retryAfter === null || attempt > 0 || retryAfter > rateLimiter.config.max_retry_after) {
+                break;
+            }
+            console.log(`Rate limited by ${rateLimiter.hostKey(url)}, retrying in ${Math.round(retryAfter)}s...`);
+        }
+        return response;
+    }
+
+    // Open a page and keep the page-pool occupancy gauge up to date
+    async newPage() {
+        const page = await this.browser.newPage();
+        this.openPages += 1;
+        page.once('close', () => {
+            this.openPages -= 1;
+        });
+        return page;
+    }
+
+    // Keep the rendered HTML of a page lyrics came from, for the caller's page cache
+    async keepPage(page, pages) {
+        if (!pages) return;
+        try {
+            pages.push({ url: page.url(), html: await page.content() });
+        } catch (e) {
+            console.log('Could not keep page HTML:', e.message);
+        }
+    }
+
     cleanText(text) {
         return text
             .replace(/\([^)]*\)/g, '')
@@ -102,17 +177,17 @@ class LyricsScraper {
         return cleaned;
     }
 
-    async scrapeGenius(title, artist) {
+    async scrapeGenius(title, artist, duration = null, pages = null) {
         let page = null;
         try {
-            page = await this.browser.newPage();
+            page = await this.newPage();
             await page.setUserAgent('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36');
 
             const cleanArtist = this.cleanText(artist).replace(/\s+/g, '-');
             const cleanTitle = this.cleanText(title).replace(/\s+/g, '-');
-            const url = `https://genius.com/${cleanArtist}-${cleanTitle}-lyrics`;
+            const url = `${SOURCE_URLS.genius}/${cleanArtist}-${cleanTitle}-lyrics`;
 
-            await page.goto(url, { waitUntil: 'domcontentloaded', timeout: 15000 });
+            await this.goto(page, url, { waitUntil: 'domcontentloaded', timeout: 15000 });
 
             // Wait for lyrics container
             await page.waitForSelector('[data-lyrics-container="true"]', { timeout: 8000 });
@@ -128,6 +203,7 @@ class LyricsScraper {
                 return text.trim();
             });
 
+            if (lyrics) await this.keepPage(page, pages);
             return this.cleanLyrics(lyrics);
         } catch (error) {
             console.log(`Genius scraping failed: ${error.message}`);
@@ -143,14 +219,14 @@ class LyricsScraper {
         }
     }
 
-    async scrapeAZLyrics(title, artist) {
-        const page = await this.browser.newPage();
+    async scrapeAZLyrics(title, artist, duration = null, pages = null) {
+        const page = await this.newPage();
         try {
             const cleanArtist = artist.toLowerCase().replace(/[^a-z0-9]/g, '');
             const cleanTitle = title.toLowerCase().replace(/[^a-z0-9]/g, '');
-            const url = `https://www.azlyrics.com/lyrics/${cleanArtist}/${cleanTitle}.html`;
+            const url = `${SOURCE_URLS.azlyrics}/lyrics/${cleanArtist}/${cleanTitle}.html`;
             
-            await page.goto(url, { waitUntil: 'networkidle2', timeout: 30000 });
+            await this.goto(page, url, { waitUntil: 'networkidle2', timeout: 30000 });
             
             // AZLyrics stores lyrics in a div without class or id, after a specific comment
             const lyrics = await page.evaluate(() => {
@@ -177,6 +253,7 @@ class LyricsScraper {
                 return null;
             });
 
+            if (lyrics) await this.keepPage(page, pages);
             return lyrics ? this.cleanLyrics(lyrics) : null;
         } catch (error) {
             console.log(`AZLyrics scraping failed: ${error.message}`);
@@ -187,12 +264,12 @@ class LyricsScraper {
     }
 
     async scrapeGoogle(title, artist) {
-        const page = await this.browser.newPage();
+        const page = await this.newPage();
         try {
             const query = encodeURIComponent(`${artist} ${title} lyrics`);
-            const url = `https://www.google.com/search?q=${query}`;
+            const url = `${SOURCE_URLS.google}/search?q=${query}`;
             
-            await page.goto(url, { waitUntil: 'networkidle2', timeout: 30000 });
+            await this.goto(page, url, { waitUntil: 'networkidle2', timeout: 30000 });
             
             // Google often shows lyrics directly in search results
             const lyrics = await page.evaluate(() => {
@@ -224,35 +301,55 @@ class LyricsScraper {
         return /[\u3040-\u309F\u30A0-\u30FF\u4E00-\u9FAF]/.test(text);
     }
 
-    async scrapeUtaten(title, artist) {
+    async scrapeUtaten(title, artist, duration = null, pages = null) {
         let page = null;
         try {
-            page = await this.browser.newPage();
+            page = await this.newPage();
             await page.setUserAgent('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36');
 
             const searchQuery = `${artist} ${title}`.trim();
             const encodedQuery = encodeURIComponent(searchQuery);
-            const searchUrl = `https://utaten.com/search/?search_text=${encodedQuery}`;
-
-            await page.goto(searchUrl, { waitUntil: 'domcontentloaded', timeout: 15000 });
-
-            // Look for first lyrics link
-            const lyricsLink = await page.$('a[href*="/lyric/"]');
-            if (lyricsLink) {
-                const href = await page.evaluate(el => el.href, lyricsLink);
-                await page.goto(href, { waitUntil: 'domcontentloaded', timeout: 10000 });
-
-                // Extract lyrics
-                const lyrics = await page.evaluate(() => {
-                    const lyricsDiv = document.querySelector('.lyric') || document.querySelector('#lyric');
-                    if (lyricsDiv) {
-                        return lyricsDiv.innerText.trim();
-                    }
-                    return null;
-                });
-
-                return lyrics;
+            const searchUrl = `${SOURCE_URLS.utaten}/search/?search_text=${encodedQuery}`;
+
+            await this.goto(page, searchUrl, { waitUntil: 'domcontentloaded', timeout: 15000 });
+
+            // Every result row: title, artist and row text (for a duration)
+            const rows = await page.evaluate(() => {
+                const seen = new Set();
+                return Array.from(document.querySelectorAll('a[href*="/lyric/"]'))
+                    .filter(link => !seen.has(link.href) && seen.add(link.href))
+                    .map(link => {
+                        let row = link.parentElement;
+                        let artistLink = null;
+                        for (let depth = 0; depth < 2 && row && !artistLink; depth++) {
+                            artistLink = row.querySelector('a[href*="/artist/"]');
+                            if (!artistLink) row = row.parentElement;
+                        }
+                        return {
+                            url: link.href,
+                            title: link.innerText.trim(),
+                            artist: artistLink ? artistLink.innerText.trim() : '',
+                            text: (artistLink ? row : link.parentElement).innerText
+                        };
+                    });
+            });
+            const candidates = pickCandidates(
+                rows.map(row => ({ url: row.url, title: row.title, artist: row.artist, duration: parseDuration(row.text) })),
+                title, artist, duration, TOP_CANDIDATES);
+            if (!candidates.length) return null;
+
+            // Open the best candidates side by side and keep the best one with lyrics
+            const kept = candidates.map(() => (pages ? [] : null));
+            const results = await Promise.all(candidates.map((candidate, i) => this.fetchUtatenLyrics(candidate.url, kept[i])));
+            metrics.inc('candidate_pages_total', { source: 'Utaten', result: 'fetched' }, candidates.length,
+                'Lyrics pages opened from search results');
+            const index = results.findIndex(lyrics => lyrics && lyrics.length > 50);
+            if (index < 0) return null;
+            if (candidates[index].url !== rows[0].url) {
+                console.log(`Best match: ${candidates[index].title} / ${candidates[index].artist || '?'}`);
             }
+            if (pages) pages.push(...kept[index]);
+            return results[index];
         } catch (error) {
             console.log(`Utaten scraping failed: ${error.message}`);
             return null;
@@ -267,34 +364,74 @@ class LyricsScraper {
         }
     }
 
-    async scrapeLyrics(title, artist) {
+    async fetchUtatenLyrics(url, pages = null) {
+        let page = null;
+        try {
+            page = await this.newPage();
+            await page.setUserAgent('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36');
+            await this.goto(page, url, { waitUntil: 'domcontentloaded', timeout: 10000 });
+
+            const lyrics = await page.evaluate(() => {
+                const lyricsDiv = document.querySelector('.lyric') || document.querySelector('#lyric');
+                if (lyricsDiv) {
+                    return lyricsDiv.innerText.trim();
+                }
+                return null;
+            });
+            if (lyrics) await this.keepPage(page, pages);
+            return lyrics;
+        } catch (error) {
+            console.log(`Utaten lyrics page failed: ${error.message}`);
+            return null;
+        } finally {
+            if (page) {
+                try {
+                    await page.close();
+                } catch (e) {
+                    console.log('Error closing Utaten page:', e.message);
+                }
+            }
+        }
+    }
+
+    // names: only these sources (the Python engine sends the ones that need
+    // a browser after its plain-HTTP lookups); otherwise the default chain
+    async scrapeLyrics(title, artist, duration = null, pages = null, names = null) {
         console.log(`Searching for: ${artist} - ${title}`);
 
+        const methods = {
+            Utaten: this.scrapeUtaten.bind(this),
+            Genius: this.scrapeGenius.bind(this),
+            AZLyrics: this.scrapeAZLyrics.bind(this),
+            Google: this.scrapeGoogle.bind(this)
+        };
+
         // Check if this is a Japanese song
         const isJapanese = this.hasJapaneseChars(title) || this.hasJapaneseChars(artist);
 
-        let sources;
-        if (isJapanese) {
+        let order;
+        if (names && names.length) {
+            order = names.filter(name => methods[name]);
+        } else if (isJapanese) {
             // For Japanese songs, try Japanese sites first
-            sources = [
-                { name: 'Utaten', method: this.scrapeUtaten.bind(this) },
-                { name: 'Genius', method: this.scrapeGenius.bind(this) },
-                { name: 'Google', method: this.scrapeGoogle.bind(this) }
-            ];
+            order = ['Utaten', 'Genius', 'Google'];
         } else {
             // For non-Japanese songs, use original order
-            sources = [
-                { name: 'Genius', method: this.scrapeGenius.bind(this) },
-                { name: 'AZLyrics', method: this.scrapeAZLyrics.bind(this) },
-                { name: 'Google', method: this.scrapeGoogle.bind(this) }
-            ];
+            order = ['Genius', 'AZLyrics', 'Google'];
         }
+        const sources = order.map(name => ({ name, method: methods[name] }));
 
         for (const source of sources) {
             console.log(`Trying ${source.name}...`);
-            const lyrics = await source.method(title, artist);
-            if (lyrics && lyrics.length > 50) {
+            const kept = pages ? [] : null;
+            const lyrics = await metrics.time('source_duration_seconds', { source: source.name },
+                () => source.method(title, artist, duration, kept), 'Scrape latency per source');
+            const found = Boolean(lyrics && lyrics.length > 50);
+            metrics.inc('source_results_total', { source: source.name, result: found ? 'found' : 'not_found' },
+                1, 'Scrape attempts per source by result');
+            if (found) {
                 console.log(`Found lyrics from ${source.name}`);
+                if (pages) pages.push(...kept);
                 return lyrics;
             }
         }
@@ -309,9 +446,61 @@ app.use(cors());
 app.use(express.json());
 
 let scraper = null;
+let inFlight = 0;
+let cleaning = null;
+
+metrics.gauge('requests_in_flight', () => inFlight, {}, 'Scrape requests being handled');
+metrics.gauge('open_pages', () => (scraper ? scraper.openPages : 0), {}, 'Browser pages currently open');
+metrics.gauge('browser_connected', () => (scraper && scraper.browser && scraper.browser.isConnected() ? 1 : 0),
+    {}, '1 while the browser is running');
+
+function countScrape(result) {
+    metrics.inc('requests_total', { result }, 1, 'Scrape requests by result (found, not_found, error)');
+}
+
+function countCleanup(freed) {
+    if (!freed) return;
+    metrics.inc('profile_cleanups_total', {}, 1, 'Browser profile cache cleanups');
+    console.log(`Browser profile over ${Math.round(PROFILE.maxBytes / 1048576)} MB, ` +
+        `dropped ${Math.round(freed / 1048576)} MB of caches`);
+}
+
+// Periodic profile cleanup: once the profile outgrows its cap the idle browser
+// is closed and its caches dropped (cookies stay); the next scrape relaunches it
+async function cleanupProfile() {
+    if (!PROFILE.dir) return;
+    profileBytes = await dirSize(PROFILE.dir);
+    if (profileBytes <= PROFILE.maxBytes || inFlight > 0 || cleaning) return;
+    cleaning = (async () => {
+        try {
+            if (scraper) {
+                await scraper.close();
+                scraper = null;
+            }
+            const freed = await trimProfile(PROFILE.dir);
+            profileBytes -= freed;
+            countCleanup(freed);
+        } catch (error) {
+            console.log('Browser profile cleanup failed:', error.message);
+        }
+    })();
+    await cleaning;
+    cleaning = null;
+}
+
+if (PROFILE.dir) {
+    metrics.gauge('browser_profile_bytes', () => profileBytes, {}, 'Size of the persistent browser profile');
+    setInterval(cleanupProfile, PROFILE.cleanupMinutes * 60 * 1000).unref();
+}
+
+app.get('/metrics', (req, res) => {
+    res.set('Content-Type', 'text/plain; version=0.0.4; charset=utf-8');
+    res.send(metrics.render());
+});
 
 app.post('/init', async (req, res) => {
     try {
+        if (cleaning) await cleaning;
         if (!scraper) {
             scraper = new LyricsScraper();
             await scraper.init();
@@ -323,8 +512,10 @@ app.post('/init', async (req, res) => {
 });
 
 app.post('/scrape', async (req, res) => {
+    inFlight += 1;
     try {
-        const { title, artist } = req.body;
+        const { title, artist, duration, include_pages: includePages, sources } = req.body;
+        if (cleaning) await cleaning;
         if (!scraper) {
             scraper = new LyricsScraper();
             await scraper.init();
@@ -338,10 +529,14 @@ app.post('/scrape', async (req, res) => {
             await scraper.init();
         }
 
-        const lyrics = await scraper.scrapeLyrics(title, artist);
-        res.json({ lyrics: lyrics || null });
+        // Rendered HTML of the page the lyrics came from, if the caller caches pages
+        const pages = includePages ? [] : null;
+        const lyrics = await scraper.scrapeLyrics(title, artist, duration, pages, sources);
+        countScrape(lyrics ? 'found' : 'not_found');
+        res.json(pages ? { lyrics: lyrics || null, pages } : { lyrics: lyrics || null });
     } catch (error) {
         console.log('Scraping error:', error.message);
+        countScrape('error');
 
         // If browser crashed, try to reinitialize
         if (error.message.includes('Target closed') || error.message.includes('Connection closed')) {
@@ -357,6 +552,8 @@ app.post('/scrape', async (req, res) => {
         } else {
             res.status(500).json({ error: error.message });
         }
+    } finally {
+        inFlight -= 1;
     }
 });
 
@@ -372,7 +569,7 @@ app.post('/close', async (req, res) => {
     }
 });
 
-const PORT = 3000;
+const PORT = process.env.PORT || 3000;
 app.listen(PORT, () => {
     console.log(`Puppeteer scraper server running on http://localhost:${PORT}`);
 });
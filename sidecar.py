@@ -0,0 +1,99 @@
+"""
+Lyrics sidecar files
+Reads song.lrc / song.txt next to a track as a local lyrics source, and
+writes them as an alternative to embedding: a sidecar is a few KB of I/O,
+while embedding can rewrite a whole FLAC or MP4 file when its tag has no
+room left.
+"""
+
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+SIDECAR_FORMATS = ('txt', 'lrc')
+OUTPUT_MODES = ('embed', 'sidecar', 'both')
+
+# Tried in this order when reading
+SIDECAR_EXTENSIONS = ('.lrc', '.txt')
+
+ENCODINGS = ('utf-8-sig', 'cp932', 'latin-1')  # cp932: Shift-JIS from Japanese tools
+
+LRC_TIMESTAMP_RE = re.compile(r'\[\d{1,3}:\d{2}(?:[.:]\d{1,3})?\]|<\d{1,3}:\d{2}(?:[.:]\d{1,3})?>')
+LRC_TAG_RE = re.compile(r'^\[(ar|ti|al|au|by|length|offset|re|ve|#):.*\]$', re.IGNORECASE)
+
+
+def sidecar_path(filepath: Path, sidecar_format: str = 'txt') -> Path:
+    return Path(filepath).with_suffix(f'.{sidecar_format}')
+
+
+def find_sidecar(filepath: Path) -> Optional[Path]:
+    """Existing .lrc or .txt next to the track with the same name"""
+    for extension in SIDECAR_EXTENSIONS:
+        candidate = Path(filepath).with_suffix(extension)
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def lrc_to_text(text: str) -> str:
+    """Plain lyrics from LRC: drop [ar:]-style tags and timestamps"""
+    lines = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if LRC_TAG_RE.match(stripped):
+            continue
+        lines.append(LRC_TIMESTAMP_RE.sub('', line).strip())
+    return '\n'.join(lines).strip()
+
+
+def read_sidecar(path: Path) -> Optional[str]:
+    """Lyrics from a sidecar file, or None if it is empty or unreadable"""
+    try:
+        data = Path(path).read_bytes()
+    except OSError:
+        return None
+    for encoding in ENCODINGS:
+        try:
+            text = data.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    if Path(path).suffix.lower() == '.lrc':
+        text = lrc_to_text(text)
+    text = text.strip()
+    return text or None
+
+
+def write_sidecar(filepath: Path, lyrics: str, sidecar_format: str = 'txt',
+                  title: str = '', artist: str = '') -> Optional[Path]:
+    """Write lyrics next to the track; returns the path, or None if unchanged"""
+    path = sidecar_path(filepath, sidecar_format)
+    if sidecar_format == 'lrc':
+        header = [f"[ti:{title}]"] if title else []
+        header += [f"[ar:{artist}]"] if artist else []
+        content = '\n'.join(header + [lyrics]) + '\n'
+    else:
+        content = lyrics.rstrip('\n') + '\n'
+
+    data = content.encode('utf-8')
+    try:
+        if path.read_bytes() == data:
+            return None
+    except OSError:
+        pass
+
+    # Write to a temporary file first so a crash never leaves half a sidecar
+    fd, temp_path = tempfile.mkstemp(prefix='.lyrics_', suffix='.tmp', dir=str(path.parent))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    return path
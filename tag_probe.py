@@ -0,0 +1,386 @@
+"""
+Header-only lyrics probing
+Answers "does this file have lyrics, and how long are they" by reading only
+the tag block (ID3v2 frames, FLAC metadata blocks, the Ogg comment packet or
+the MP4 moov/udta/meta/ilst atoms) with bounded reads, never touching audio
+frames or stream info. Formats it does not understand return None so callers
+can fall back to a full mutagen parse.
+
+The probe also reports the padding left in the tag block, which tells whether
+writing lyrics can happen in place or will rewrite the whole file.
+"""
+
+import os
+import struct
+import zlib
+from typing import NamedTuple, Optional, Tuple
+
+from lyrics_tags import VORBIS_LYRICS_FIELDS
+
+# Refuse to buffer anything larger than this; a tag this big is not worth
+# probing and the caller falls back to mutagen
+MAX_BLOCK_SIZE = 64 * 1024 * 1024
+
+_VORBIS_KEYS = {field.lower() for field in VORBIS_LYRICS_FIELDS}
+
+
+class ProbeResult(NamedTuple):
+    format: str  # Same names as the mutagen file types (MP3, FLAC, MP4, ...)
+    has_lyrics: bool
+    lyrics_length: int
+    fields: Tuple[str, ...] = ()
+    padding: Optional[int] = None  # bytes free for in-place tag growth (None: unknown)
+
+
+class ProbeError(Exception):
+    """The tag block could not be understood; fall back to mutagen"""
+
+
+def _read_exact(f, size: int) -> bytes:
+    if size < 0 or size > MAX_BLOCK_SIZE:
+        raise ProbeError(f"Block size {size} out of range")
+    data = f.read(size)
+    if len(data) != size:
+        raise ProbeError("Unexpected end of file")
+    return data
+
+
+def _result(file_format: str, found: list, padding: Optional[int] = None) -> ProbeResult:
+    """Build a result from (field, text) pairs, ignoring empty values"""
+    found = [(field, text) for field, text in found if text.strip()]
+    return ProbeResult(
+        file_format,
+        bool(found),
+        max((len(text) for _, text in found), default=0),
+        tuple(field for field, _ in found),
+        padding
+    )
+
+
+# --- ID3v2 -----------------------------------------------------------------
+
+_ID3_ENCODINGS = {0: ('latin-1', b'\x00'), 1: ('utf-16', b'\x00\x00'),
+                  2: ('utf-16-be', b'\x00\x00'), 3: ('utf-8', b'\x00')}
+
+
+def _syncsafe(data: bytes) -> int:
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+def _unsynchronize(data: bytes) -> bytes:
+    return data.replace(b'\xff\x00', b'\xff')
+
+
+def _decode_uslt(body: bytes) -> str:
+    """Decode a USLT/ULT frame body: encoding, language, description, text"""
+    if len(body) < 4:
+        return ''
+    encoding, terminator = _ID3_ENCODINGS.get(body[0], ('latin-1', b'\x00'))
+    rest = body[4:]
+    # Skip the content descriptor (terminator is aligned for UTF-16)
+    index = rest.find(terminator)
+    while terminator == b'\x00\x00' and index != -1 and index % 2:
+        index = rest.find(terminator, index + 1)
+    text = rest[index + len(terminator):] if index != -1 else b''
+    return text.decode(encoding, errors='replace').rstrip('\x00')
+
+
+def _read_id3_header(f) -> Optional[Tuple[int, int, int]]:
+    """Return (major version, flags, tag size) for an ID3v2 tag at the current position"""
+    header = f.read(10)
+    if len(header) < 10 or header[:3] != b'ID3':
+        return None
+    major, flags = header[3], header[5]
+    if major not in (2, 3, 4):
+        raise ProbeError(f"Unsupported ID3v2.{major}")
+    return major, flags, _syncsafe(header[6:10])
+
+
+def _probe_id3(f) -> Tuple[Optional[list], Optional[int]]:
+    """Return ([(field, text)] for lyrics frames, padding) for an ID3v2 tag.
+
+    The list is None if there is no tag (and the padding 0: adding one means
+    a rewrite); the padding is None when it could not be measured.
+    """
+    header = _read_id3_header(f)
+    if header is None:
+        return None, 0
+    major, flags, tag_size = header
+    tag_start = f.tell()
+    tag_end = tag_start + tag_size
+
+    if flags & 0x80 and major < 4:
+        # Whole-tag unsynchronisation: frame sizes refer to the decoded data
+        data = _unsynchronize(_read_exact(f, tag_size))
+        return _scan_id3_frames(data, major, flags), None
+
+    if flags & 0x40 and major == 2:
+        raise ProbeError("Compressed ID3v2.2 tag")
+    if flags & 0x40:
+        # Extended header
+        raw = _read_exact(f, 4)
+        size = _syncsafe(raw) - 4 if major == 4 else struct.unpack('>I', raw)[0]
+        f.seek(size, os.SEEK_CUR)
+
+    found = []
+    frames_end = f.tell()
+    id_len, header_len = (3, 6) if major == 2 else (4, 10)
+    while f.tell() + header_len <= tag_end:
+        frame_header = f.read(header_len)
+        if len(frame_header) < header_len or frame_header[0] == 0:
+            break  # Padding
+        frame_id = frame_header[:id_len]
+        if major == 2:
+            size = int.from_bytes(frame_header[3:6], 'big')
+            frame_flags = 0
+        else:
+            raw_size = frame_header[4:8]
+            if major == 4 and not any(b & 0x80 for b in raw_size):
+                size = _syncsafe(raw_size)
+            else:
+                # v2.3, or a v2.4 tag written with plain sizes (old iTunes)
+                size = struct.unpack('>I', raw_size)[0]
+            frame_flags = struct.unpack('>H', frame_header[8:10])[0]
+        if size <= 0 or f.tell() + size > tag_end:
+            break
+
+        if frame_id in (b'USLT', b'ULT'):
+            body = _read_exact(f, size)
+            found.append(('USLT', _decode_frame(body, major, frame_flags)))
+        else:
+            f.seek(size, os.SEEK_CUR)
+        frames_end = f.tell()
+    return found, tag_end - frames_end
+
+
+def _scan_id3_frames(data: bytes, major: int, flags: int) -> list:
+    """Frame scan over an in-memory (already resynchronised) tag"""
+    pos = 0
+    if flags & 0x40 and major == 3:
+        pos = 4 + struct.unpack('>I', data[:4])[0]
+    found = []
+    id_len, header_len = (3, 6) if major == 2 else (4, 10)
+    while pos + header_len <= len(data) and data[pos] != 0:
+        frame_id = data[pos:pos + id_len]
+        if major == 2:
+            size = int.from_bytes(data[pos + 3:pos + 6], 'big')
+            frame_flags = 0
+        else:
+            size = struct.unpack('>I', data[pos + 4:pos + 8])[0]
+            frame_flags = struct.unpack('>H', data[pos + 8:pos + 10])[0]
+        pos += header_len
+        if size <= 0 or pos + size > len(data):
+            break
+        if frame_id in (b'USLT', b'ULT'):
+            found.append(('USLT', _decode_frame(data[pos:pos + size], major, frame_flags)))
+        pos += size
+    return found
+
+
+def _decode_frame(body: bytes, major: int, frame_flags: int) -> str:
+    """Undo per-frame encryption/compression/unsync flags and decode the lyrics"""
+    if major == 3:
+        if frame_flags & 0x0040:
+            raise ProbeError("Encrypted ID3 frame")
+        if frame_flags & 0x0080:
+            body = zlib.decompress(body[4:])
+    elif major == 4:
+        if frame_flags & 0x0004:
+            raise ProbeError("Encrypted ID3 frame")
+        if frame_flags & 0x0001:
+            body = body[4:]  # Data length indicator
+        if frame_flags & 0x0002:
+            body = _unsynchronize(body)
+        if frame_flags & 0x0008:
+            body = zlib.decompress(body)
+    return _decode_uslt(body)
+
+
+def probe_mp3(f) -> ProbeResult:
+    found, padding = _probe_id3(f)
+    return _result('MP3', found or [], padding)
+
+
+# --- Vorbis comments (FLAC, Ogg) ----------------------------------------------
+
+def _parse_vorbis_comments(data: bytes) -> list:
+    """Return [(field, text)] for lyrics keys in a Vorbis comment block"""
+    pos = 0
+    vendor_length = struct.unpack_from('<I', data, pos)[0]
+    pos += 4 + vendor_length
+    count = struct.unpack_from('<I', data, pos)[0]
+    pos += 4
+    found = []
+    for _ in range(count):
+        length = struct.unpack_from('<I', data, pos)[0]
+        pos += 4
+        comment = data[pos:pos + length]
+        pos += length
+        key, sep, value = comment.partition(b'=')
+        if sep and key.decode('ascii', errors='replace').lower() in _VORBIS_KEYS:
+            found.append((key.decode('ascii', errors='replace').upper(),
+                          value.decode('utf-8', errors='replace')))
+    return found
+
+
+def probe_flac(f) -> ProbeResult:
+    start = f.tell()
+    if _read_id3_header(f) is not None:
+        # Some taggers put an ID3v2 tag in front of fLaC; skip it
+        f.seek(start)
+        _, _, size = _read_id3_header(f)
+        f.seek(size, os.SEEK_CUR)
+    else:
+        f.seek(start)
+    if f.read(4) != b'fLaC':
+        raise ProbeError("Missing fLaC marker")
+
+    found = []
+    padding = 0
+    while True:
+        header = f.read(4)
+        if len(header) < 4:
+            raise ProbeError("Truncated metadata block header")
+        last, block_type = header[0] & 0x80, header[0] & 0x7F
+        size = int.from_bytes(header[1:4], 'big')
+        if block_type == 4:
+            found.extend(_parse_vorbis_comments(_read_exact(f, size)))
+        else:
+            if block_type == 1:
+                padding += size
+            f.seek(size, os.SEEK_CUR)
+        if last:
+            break  # Next byte is the first audio frame
+    return _result('FLAC', found, padding)
+
+
+def _read_ogg_packets(f, count: int) -> list:
+    """Read the first `count` packets of the first logical stream"""
+    packets, current = [], b''
+    serial = None
+    while len(packets) < count:
+        header = f.read(27)
+        if len(header) < 27 or header[:4] != b'OggS':
+            raise ProbeError("Bad Ogg page")
+        page_serial = struct.unpack_from('<I', header, 14)[0]
+        segment_count = header[26]
+        lacing = f.read(segment_count)
+        body = _read_exact(f, sum(lacing))
+        if serial is None:
+            serial = page_serial
+        elif page_serial != serial:
+            continue  # Interleaved stream
+        pos = 0
+        for segment in lacing:
+            current += body[pos:pos + segment]
+            pos += segment
+            if len(current) > MAX_BLOCK_SIZE:
+                raise ProbeError("Ogg packet too large")
+            if segment < 255:
+                packets.append(current)
+                current = b''
+                if len(packets) == count:
+                    break
+    return packets
+
+
+def probe_ogg(f) -> ProbeResult:
+    ident, comments = _read_ogg_packets(f, 2)
+    # Ogg pages have no padding: a bigger comment packet shifts the whole stream
+    if ident.startswith(b'\x01vorbis') and comments.startswith(b'\x03vorbis'):
+        return _result('OggVorbis', _parse_vorbis_comments(comments[7:]), 0)
+    if ident.startswith(b'OpusHead') and comments.startswith(b'OpusTags'):
+        return _result('OggOpus', _parse_vorbis_comments(comments[8:]), 0)
+    raise ProbeError("Unsupported Ogg codec")
+
+
+# --- MP4 atoms -------------------------------------------------------------------
+
+def _iter_atoms(f, start: int, end: int):
+    """Yield (type, payload start, atom end) for sibling atoms between start and end"""
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, atom_type = struct.unpack('>I4s', header)
+        payload = pos + 8
+        if size == 1:
+            size = struct.unpack('>Q', f.read(8))[0]
+            payload += 8
+        elif size == 0:
+            size = end - pos
+        if size < payload - pos:
+            raise ProbeError("Bad atom size")
+        yield atom_type, payload, pos + size
+        pos += size
+
+
+def _find_atom(f, start: int, end: int, atom_type: bytes):
+    for found_type, payload, atom_end in _iter_atoms(f, start, end):
+        if found_type == atom_type:
+            return payload, atom_end
+    return None
+
+
+def probe_mp4(f) -> ProbeResult:
+    file_end = f.seek(0, os.SEEK_END)
+    start, end = 0, file_end
+    for atom_type in (b'moov', b'udta', b'meta'):
+        located = _find_atom(f, start, end, atom_type)
+        if located is None:
+            return _result('MP4', [], 0)
+        start, end = located
+    start += 4  # meta is a full box: version and flags precede its children
+
+    # A free atom right after ilst is the padding mutagen writes into
+    ilst, padding = None, 0
+    for atom_type, payload, atom_end in _iter_atoms(f, start, end):
+        if atom_type == b'ilst':
+            ilst = (payload, atom_end)
+        elif atom_type == b'free' and ilst is not None and padding == 0:
+            padding = atom_end - payload + 8
+    if ilst is None:
+        return _result('MP4', [], padding)
+
+    located = _find_atom(f, ilst[0], ilst[1], b'\xa9lyr')
+    if located is None:
+        return _result('MP4', [], padding)
+    start, end = located
+
+    found = []
+    for atom_type, payload, atom_end in _iter_atoms(f, start, end):
+        if atom_type == b'data':
+            f.seek(payload + 8)  # Type indicator and locale
+            found.append(('\xa9lyr', _read_exact(f, atom_end - payload - 8).decode('utf-8', errors='replace')))
+    return _result('MP4', found, padding)
+
+
+# --- Dispatch ---------------------------------------------------------------------
+
+PROBES_BY_EXTENSION = {
+    '.mp3': probe_mp3,
+    '.flac': probe_flac,
+    '.ogg': probe_ogg,
+    '.oga': probe_ogg,
+    '.opus': probe_ogg,
+    '.m4a': probe_mp4,
+    '.mp4': probe_mp4,
+}
+
+
+def probe_lyrics(filepath) -> Optional[ProbeResult]:
+    """Read only the tag block of a file and report lyrics presence and length.
+
+    Returns None when the format is not supported here or the tag could not
+    be understood, in which case the caller should use mutagen instead.
+    """
+    probe = PROBES_BY_EXTENSION.get(os.path.splitext(str(filepath))[1].lower())
+    if probe is None:
+        return None
+    try:
+        with open(filepath, 'rb') as f:
+            return probe(f)
+    except (ProbeError, OSError, struct.error, zlib.error, ValueError):
+        return None
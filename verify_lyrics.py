@@ -4,11 +4,38 @@ Comprehensive lyrics verification tool
 Checks if lyrics are properly embedded in audio files
 """
 
+import os
 import sys
+import csv
+import json
 import mutagen
 from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
 import argparse
 
+import lyrics_tags
+from library_index import LibraryIndex, DEFAULT_INDEX_PATH
+
+# Descriptions of the lyrics fields reported by lyrics_tags
+FIELD_DESCRIPTIONS = {
+    'USLT': 'ID3 unsynchronized lyrics frame',
+    'LYRICS': 'Standard lyrics field',
+    'UNSYNCED LYRICS': 'MP3Tag FLAC format',
+    'UNSYNCEDLYRICS': 'Alternative unsynced format',
+    '\xa9lyr': 'MP4/iTunes lyrics',
+    'WM/Lyrics': 'Windows Media lyrics',
+    'Lyrics': 'Generic lyrics field',
+    'lyrics': 'Lowercase lyrics field'
+}
+
+# Players known to read each lyrics format
+PLAYER_COMPATIBILITY = {
+    'ID3': ('MP3Tag, Foobar2000, MusicBee', 'Missing USLT tag'),
+    'Vorbis': ('MP3Tag, MusicBee, Foobar2000', 'Missing standard LYRICS / UNSYNCED LYRICS fields'),
+    'MP4': ('iTunes, VLC, most players', 'Missing ©lyr field for MP4'),
+    'ASF': ('Windows Media Player, MusicBee', 'Missing WM/Lyrics attribute'),
+}
+
 def check_file_lyrics(filepath, show_preview=False):
     """Check lyrics in a single audio file"""
     path = Path(filepath)
@@ -25,97 +52,172 @@ def check_file_lyrics(filepath, show_preview=False):
             print("❌ Could not read audio file")
             return False
         
-        print(f"📁 Format: {type(audio).__name__}")
+        lyrics_format = lyrics_tags.format_for(audio)
+        print(f"📁 Format: {type(audio).__name__} ({lyrics_format.name} tags)")
         print(f"📊 File size: {path.stat().st_size / 1024 / 1024:.1f} MB")
         
-        lyrics_found = False
-        total_lyrics_chars = 0
-        
-        # Check different lyrics field formats
-        lyrics_fields = {
-            'LYRICS': 'Standard lyrics field',
-            'lyrics': 'Lowercase lyrics field', 
-            'UNSYNCED LYRICS': 'MP3Tag FLAC format',
-            'UNSYNCEDLYRICS': 'Alternative unsynced format',
-            '\xa9lyr': 'MP4/iTunes lyrics',
-            'WM/Lyrics': 'Windows Media lyrics',
-            'Lyrics': 'Generic lyrics field'
-        }
+        found = lyrics_tags.read_lyrics(audio)
+        total_lyrics_chars = max((len(text) for _, text in found), default=0)
         
         print(f"\n🔍 Lyrics Field Check:")
-        for field, description in lyrics_fields.items():
-            if field in audio:
-                content = audio[field]
-                if isinstance(content, list):
-                    content = content[0] if content else ""
-                
-                content_str = str(content)
-                if content_str.strip():
-                    print(f"   ✅ {field}: {len(content_str)} characters ({description})")
-                    total_lyrics_chars = max(total_lyrics_chars, len(content_str))
-                    lyrics_found = True
-                    
-                    if show_preview and len(content_str) > 50:
-                        # Show first line only (avoid reproducing full lyrics)
-                        first_line = content_str.split('\n')[0][:100]
-                        print(f"      Preview: {first_line}...")
-                else:
-                    print(f"   ⚠️  {field}: Empty")
-        
-        # Check ID3 tags for USLT frames
-        if hasattr(audio, 'tags') and audio.tags:
-            print(f"\n🏷️  ID3 Tag Check:")
-            uslt_found = False
-            for frame in audio.tags.values():
-                if hasattr(frame, 'FrameID') and frame.FrameID == 'USLT':
-                    lyrics_text = str(frame.text) if hasattr(frame, 'text') else str(frame)
-                    print(f"   ✅ USLT Frame: {len(lyrics_text)} characters")
-                    total_lyrics_chars = max(total_lyrics_chars, len(lyrics_text))
-                    lyrics_found = True
-                    uslt_found = True
-                    
-                    if show_preview and len(lyrics_text) > 50:
-                        first_line = lyrics_text.split('\n')[0][:100]
-                        print(f"      Preview: {first_line}...")
-            
-            if not uslt_found:
-                print(f"   ❌ No USLT frames found")
+        for field, text in found:
+            description = FIELD_DESCRIPTIONS.get(field, 'Lyrics field')
+            print(f"   ✅ {field}: {len(text)} characters ({description})")
+            if show_preview and len(text) > 50:
+                # Show first line only (avoid reproducing full lyrics)
+                first_line = text.split('\n')[0][:100]
+                print(f"      Preview: {first_line}...")
+        if not found:
+            fields = ', '.join(lyrics_format.fields) or 'none supported'
+            print(f"   ❌ No lyrics in {fields}")
         
         # Show compatibility info
-        print(f"\n🎛️  Player Compatibility:")
-        if isinstance(audio, mutagen.mp3.MP3):
-            if any(hasattr(frame, 'FrameID') and frame.FrameID == 'USLT' for frame in audio.tags.values() if audio.tags):
-                print("   ✅ MP3Tag, Foobar2000, MusicBee")
-            else:
-                print("   ❌ Missing USLT tag for MP3")
-        
-        elif isinstance(audio, mutagen.flac.FLAC):
-            if 'LYRICS' in audio or 'UNSYNCED LYRICS' in audio:
-                print("   ✅ MP3Tag, MusicBee, Foobar2000")
-            else:
-                print("   ❌ Missing standard FLAC lyrics fields")
-        
-        elif isinstance(audio, mutagen.mp4.MP4):
-            if '\xa9lyr' in audio:
-                print("   ✅ iTunes, VLC, most players")
-            else:
-                print("   ❌ Missing ©lyr field for MP4")
+        if lyrics_format.name in PLAYER_COMPATIBILITY:
+            players, missing = PLAYER_COMPATIBILITY[lyrics_format.name]
+            print(f"\n🎛️  Player Compatibility:")
+            print(f"   ✅ {players}" if found else f"   ❌ {missing}")
         
         # Final result
         print(f"\n📋 Summary:")
-        if lyrics_found:
+        if found:
             print(f"   ✅ LYRICS FOUND: {total_lyrics_chars} characters")
             print(f"   🎯 Status: Properly embedded")
         else:
             print(f"   ❌ NO LYRICS FOUND")
             print(f"   🎯 Status: Needs lyrics")
         
-        return lyrics_found
+        return bool(found)
         
     except Exception as e:
         print(f"❌ Error reading file: {e}")
         return False
 
+def finished(result):
+    """A future that already has its result, for bounded_map to pass through"""
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def bounded_map(executor, fn, items, window):
+    """Like executor.map, but yields results as they finish and keeps at most
+    `window` tasks in flight so huge libraries are never queued all at once.
+    Items that are already finished futures are yielded straight away."""
+    in_flight = set()
+    for item in items:
+        if isinstance(item, Future) and item.done():
+            yield item.result()
+            continue
+        in_flight.add(executor.submit(fn, item))
+        if len(in_flight) >= window:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    for future in in_flight:
+        yield future.result()
+
+
+def verify_library(directory, jobs=4, use_processes=False, index=None):
+    """Check every audio file under `directory` in parallel, yielding results.
+
+    With an index, files whose mtime and size are unchanged since the last
+    verify are not opened; their stored result is yielded, as soon as the
+    file is found, with unchanged=True.
+    """
+    stats = {}  # path -> stat of files being checked, for the index update
+
+    def candidates():
+        for path, entry in lyrics_tags.iter_audio_files(directory):
+            if index is None:
+                yield path
+                continue
+            try:
+                stat_result = entry.stat()
+            except OSError:
+                continue
+            cached = index.lookup(path, stat_result)
+            if cached:
+                cached['unchanged'] = True
+                yield finished(cached)
+            else:
+                stats[path] = stat_result
+                yield path
+
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    pending_updates = []
+    with executor_class(max_workers=jobs) as executor:
+        for result in bounded_map(executor, lyrics_tags.check_file, candidates(), jobs * 4):
+            if index is not None and not result['error'] and not result.get('unchanged'):
+                stat_result = stats.pop(result['path'], None)
+                if stat_result:
+                    pending_updates.append(dict(result, mtime_ns=stat_result.st_mtime_ns,
+                                                size=stat_result.st_size))
+                    if len(pending_updates) >= 500:
+                        index.update(pending_updates)
+                        pending_updates = []
+            yield result
+    if index is not None and pending_updates:
+        index.update(pending_updates)
+
+
+def summarize(results):
+    """Aggregate per-format counts and lyric lengths"""
+    formats = {}
+    totals = {'files': 0, 'with_lyrics': 0, 'without_lyrics': 0, 'errors': 0, 'unchanged': 0}
+    for result in results:
+        totals['files'] += 1
+        if result.get('unchanged'):
+            totals['unchanged'] += 1
+        if result.get('error'):
+            totals['errors'] += 1
+            continue
+        entry = formats.setdefault(result['format'], {
+            'files': 0, 'with_lyrics': 0, 'without_lyrics': 0,
+            'total_length': 0, 'min_length': None, 'max_length': 0
+        })
+        entry['files'] += 1
+        if result['has_lyrics']:
+            length = result['lyrics_length']
+            entry['with_lyrics'] += 1
+            totals['with_lyrics'] += 1
+            entry['total_length'] += length
+            entry['max_length'] = max(entry['max_length'], length)
+            entry['min_length'] = length if entry['min_length'] is None else min(entry['min_length'], length)
+        else:
+            entry['without_lyrics'] += 1
+            totals['without_lyrics'] += 1
+
+    for entry in formats.values():
+        entry['avg_length'] = round(entry['total_length'] / entry['with_lyrics'], 1) if entry['with_lyrics'] else 0
+        entry['min_length'] = entry['min_length'] or 0
+    return {'totals': totals, 'formats': formats}
+
+
+def stream_results(results, stream):
+    """Write each result as a JSON line as soon as it is available"""
+    for result in results:
+        stream.write(json.dumps(dict(result, type='file'), ensure_ascii=False) + '\n')
+        stream.flush()
+        yield result
+
+
+def write_summary(summary, output_format, stream):
+    """Write a summary as JSON or CSV"""
+    if output_format == 'json':
+        json.dump(summary, stream, indent=2)
+        stream.write('\n')
+        return
+
+    writer = csv.writer(stream)
+    writer.writerow(['format', 'files', 'with_lyrics', 'without_lyrics',
+                     'min_length', 'avg_length', 'max_length'])
+    for name, entry in sorted(summary['formats'].items()):
+        writer.writerow([name, entry['files'], entry['with_lyrics'], entry['without_lyrics'],
+                         entry['min_length'], entry['avg_length'], entry['max_length']])
+    totals = summary['totals']
+    writer.writerow(['TOTAL', totals['files'], totals['with_lyrics'], totals['without_lyrics'], '', '', ''])
+
+
 def scan_directory(directory, show_preview=False):
     """Scan all audio files in a directory"""
     path = Path(directory)
@@ -123,12 +225,7 @@ def scan_directory(directory, show_preview=False):
         print(f"❌ Directory not found: {directory}")
         return
     
-    # Common audio extensions
-    audio_extensions = {'.mp3', '.m4a', '.mp4', '.flac', '.ogg', '.wav', '.wma', '.aac'}
-    
-    audio_files = []
-    for ext in audio_extensions:
-        audio_files.extend(path.rglob(f'*{ext}'))
+    audio_files = [Path(p) for p, _ in lyrics_tags.iter_audio_files(path)]
     
     if not audio_files:
         print(f"❌ No audio files found in: {directory}")
@@ -161,18 +258,51 @@ Examples:
   python verify_lyrics.py song.mp3              # Check single file
   python verify_lyrics.py /Music                # Check directory
   python verify_lyrics.py song.flac --preview   # Show lyrics preview
+  python verify_lyrics.py /Music --summary json --jobs 16 --index
+                                                # Fast parallel audit, summary only
+  python verify_lyrics.py /Music --stream > audit.jsonl
+                                                # Stream one JSON line per file
         """
     )
     
     parser.add_argument('path', help='Audio file or directory to check')
     parser.add_argument('--preview', action='store_true', 
                        help='Show preview of lyrics content')
+    parser.add_argument('--summary', choices=['csv', 'json'],
+                       help='Quiet mode: check a directory in parallel and print only a summary')
+    parser.add_argument('--stream', action='store_true',
+                       help='Bulk audit: check a directory in parallel and print one JSON line per file '
+                            'as results arrive, followed by a summary line')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 4,
+                       help='Parallel workers for --summary/--stream (default: CPU count)')
+    parser.add_argument('--processes', action='store_true',
+                       help='Use a process pool instead of threads')
+    parser.add_argument('--index', nargs='?', const=str(DEFAULT_INDEX_PATH),
+                       help='Skip files unchanged since the last verify (optional index path)')
+    parser.add_argument('--output', help='Write the summary to a file instead of stdout')
     
     args = parser.parse_args()
     
     path = Path(args.path)
     
-    if path.is_file():
+    if (args.summary or args.stream) and path.is_dir():
+        index = LibraryIndex(args.index) if args.index else None
+        try:
+            results = verify_library(path, max(1, args.jobs), args.processes, index)
+            if args.stream:
+                results = stream_results(results, sys.stdout)
+            summary = summarize(results)
+        finally:
+            if index:
+                index.close()
+        if args.stream and not args.summary:
+            print(json.dumps(dict(summary, type='summary')))
+        elif args.output:
+            with open(args.output, 'w', encoding='utf-8', newline='') as f:
+                write_summary(summary, args.summary, f)
+        else:
+            write_summary(summary, args.summary, sys.stdout)
+    elif path.is_file():
         check_file_lyrics(args.path, args.preview)
     elif path.is_dir():
         scan_directory(args.path, args.preview)